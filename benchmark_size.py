@@ -37,7 +37,9 @@ from embench_core import log_args
 from embench_core import find_benchmarks
 from embench_core import log_benchmarks
 from embench_core import embench_stats
+from embench_core import embench_delta
 from embench_core import output_format
+from embench_stream import ResultStream
 
 """
 This script was originally written to handle elf format files and has been
@@ -117,6 +119,19 @@ def build_parser():
         default='logs',
         help='Directory in which to store logs',
     )
+    parser.add_argument(
+        '--compare-builddir',
+        type=str,
+        help='Directory holding the binaries of a build to compare against, '
+        + 'for example a separately compiled build when measuring a whole '
+        + 'program build',
+    )
+    parser.add_argument(
+        '--ndjson-output',
+        type=str,
+        help='File to which to write each result as a line of JSON as soon '
+        + 'as it is known, followed by a summary',
+    )
     parser.add_argument(
         '--baselinedir',
         type=str,
@@ -230,11 +245,34 @@ def validate_args(args):
         log.error(f'ERROR: Unable to read build directory {gp["bd"]}: exiting')
         sys.exit(1)
 
+    gp['compare_bd_benchdir'] = None
+    if args.compare_builddir:
+        if os.path.isabs(args.compare_builddir):
+            compare_bd = args.compare_builddir
+        else:
+            compare_bd = os.path.join(gp['rootdir'], args.compare_builddir)
+        if not os.path.isdir(compare_bd):
+            log.error(f'ERROR: comparison build directory {compare_bd} not found: exiting')
+            sys.exit(1)
+        gp['compare_bd_benchdir'] = os.path.join(compare_bd, 'src')
+
     if os.path.isabs(args.baselinedir):
         gp['baseline_dir'] = args.baselinedir
     else:
         gp['baseline_dir'] = os.path.join(gp['rootdir'], args.baselinedir)
 
+    gp['stream'] = None
+    if args.ndjson_output:
+        if os.path.isabs(args.ndjson_output):
+            streamfile = args.ndjson_output
+        else:
+            streamfile = os.path.join(gp['rootdir'], args.ndjson_output)
+        try:
+            gp['stream'] = ResultStream(streamfile, 'size')
+        except OSError as error:
+            log.error(f'ERROR: Unable to create {streamfile}: {error}: exiting')
+            sys.exit(1)
+
     gp['absolute'] = args.absolute
     if args.output_format:
         gp['output_format'] = args.output_format
@@ -257,10 +295,14 @@ def validate_args(args):
     else:
         gp['metric'] = ['text']
 
-def benchmark_size(bench, metrics):
-    """Compute the total size of the desired sections in a benchmark.  Returns
-       the size in bytes, which may be zero if the section wasn't found."""
-    appexe = os.path.join(gp['bd_benchdir'], bench, bench)
+def benchmark_size(bench, metrics, bd_benchdir=None):
+    """Compute the total size of the desired sections in a benchmark, built
+       in the benchmark build directory "bd_benchdir", by default that of the
+       build being measured.  Returns the size in bytes, which may be zero if
+       the section wasn't found."""
+    if bd_benchdir is None:
+        bd_benchdir = gp['bd_benchdir']
+    appexe = os.path.join(bd_benchdir, bench, bench)
     sec_sizes = {}
 
     # If the benchmark failed to build, then return a 0 size instead of
@@ -291,6 +333,24 @@ def benchmark_size(bench, metrics):
     return sec_sizes
 
 
+def stream_result(bench, sections, total, baseline, cmp_total):
+    """Write the size of "bench" to the result stream: the size of each of
+       its "sections", their "total", and the total relative to "baseline".
+       If there is a comparison build, also write its total, "cmp_total"."""
+    gp['stream'].write(
+        'result',
+        benchmark=bench,
+        build='main',
+        raw=total if sections else None,
+        relative=total / baseline if sections and baseline else None,
+        sections=sections,
+    )
+    if cmp_total is not None:
+        gp['stream'].write(
+            'result', benchmark=bench, build='compare', raw=cmp_total or None
+        )
+
+
 def collect_data(benchmarks):
     """Collect and log all the raw and optionally relative data associated with
        the list of benchmarks supplied in the "benchmarks" argument. Return
@@ -319,6 +379,7 @@ def collect_data(benchmarks):
     raw_section_data = {}
     raw_totals = {}
     rel_data = {}
+    cmp_totals = {}
 
     # Collect data
     for bench in benchmarks:
@@ -328,6 +389,12 @@ def collect_data(benchmarks):
             raw_section_data[bench] = benchmark_size(bench, gp['metric'])
         raw_totals[bench] = sum(raw_section_data[bench].values())
 
+        # And for the build to compare against, if any
+        if gp['compare_bd_benchdir']:
+            cmp_totals[bench] = sum(
+                benchmark_size(bench, gp['metric'], gp['compare_bd_benchdir']).values()
+            )
+
         # Calculate data relative to the baseline if needed
         if gp['absolute'] or gp['output_format'] == output_format.BASELINE:
             rel_data[bench] = {}
@@ -340,6 +407,10 @@ def collect_data(benchmarks):
             else:
                 rel_data[bench] = 0.0
 
+        if gp['stream']:
+            stream_result(bench, raw_section_data[bench], raw_totals[bench],
+                          baseline.get(bench), cmp_totals.get(bench))
+
     # Output it
     if gp['output_format'] == output_format.JSON:
         log.info('{  "size results" :')
@@ -387,6 +458,14 @@ def collect_data(benchmarks):
                 log.info(f'  "{bench}" : {{\n{res_output}\n  }},')
         log.info('}')
 
+    # Change against the comparison build.  Baselines are always absolute, so
+    # are never compared.
+    if (gp['compare_bd_benchdir'] and
+            gp['output_format'] != output_format.BASELINE):
+        delta, delta_geomean = embench_delta(benchmarks, raw_totals, cmp_totals, 'size')
+        if gp['stream']:
+            gp['stream'].write('delta', changes=delta, geometric_mean=delta_geomean)
+
     if successful:
         return raw_totals, rel_data
 
@@ -423,13 +502,21 @@ def main():
     # as we collect the data, but it is clearer to do the three things
     # separately. Given the size of datasets with which we are concerned the
     # compute overhead is not significant.
+    stats = {}
     if raw_data:
         if gp['output_format'] != output_format.BASELINE:
             opt_comma = ',' if args.json_comma else ''
-            embench_stats(benchmarks, raw_data, rel_data, 'size', opt_comma)
+            stats = embench_stats(benchmarks, raw_data, rel_data, 'size', opt_comma)
             if gp['output_format'] == output_format.JSON: log.info('}')
             else: log.info('All benchmarks sized successfully')
-    else:
+
+    if gp['stream']:
+        gp['stream'].write(
+            'summary', successful=bool(raw_data), absolute=gp['absolute'], **stats
+        )
+        gp['stream'].close()
+
+    if not raw_data:
         log.info('ERROR: Failed to compute size benchmarks')
         sys.exit(1)
 
@@ -19,12 +19,16 @@ server to use as a target.
 """
 
 import argparse
+import asyncio
+import concurrent.futures
 import importlib
+import json
 import os
+import shutil
+import signal
 import subprocess
 import sys
-import threading
-import queue
+import time
 
 from json import loads
 
@@ -40,7 +44,15 @@ from embench_core import log_args
 from embench_core import find_benchmarks
 from embench_core import log_benchmarks
 from embench_core import embench_stats
+from embench_core import embench_delta
 from embench_core import output_format
+from embench_cache import ResultCache
+from embench_cache import file_hash
+from embench_history import RunHistory
+from embench_repeat import repetitions
+from embench_stream import ResultStream
+from embench_target import RunContext
+from embench_target import target_factory
 
 
 def get_common_args():
@@ -108,17 +120,64 @@ def get_common_args():
         action='store_false',
         help='Specify to not append a comma to the JSON output',
     )
+    parser.add_argument(
+        '--ndjson-output',
+        type=str,
+        help='File to which to write each result as a line of JSON as soon '
+        + 'as it is known, followed by a summary',
+    )
+    parser.add_argument(
+        '--result-cache',
+        type=str,
+        help='Directory holding a persistent cache of results.  A benchmark '
+        + 'whose executable, target module and target arguments match a '
+        + 'cached result is not run again',
+    )
+    parser.add_argument(
+        '--remeasure',
+        action='store_true',
+        help='Run every benchmark, even if its result is cached, and update '
+        + 'the cache',
+    )
     parser.add_argument(
         '--target-module',
         type=str,
         required=True,
         help='Python module with routines to run benchmarks',
     )
+    parser.add_argument(
+        '--compare-builddir',
+        type=str,
+        help='Directory holding the binaries of a build to compare against, '
+        + 'for example a separately compiled build when measuring a whole '
+        + 'program build',
+    )
     parser.add_argument(
         '--timeout',
         type=int,
         default=30,
-        help='Timeout used for running each benchmark program'
+        help='Timeout used for running each benchmark program, if it has no '
+        + 'timeout of its own from --timeout-history'
+    )
+    parser.add_argument(
+        '--timeout-history',
+        type=str,
+        help='File in which to record how long each benchmark takes to run on '
+        + 'each target, from which to predict a timeout for each benchmark'
+    )
+    parser.add_argument(
+        '--timeout-factor',
+        type=float,
+        default=3.0,
+        help='Multiple of the predicted run time of a benchmark to allow it '
+        + 'before it times out (default 3)'
+    )
+    parser.add_argument(
+        '--min-timeout',
+        type=float,
+        default=5.0,
+        help='Shortest timeout predicted for any benchmark, in seconds '
+        + '(default 5)'
     )
     parser.add_argument(
         '--sim-parallel',
@@ -132,6 +191,53 @@ def get_common_args():
         action='store_false',
         help='Launch all benchmarks in series (the default)'
     )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=0,
+        help='Number of benchmarks to run at once with --sim-parallel, each '
+        + 'pinned to its own set of cores (default one per available core)'
+    )
+    parser.add_argument(
+        '--reserve-cores',
+        type=int,
+        default=0,
+        help='Number of cores to reserve for this script with --sim-parallel, '
+        + 'on which no benchmark is run (default 0)'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=1,
+        help='Minimum number of times to run each benchmark (default 1)'
+    )
+    parser.add_argument(
+        '--max-repeat',
+        type=int,
+        help='Maximum number of times to run each benchmark.  Runs are added '
+        + 'until the confidence interval of the median is within '
+        + '--ci-threshold (default the value of --repeat)'
+    )
+    parser.add_argument(
+        '--ci-threshold',
+        type=float,
+        default=0.01,
+        help='Relative half width of the 95%% confidence interval of the '
+        + 'median at which to stop repeating a benchmark (default 0.01)'
+    )
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        help='Seconds after which to stop repeating a benchmark, even if its '
+        + 'confidence interval is still too wide (default no limit)'
+    )
+    parser.add_argument(
+        '--estimate',
+        choices=['median', 'min'],
+        default='median',
+        help='Which of the repeated times of a benchmark to use as its result '
+        + '(default median)'
+    )
 
     return parser.parse_known_args()
 
@@ -154,6 +260,17 @@ def validate_args(args):
         log.error(f'ERROR: Unable to read build directory {gp["bd"]}: exiting')
         sys.exit(1)
 
+    gp['compare_bd_benchdir'] = None
+    if args.compare_builddir:
+        if os.path.isabs(args.compare_builddir):
+            compare_bd = args.compare_builddir
+        else:
+            compare_bd = os.path.join(gp['rootdir'], args.compare_builddir)
+        if not os.path.isdir(compare_bd):
+            log.error(f'ERROR: comparison build directory {compare_bd} not found: exiting')
+            sys.exit(1)
+        gp['compare_bd_benchdir'] = os.path.join(compare_bd, 'src')
+
     if os.path.isabs(args.baselinedir):
         gp['baseline_dir'] = args.baselinedir
     else:
@@ -165,8 +282,47 @@ def validate_args(args):
     else:
         gp['output_format'] = output_format.TEXT
 
+    gp['stream'] = None
+    if args.ndjson_output:
+        if os.path.isabs(args.ndjson_output):
+            streamfile = args.ndjson_output
+        else:
+            streamfile = os.path.join(gp['rootdir'], args.ndjson_output)
+        try:
+            gp['stream'] = ResultStream(streamfile, 'speed')
+        except OSError as error:
+            log.error(f'ERROR: Unable to create {streamfile}: {error}: exiting')
+            sys.exit(1)
+
+    gp['result_cache'] = None
+    gp['remeasure'] = args.remeasure
+    if args.result_cache:
+        if os.path.isabs(args.result_cache):
+            cachedir = args.result_cache
+        else:
+            cachedir = os.path.join(gp['rootdir'], args.result_cache)
+        try:
+            gp['result_cache'] = ResultCache(cachedir)
+        except OSError as error:
+            log.error(f'ERROR: Unable to use result cache {cachedir}: {error}: exiting')
+            sys.exit(1)
+
     gp['timeout'] = args.timeout
+    gp['timeout_history'] = None
+    if args.timeout_history:
+        if args.timeout_factor <= 0 or args.min_timeout <= 0:
+            log.error('ERROR: Timeout factor and minimum timeout must be positive: exiting')
+            sys.exit(1)
+        if os.path.isabs(args.timeout_history):
+            gp['timeout_history'] = args.timeout_history
+        else:
+            gp['timeout_history'] = os.path.join(gp['rootdir'], args.timeout_history)
+    gp['timeout_factor'] = args.timeout_factor
+    gp['min_timeout'] = args.min_timeout
+    set_repetitions(args)
     gp['sim_parallel'] = args.sim_parallel
+    if args.sim_parallel:
+        set_core_sets(args.jobs, args.reserve_cores)
 
     try:
         newmodule = importlib.import_module(args.target_module)
@@ -176,70 +332,605 @@ def validate_args(args):
         )
         sys.exit(1)
 
-    globals()['get_target_args'] = newmodule.get_target_args
-    globals()['build_benchmark_cmd'] = newmodule.build_benchmark_cmd
-    globals()['decode_results'] = newmodule.decode_results
+    gp['target_module'] = args.target_module
+    gp['target_factory'] = target_factory(newmodule)
 
 
-def benchmark_speed(bench, target_args):
-    """Time the benchmark.  "target_args" is a namespace of arguments
-       specific to the target.  Result is a time in milliseconds, or zero on
-       failure.
+def available_cores():
+    """Return the sorted list of the cores this script may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
 
-       For the parallel option, this method must be thread-safe."""
-    succeeded = True
-    appdir = os.path.join(gp['bd_benchdir'], bench)
-    appexe = os.path.join(appdir, bench)
+    return list(range(os.cpu_count() or 1))
 
-    if os.path.isfile(appexe):
-        arglist = build_benchmark_cmd(bench, target_args)
-        try:
-            res = subprocess.run(
-                arglist,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=appdir,
-                timeout=gp['timeout'],
-            )
-            if res.returncode != 0:
-                log.warning(f'Warning: Run of {bench} failed.')
-                succeeded = False
-        except subprocess.TimeoutExpired:
-            log.warning(f'Warning: Run of {bench} timed out.')
-            succeeded = False
+
+def set_core_sets(jobs, reserve):
+    """Divide the available cores between the harness, which has the first
+       "reserve" cores, and "jobs" concurrent benchmark runs, each of which
+       has its own contiguous set of the remaining cores.  A value of 0 for
+       "jobs" means one run per remaining core.
+
+       Record how runs are pinned to their cores in "pin_method": "affinity"
+       if each runner thread sets its own affinity, which its children
+       inherit; "taskset" if each run is started with taskset; or None if
+       runs can't be pinned."""
+    cores = available_cores()
+    if reserve < 0 or reserve >= len(cores):
+        log.error(
+            f'ERROR: Cannot reserve {reserve} of the {len(cores)} available cores: exiting'
+        )
+        sys.exit(1)
+
+    gp['harness_cores'] = cores[:reserve]
+    cores = cores[reserve:]
+    if jobs <= 0:
+        jobs = len(cores)
+
+    if jobs <= len(cores):
+        # Spread any spare cores over the first sets
+        size, spare = divmod(len(cores), jobs)
+        gp['core_sets'] = []
+        start = 0
+        for job in range(jobs):
+            end = start + size + (1 if job < spare else 0)
+            gp['core_sets'].append(cores[start:end])
+            start = end
     else:
+        log.warning(
+            f'Warning: {jobs} jobs for {len(cores)} cores: benchmark runs will share cores'
+        )
+        gp['core_sets'] = [[cores[job % len(cores)]] for job in range(jobs)]
+
+    if hasattr(os, 'sched_setaffinity'):
+        gp['pin_method'] = 'affinity'
+    elif shutil.which('taskset'):
+        gp['pin_method'] = 'taskset'
+    else:
+        gp['pin_method'] = None
+        log.warning('Warning: Unable to pin benchmark runs to cores')
+
+    log.debug(f'Harness cores: {gp["harness_cores"]}')
+    for job, core_set in enumerate(gp['core_sets']):
+        log.debug(f'Job {job} cores: {core_set}')
+
+
+def set_repetitions(args):
+    """Check and record how many times each benchmark is run, and when to
+       stop repeating it"""
+    max_repeat = args.repeat if args.max_repeat is None else args.max_repeat
+    if args.repeat < 1 or max_repeat < args.repeat:
+        log.error(
+            f'ERROR: Cannot run benchmarks between {args.repeat} and {max_repeat} times: exiting'
+        )
+        sys.exit(1)
+    if args.ci_threshold <= 0:
+        log.error('ERROR: Confidence interval threshold must be positive: exiting')
+        sys.exit(1)
+    if args.time_budget is not None and args.time_budget <= 0:
+        log.error('ERROR: Time budget must be positive: exiting')
+        sys.exit(1)
+
+    gp['min_runs'] = args.repeat
+    gp['max_runs'] = max_repeat
+    gp['ci_threshold'] = args.ci_threshold
+    gp['time_budget'] = args.time_budget
+    gp['estimate'] = args.estimate
+
+
+def set_timeouts(benchmarks, baseline, target):
+    """Load the run time history of the target, if there is one, and set
+       the timeout of each benchmark whose run time can be predicted from it
+       and the baseline to a multiple of that time.  The rest use the
+       --timeout value."""
+    gp['history'] = None
+    gp['timeouts'] = {}
+    if not gp['timeout_history']:
+        return
+
+    target_dict = vars(target.args) if target.args is not None else {}
+    gp['cpu_mhz'] = target_dict.get('cpu_mhz') or 1
+    gp['history'] = RunHistory(
+        gp['timeout_history'], gp['target_module'], target_dict
+    )
+
+    for bench in benchmarks:
+        predicted = gp['history'].predict(bench, baseline, gp['cpu_mhz'])
+        if predicted is None:
+            log.debug(f'{bench}: timeout {gp["timeout"]}s (no run time history)')
+            continue
+        gp['timeouts'][bench] = max(gp['min_timeout'], gp['timeout_factor'] * predicted)
+        log.debug(
+            f'{bench}: timeout {gp["timeouts"][bench]:.1f}s (predicted {predicted:.2f}s)'
+        )
+
+
+def new_run(bench, target, bd_benchdir, job):
+    """Return the RunContext for a run of the benchmark, built in the
+       benchmark build directory "bd_benchdir", on "target" and "job" """
+    appdir = os.path.join(bd_benchdir, bench)
+    return RunContext(
+        bench,
+        appdir,
+        os.path.join(appdir, bench),
+        target.args,
+        job['cores'],
+        gp['timeouts'].get(bench, gp['timeout']),
+        job['number'],
+    )
+
+
+def benchmark_arglist(target, run):
+    """Return the command for "run", confined to its cores with taskset if
+       that is how runs are pinned"""
+    arglist = target.command(run)
+    if run.cores and gp['pin_method'] == 'taskset':
+        cpu_list = ','.join(str(core) for core in run.cores)
+        arglist = ['taskset', '-c', cpu_list] + arglist
+
+    return arglist
+
+
+def log_failed_run(arglist, stdout=None, stderr=None):
+    """Log the command and any output of a failed run for debugging"""
+    for arg in arglist:
+        if arg == arglist[0]:
+            comm = arg
+        elif arg == '-ex':
+            comm += ' ' + arg
+        else:
+            comm += " '" + arg + "'"
+
+    log.debug('Args to subprocess:')
+    log.debug(f'{comm}')
+    if stdout is not None:
+        log.debug(stdout.decode('utf-8'))
+        log.debug(stderr.decode('utf-8'))
+
+
+def kill_group(pgid):
+    """Kill every process in the process group "pgid", if any are left"""
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_command(arglist, appdir, cores, timeout):
+    """Run the command "arglist" in directory "appdir", confined to "cores"
+       if given, allowing it "timeout" seconds.  Return its exit code, stdout
+       and stderr.
+
+       The command is run in its own process group.  If it times out, or the
+       run is cancelled, the whole group is killed, including any children
+       such as a GDB server, and asyncio.TimeoutError or
+       asyncio.CancelledError is raised."""
+    preexec_fn = None
+    if cores and gp['pin_method'] == 'affinity':
+        def preexec_fn():
+            os.sched_setaffinity(0, cores)
+
+    proc = await asyncio.create_subprocess_exec(
+        *arglist,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=appdir,
+        start_new_session=True,
+        preexec_fn=preexec_fn,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except BaseException:
+        kill_group(proc.pid)
+        if proc.returncode is None:
+            await proc.wait()
+        raise
+
+    return proc.returncode, stdout, stderr
+
+
+def run_pinned(cores, func, *args):
+    """Call "func" with "args" in a thread confined to "cores", if given"""
+    if cores and gp['pin_method'] == 'affinity':
+        # Only affects this thread, and anything it starts
+        os.sched_setaffinity(0, cores)
+
+    return func(*args)
+
+
+async def benchmark_speed(bench, target, bd_benchdir, job):
+    """Time the benchmark, built in the benchmark build directory
+       "bd_benchdir", on "target" and "job", which gives the cores to run it
+       on, if any.  Result is a time in milliseconds, or zero on failure.
+
+       The target may run the benchmark itself, for example in a session
+       shared with other benchmarks, rather than with its command.  It is
+       called in the job's own thread.
+
+       The wall clock time of each successful run is recorded in the run
+       time history, if there is one."""
+    run = new_run(bench, target, bd_benchdir, job)
+
+    if not os.path.isfile(run.appexe):
         log.warning(f'Warning: {bench} executable not found.')
-        succeeded = False
+        return 0.0
 
-    # Process results
-    if succeeded:
-        exec_time = decode_results(
-            res.stdout.decode('utf-8'), res.stderr.decode('utf-8')
+    start = time.monotonic()
+    exec_time = await asyncio.get_event_loop().run_in_executor(
+        job['thread'], run_pinned, run.cores, target.run, run
+    )
+    if exec_time is not None:
+        if not exec_time:
+            log.warning(f'Warning: Run of {bench} failed.')
+        else:
+            record_run(bench, time.monotonic() - start)
+        return exec_time
+
+    arglist = benchmark_arglist(target, run)
+    try:
+        returncode, stdout, stderr = await run_command(
+            arglist, run.appdir, run.cores, run.timeout
         )
-        succeeded = exec_time > 0
+    except asyncio.TimeoutError:
+        log.warning(f'Warning: Run of {bench} timed out after {run.timeout:.1f}s.')
+        log_failed_run(arglist)
+        return 0.0
 
-    if succeeded:
+    # Process results as each run completes
+    if returncode != 0:
+        log.warning(f'Warning: Run of {bench} failed.')
+        log_failed_run(arglist, stdout, stderr)
+        return 0.0
+
+    exec_time = target.decode(run, stdout.decode('utf-8'), stderr.decode('utf-8'))
+    if exec_time > 0:
+        record_run(bench, time.monotonic() - start)
         return exec_time
+
+    log_failed_run(arglist, stdout, stderr)
+    return 0.0
+
+
+def record_run(bench, wall):
+    """Record that a run of the benchmark took "wall" seconds, if there is a
+       run time history"""
+    if gp['history']:
+        gp['history'].record(bench, wall, gp['cpu_mhz'])
+
+
+def enough_runs(samples, start):
+    """Return the repetitions, as given by repetitions, of a benchmark which
+       has given "samples" since time "start", or None if it needs another
+       run"""
+    return repetitions(
+        samples,
+        time.monotonic() - start,
+        gp['min_runs'],
+        gp['max_runs'],
+        gp['ci_threshold'],
+        gp['time_budget'],
+    )
+
+
+def estimate(bench, repeats):
+    """Return the chosen estimate of the time of the benchmark from its
+       repetitions, and the repetitions, or None if it was only run once"""
+    samples = repeats['samples']
+    if gp['max_runs'] == 1:
+        return samples[0], None
+
+    log.debug(
+        f'{bench}: {len(samples)} runs ({repeats["stopped"]}): '
+        + ', '.join(f'{sample}' for sample in samples)
+    )
+    return repeats[gp['estimate']], repeats
+
+
+async def measure_benchmark(bench, target, bd_benchdir, job):
+    """Time the benchmark as benchmark_speed does, repeating the run as
+       many times as requested.  Return the chosen estimate of its time, or
+       zero on failure, and the repetitions, as given by repetitions, or None
+       if the benchmark was only run once or failed."""
+    samples = []
+    start = time.monotonic()
+    while True:
+        exec_time = await benchmark_speed(bench, target, bd_benchdir, job)
+        if not exec_time:
+            return 0.0, None
+        samples.append(exec_time)
+        repeats = enough_runs(samples, start)
+        if repeats:
+            return estimate(bench, repeats)
+
+
+async def measure_batches(benchmarks, target, bd_benchdir, jobs, on_done):
+    """Time the benchmarks with the target's run_many, as measure_benchmark
+       does one at a time.  The benchmarks are shared between the jobs, each
+       running its share as one batch, and batches are repeated for the
+       benchmarks which need more runs.  Call "on_done" with each benchmark,
+       its time and its repetitions as soon as it is done.
+
+       Runs in a batch are not timed one by one, so are not recorded in the
+       run time history.  Return False, having run nothing, if the target
+       can't run batches."""
+    loop = asyncio.get_event_loop()
+    samples = {bench: [] for bench in benchmarks}
+    start = time.monotonic()
+    pending = [
+        bench for bench in benchmarks
+        if os.path.isfile(os.path.join(bd_benchdir, bench, bench))
+    ]
+    missing = [bench for bench in benchmarks if bench not in pending]
+
+    while pending:
+        size = -(-len(pending) // len(jobs))
+        batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+        outcomes = await asyncio.gather(*[
+            loop.run_in_executor(
+                job['thread'], run_pinned, job['cores'], target.run_many,
+                [new_run(bench, target, bd_benchdir, job) for bench in batch]
+            )
+            for job, batch in zip(jobs, batches)
+        ])
+        if outcomes[0] is None:
+            return False
+
+        for bench in missing:
+            log.warning(f'Warning: {bench} executable not found.')
+            on_done(bench, 0.0, None)
+        missing = []
+
+        pending = []
+        for batch, outcome in zip(batches, outcomes):
+            for bench, exec_time in zip(batch, outcome):
+                if not exec_time:
+                    log.warning(f'Warning: Run of {bench} failed.')
+                    on_done(bench, 0.0, None)
+                    continue
+                samples[bench].append(exec_time)
+                repeats = enough_runs(samples[bench], start)
+                if repeats:
+                    on_done(bench, *estimate(bench, repeats))
+                else:
+                    pending.append(bench)
+
+    # If there was nothing to run, the missing benchmarks are still to report
+    return not missing
+
+
+def create_jobs():
+    """Return the jobs on which benchmarks are run: one for each set of
+       cores in parallel, or a single job, on any core, in series.  Each job
+       has a number, and a thread of its own for targets which run
+       benchmarks themselves."""
+    if not gp['sim_parallel']:
+        core_sets = [None]
     else:
-        for arg in arglist:
-            if arg == arglist[0]:
-                comm = arg
-            elif arg == '-ex':
-                comm += ' ' + arg
+        core_sets = gp['core_sets']
+        if gp['harness_cores'] and gp['pin_method'] == 'affinity':
+            os.sched_setaffinity(0, gp['harness_cores'])
+
+    jobs = []
+    for number, cores in enumerate(core_sets):
+        thread = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        jobs.append({'number': number, 'cores': cores, 'thread': thread})
+
+    return jobs
+
+
+def close_jobs(jobs, target, wait=True):
+    """Release the jobs, and anything the target holds open"""
+    target.close()
+    for job in jobs:
+        job['thread'].shutdown(wait=wait)
+
+
+def result_key(bench, target, bd_benchdir):
+    """Return the result cache key for the benchmark, built in the benchmark
+       build directory "bd_benchdir": a hash of its executable, the target
+       module and its arguments, and how runs are repeated.  Return None if
+       there is no result cache, or no executable."""
+    if not gp['result_cache']:
+        return None
+
+    try:
+        exe_hash = file_hash(os.path.join(bd_benchdir, bench, bench))
+    except OSError:
+        return None
+
+    settings = {
+        'target_module': gp['target_module'],
+        'target_args': vars(target.args) if target.args is not None else None,
+        'repeat': [gp['min_runs'], gp['max_runs'], gp['ci_threshold'],
+                   gp['time_budget'], gp['estimate']],
+    }
+    return gp['result_cache'].key(
+        exe_hash, json.dumps(settings, sort_keys=True, default=str)
+    )
+
+
+async def run_all(benchmarks, target, bd_benchdir, jobs, on_result):
+    """Time all the benchmarks in "benchmarks" on "target" and "jobs",
+       reusing cached results where possible.  The benchmarks are run in
+       batches if the target can, and otherwise one at a time on each job.
+       If "on_result" is not None, call it with each benchmark, its time,
+       its repetitions and whether it was cached as soon as it is done."""
+    results = {}
+    keys = {}
+    to_run = []
+    for bench in benchmarks:
+        keys[bench] = result_key(bench, target, bd_benchdir)
+        cached = None
+        if keys[bench] and not gp['remeasure']:
+            cached = gp['result_cache'].fetch(keys[bench])
+        if cached:
+            results[bench] = (cached['time'], cached['repeats'], True)
+            if on_result:
+                on_result(bench, *results[bench])
+        else:
+            to_run.append(bench)
+
+    def done(bench, exec_time, repeats):
+        # Only successful results are worth keeping
+        if keys[bench] and exec_time:
+            gp['result_cache'].store(
+                keys[bench], {'benchmark': bench, 'time': exec_time, 'repeats': repeats}
+            )
+        results[bench] = (exec_time, repeats, False)
+        if on_result:
+            on_result(bench, *results[bench])
+
+    if to_run and await measure_batches(to_run, target, bd_benchdir, jobs, done):
+        return results
+
+    semaphore = asyncio.Semaphore(len(jobs))
+    free_jobs = list(jobs)
+
+    async def run_one(bench):
+        async with semaphore:
+            job = free_jobs.pop(0)
+            try:
+                exec_time, repeats = await measure_benchmark(
+                    bench, target, bd_benchdir, job
+                )
+            finally:
+                free_jobs.append(job)
+
+        return bench, exec_time, repeats
+
+    tasks = [asyncio.ensure_future(run_one(bench)) for bench in to_run]
+    try:
+        for future in asyncio.as_completed(tasks):
+            done(*await future)
+    except asyncio.CancelledError:
+        # Let every run kill its command before giving up
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    return results
+
+
+def run_benchmarks(benchmarks, target, bd_benchdir, jobs, on_result=None):
+    """Time all the benchmarks in "benchmarks", built in the benchmark build
+       directory "bd_benchdir", on "target" and "jobs", calling "on_result",
+       if given, as each is done, as run_all does.  Return a dictionary of
+       the raw time for each benchmark, which is zero if it failed, a
+       dictionary of the repetitions of each benchmark that was run more
+       than once, and the list of benchmarks whose result was cached.
+
+       On an interrupt, all runs are cancelled and killed before exiting."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    main_task = loop.create_task(
+        run_all(benchmarks, target, bd_benchdir, jobs, on_result)
+    )
+    try:
+        results = loop.run_until_complete(main_task)
+    except KeyboardInterrupt:
+        main_task.cancel()
+        loop.run_until_complete(asyncio.gather(main_task, return_exceptions=True))
+        close_jobs(jobs, target, wait=False)
+        log.error('ERROR: Interrupted: exiting')
+        sys.exit(1)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+    raw_data = {}
+    repeat_data = {}
+    cached = []
+    for bench in benchmarks:
+        raw_data[bench], repeats, was_cached = results[bench]
+        if repeats:
+            repeat_data[bench] = repeats
+        if was_cached:
+            cached.append(bench)
+
+    return raw_data, repeat_data, cached
+
+
+def report_cached(build, benchmarks, cached):
+    """Report which of the results of "build" came from the result cache.
+       Only plain text output has room for the report; otherwise it is only
+       logged."""
+    if not gp['result_cache']:
+        return
+
+    report = log.info if gp['output_format'] == output_format.TEXT else log.debug
+    report(
+        f'Result cache: {len(cached)} of {len(benchmarks)} {build} results reused'
+        + (': ' + ', '.join(cached) if cached else '')
+    )
+
+
+def output_repetitions(benchmarks, repeat_data):
+    """Output the number of runs, the median and minimum time and the
+       confidence interval of the median of each benchmark that was run more
+       than once."""
+    def fmt(value):
+        return 'null' if value is None else f'{value:.2f}'
+
+    if gp['output_format'] == output_format.JSON:
+        log.info('    "speed repetitions" :')
+        repeated = [bench for bench in benchmarks if bench in repeat_data]
+        for bench in repeated:
+            rep = repeat_data[bench]
+            prefix = '    { ' if bench == repeated[0] else '      '
+            suffix = '' if bench == repeated[-1] else ','
+            log.info(
+                f'{prefix}"{bench}" : {{ "runs" : {len(rep["samples"])}, '
+                + f'"median" : {fmt(rep["median"])}, "min" : {fmt(rep["min"])}, '
+                + f'"ci low" : {fmt(rep["ci_low"])}, "ci high" : {fmt(rep["ci_high"])}, '
+                + f'"stopped" : "{rep["stopped"]}" }}{suffix}'
+            )
+        if not repeated:
+            log.info('    {')
+        log.info('    },')
+    elif gp['output_format'] == output_format.TEXT:
+        log.info('Benchmark         Runs       Median          Min  95% CI')
+        log.info('---------         ----       ------          ---  ------')
+        for bench in benchmarks:
+            if bench not in repeat_data:
+                log.info(f'{bench:15}')
+                continue
+            rep = repeat_data[bench]
+            if rep['ci_low'] is None:
+                interval = '-'
             else:
-                comm += " '" + arg + "'"
+                interval = f'{rep["ci_low"]:,.2f} - {rep["ci_high"]:,.2f}'
+            log.info(
+                f'{bench:15}  {len(rep["samples"]):5}  {rep["median"]:11,.2f}  '
+                + f'{rep["min"]:11,.2f}  {interval}'
+            )
+
+
+def stream_result(build, baseline):
+    """Return a function to write each result of "build" to the result
+       stream, with its time relative to "baseline", or None if there is no
+       result stream"""
+    if not gp['stream']:
+        return None
+
+    def write_result(bench, exec_time, repeats, cached):
+        fields = {
+            'benchmark': bench,
+            'build': build,
+            'raw': exec_time or None,
+            'relative': None,
+            'cached': cached,
+        }
+        if exec_time and baseline.get(bench):
+            fields['relative'] = baseline[bench] / exec_time
+        if repeats:
+            fields['runs'] = len(repeats['samples'])
+            for key in ['median', 'min', 'ci_low', 'ci_high', 'stopped']:
+                fields[key] = repeats[key]
+        gp['stream'].write('result', **fields)
+
+    return write_result
 
-        log.debug('Args to subprocess:')
-        log.debug(f'{comm}')
-        if 'res' in locals():
-            log.debug(res.stdout.decode('utf-8'))
-            log.debug(res.stderr.decode('utf-8'))
-        return 0.0
 
-def run_threads(bench, target_args, data_collect_q):
-    item = benchmark_speed(bench, target_args)
-    data_collect_q.put_nowait([bench, item])
-    
 def collect_data(benchmarks, remnant):
     """Collect and log all the raw and optionally relative data associated with
        the list of benchmarks supplied in the "benchmarks" argument. "remant"
@@ -255,34 +946,33 @@ def collect_data(benchmarks, remnant):
     with open(speed_baseline) as fileh:
         baseline = loads(fileh.read())
 
-    # Parse target specific args
-    target_args = get_target_args(remnant)
+    # The target, which parses its specific args
+    target = gp['target_factory'](remnant)
+
+    # Timeouts of each benchmark on this target
+    set_timeouts(benchmarks, baseline, target)
 
     # Collect data
     successful = True
-    raw_data = {}
+    jobs = create_jobs()
+    raw_data, repeat_data, cached = run_benchmarks(
+        benchmarks, target, gp['bd_benchdir'], jobs, stream_result('main', baseline)
+    )
+    report_cached('main', benchmarks, cached)
     rel_data = {}
 
-    # Run the benchmarks in parallel
-    if gp['sim_parallel']:
-        collect_data_q = queue.Queue()
-        benchmark_threads = list()
-        for bench in benchmarks:
-            curr_thread = threading.Thread(target=run_threads, args=(bench, target_args, collect_data_q))
-            benchmark_threads.append(curr_thread)
-            curr_thread.start()
-        # Join threads
-        for thd in benchmark_threads:
-            thd.join() 
-        # All thread have returned
-        # Go through Q and make sure all benchmarks returned
-        while not collect_data_q.empty():
-            [bench_id, raw_score] = collect_data_q.get()
-            raw_data[bench_id] = raw_score
-    # Run the benchmarks in serial
-    else: 
-        for bench in benchmarks:
-            raw_data[bench] = benchmark_speed(bench, target_args)
+    # And for the build to compare against, if any
+    cmp_data = {}
+    if gp['compare_bd_benchdir']:
+        cmp_data, _, cached = run_benchmarks(
+            benchmarks, target, gp['compare_bd_benchdir'], jobs,
+            stream_result('compare', baseline)
+        )
+        report_cached('compare', benchmarks, cached)
+
+    close_jobs(jobs, target)
+    if gp['history']:
+        gp['history'].save()
 
     for bench in benchmarks:
         rel_data[bench] = 0.0
@@ -335,6 +1025,18 @@ def collect_data(benchmarks, remnant):
                 log.info(f'  "{bench}" : {raw_data[bench]},')
         log.info('}')
 
+    # Spread of the repeated runs.  Baselines are a single time per benchmark.
+    if gp['max_runs'] > 1 and gp['output_format'] != output_format.BASELINE:
+        output_repetitions(benchmarks, repeat_data)
+
+    # Change against the comparison build.  Baselines are always absolute, so
+    # are never compared.
+    if (gp['compare_bd_benchdir'] and
+            gp['output_format'] != output_format.BASELINE):
+        delta, delta_geomean = embench_delta(benchmarks, raw_data, cmp_data, 'speed')
+        if gp['stream']:
+            gp['stream'].write('delta', changes=delta, geometric_mean=delta_geomean)
+
     if successful:
         return raw_data, rel_data
 
@@ -371,13 +1073,21 @@ def main():
     # as we collect the data, but it is clearer to do the three things
     # separately. Given the size of datasets with which we are concerned the
     # compute overhead is not significant.
+    stats = {}
     if raw_data:
         if gp['output_format'] != output_format.BASELINE:
             opt_comma = ',' if args.json_comma else ''
-            embench_stats(benchmarks, raw_data, rel_data, 'speed', opt_comma)
+            stats = embench_stats(benchmarks, raw_data, rel_data, 'speed', opt_comma)
             if gp['output_format'] == output_format.JSON: log.info('}')
             else: log.info('All benchmarks run successfully')
-    else:
+
+    if gp['stream']:
+        gp['stream'].write(
+            'summary', successful=bool(raw_data), absolute=gp['absolute'], **stats
+        )
+        gp['stream'].close()
+
+    if not raw_data:
         log.info('ERROR: Failed to compute speed benchmarks')
         sys.exit(1)
 
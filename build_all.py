@@ -17,10 +17,16 @@ Build all Embench programs.
 
 
 import argparse
+import hashlib
 import os
+import re
+import shlex
 import shutil
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 
 sys.path.append(
     os.path.join(os.path.abspath(os.path.dirname(__file__)), 'pylib')
@@ -34,6 +40,19 @@ from embench_core import log_args
 from embench_core import find_benchmarks
 from embench_core import log_benchmarks
 from embench_core import arglist_to_str
+from embench_cache import ObjectCache
+from embench_cache import compiler_identity
+from embench_graph import BuildGraph
+from embench_graph import parse_depfile
+from embench_graph import tool_stamp
+from embench_jobs import Job
+from embench_jobs import run_jobs
+from embench_manifest import BuildManifest
+from embench_executor import LocalExecutor
+from embench_executor import PoolExecutor
+from embench_executor import SocketExecutor
+from embench_executor import parse_endpoint
+from embench_trace import BuildTrace
 
 
 def build_parser():
@@ -67,6 +86,7 @@ def build_parser():
     )
     parser.add_argument('--cc', help='C compiler to use')
     parser.add_argument('--ld', help='Linker to use')
+    parser.add_argument('--ar', help='Archiver to use for the support archive')
     parser.add_argument('--cflags', help='Additional C compiler flags to use')
     parser.add_argument('--ldflags', help='Additional linker flags to use')
     parser.add_argument(
@@ -91,12 +111,20 @@ def build_parser():
     parser.add_argument(
         '--cc-output-pattern', help='Pattern to specify compiler output file',
     )
+    parser.add_argument(
+        '--cc-depfile-pattern',
+        help='Pattern to specify compiler dependency file output',
+    )
     parser.add_argument(
         '--ld-input-pattern', help='Pattern to specify linker input file',
     )
     parser.add_argument(
         '--ld-output-pattern', help='Pattern to specify linker output file',
     )
+    parser.add_argument(
+        '--ld-archive-pattern',
+        help='Pattern to specify the support archive to the linker',
+    )
     parser.add_argument('--user-libs', help='Additional libraries to use')
     parser.add_argument(
         '--dummy-libs', help='Dummy libraries to build and link'
@@ -109,6 +137,11 @@ def build_parser():
         type=int,
         help='Number of warmup loops to execute before benchmark',
     )
+    parser.add_argument(
+        '--result-record',
+        action='store_true',
+        help='Write a structured result record when each benchmark exits',
+    )
     parser.add_argument(
         '-v', '--verbose', action='store_true', help='More messages'
     )
@@ -121,32 +154,94 @@ def build_parser():
         default=5,
         help='Timeout used for the compiler and linker invocations'
     )
+    parser.add_argument(
+        '--executor',
+        type=str,
+        default='local',
+        choices=['local', 'pool', 'socket'],
+        help='Run compiler and linker commands directly (the default), from a '
+        + 'pool of local processes, or on the build workers given by --worker',
+    )
+    parser.add_argument(
+        '--worker',
+        action='append',
+        metavar='HOST:PORT',
+        help='Build worker to use with "--executor socket". May be repeated',
+    )
+    parser.add_argument(
+        '--build-mode',
+        type=str,
+        default='separate',
+        choices=['separate', 'lto', 'unity'],
+        help='Compile each file separately (the default), use link time '
+        + 'optimization of the benchmark and support code, or compile each '
+        + 'benchmark as a single unity translation unit',
+    )
+    parser.add_argument(
+        '--batch-compile',
+        action='store_true',
+        help='Compile all the files of each benchmark, and of each support '
+        + 'directory, with a single compiler invocation',
+    )
+    parser.add_argument(
+        '--config',
+        action='append',
+        metavar='NAME:OPTIONS',
+        help='Build configuration NAME, in its own subdirectory of the build '
+        + 'directory, adding OPTIONS to the command line. May be repeated to '
+        + 'build a matrix of configurations',
+    )
+    parser.add_argument(
+        '--support-archive',
+        action='store_true',
+        help='Build the support code once as an archive, shared by all builds '
+        + 'with the same support flags',
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory holding a persistent object cache, shared between '
+        + 'build directories and configurations',
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=1024,
+        help='Maximum size of the object cache in MiB',
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of compile and link jobs to run concurrently (0 to use '
+        + 'all available processors)',
+    )
 
     return parser
 
 
-def validate_args(args):
+def validate_args(conf, args):
     """Check that supplied args are all valid. By definition logging is
        working when we get here. Don't bother with build directory, since
        that will be checked when we create it.
 
-       Update the gp dictionary with all the useful info"""
-    gp['configdir'] = os.path.join(gp['rootdir'], 'config')
-    gp['bd_configdir'] = os.path.join(gp['bd'], 'config')
+       Update the configuration dictionary, "conf", with all the useful
+       info"""
+    conf['configdir'] = os.path.join(gp['rootdir'], 'config')
+    conf['bd_configdir'] = os.path.join(conf['bd'], 'config')
 
     # Architecture
     if not args.arch:
         log.error('ERROR: Null achitecture not permitted: exiting')
         sys.exit(1)
 
-    gp['archdir'] = os.path.join(gp['configdir'], args.arch)
-    gp['bd_archdir'] = os.path.join(gp['bd_configdir'], args.arch)
-    if not os.path.isdir(gp['archdir']):
-        choices = sorted(os.listdir(gp['configdir']))
+    conf['archdir'] = os.path.join(conf['configdir'], args.arch)
+    conf['bd_archdir'] = os.path.join(conf['bd_configdir'], args.arch)
+    if not os.path.isdir(conf['archdir']):
+        choices = sorted(os.listdir(conf['configdir']))
         _s = 'ERROR: Architecture "{arch}" not found. Valid choices are "{choices}": exiting'
         log.error(_s.format(arch=args.arch, choices='", "'.join(choices)))
         sys.exit(1)
-    if not os.access(gp['archdir'], os.R_OK):
+    if not os.access(conf['archdir'], os.R_OK):
         log.error('ERROR: Unable to read achitecture "{arch}": exiting'.format(arch=args.arch))
         sys.exit(1)
 
@@ -154,16 +249,16 @@ def validate_args(args):
     if not args.chip:
         log.error('ERROR: Null chip not permitted: exiting')
 
-    gp['chipdir'] = os.path.join(gp['archdir'], 'chips', args.chip)
-    gp['bd_chipdir'] = os.path.join(gp['bd_archdir'], 'chips', args.chip)
-    if not os.path.isdir(gp['chipdir']):
-        choices = sorted(os.listdir(os.path.join(gp['archdir'], 'chips')))
+    conf['chipdir'] = os.path.join(conf['archdir'], 'chips', args.chip)
+    conf['bd_chipdir'] = os.path.join(conf['bd_archdir'], 'chips', args.chip)
+    if not os.path.isdir(conf['chipdir']):
+        choices = sorted(os.listdir(os.path.join(conf['archdir'], 'chips')))
         _s = 'ERROR: Chip "{chip}" not found for architecture "{arch}". Valid choices are "{choices}": exiting'
         log.error(_s.format(chip    = args.chip,
                             arch    = args.arch,
                             choices = '", "'.join(choices)))
         sys.exit(1)
-    if not os.access(gp['chipdir'], os.R_OK):
+    if not os.access(conf['chipdir'], os.R_OK):
         log.error(
             'ERROR: Unable to read chip "{chip}" for architecture "{arch}": exiting'.format(chip=args.chip, arch=args.arch)
         )
@@ -173,29 +268,21 @@ def validate_args(args):
     if not args.board:
         log.error('ERROR: Null board not permitted: exiting')
 
-    gp['boarddir'] = os.path.join(gp['archdir'], 'boards', args.board)
-    gp['bd_boarddir'] = os.path.join(gp['bd_archdir'], 'boards', args.board)
-    if not os.path.isdir(gp['boarddir']):
-        choices = sorted(os.listdir(os.path.join(gp['archdir'], 'boards')))
+    conf['boarddir'] = os.path.join(conf['archdir'], 'boards', args.board)
+    conf['bd_boarddir'] = os.path.join(conf['bd_archdir'], 'boards', args.board)
+    if not os.path.isdir(conf['boarddir']):
+        choices = sorted(os.listdir(os.path.join(conf['archdir'], 'boards')))
         _s = 'ERROR: Board "{board}" not found for architecture "{arch}". Valid choices are "{choices}": exiting'
         log.error(_s.format(board   = args.board,
                             arch    = args.arch,
                             choices = '", "'.join(choices)))
         sys.exit(1)
-    if not os.access(gp['boarddir'], os.R_OK):
+    if not os.access(conf['boarddir'], os.R_OK):
         log.error(
             'ERROR: Unable to read board "{board}" for architecture "{arch}": exiting'.format(board=args.board, arch=args.arch)
         )
         sys.exit(1)
 
-    # The supplementary environment
-    gp['env'] = dict()
-    if args.env:
-        envlist = args.env.split(',')
-        for envarg in envlist:
-            var, val = envarg.split('=', 1)
-            gp['env'][var] = val
-
     # Other args validated later.
 
 
@@ -246,12 +333,17 @@ def populate_defaults():
     conf['cc_incdir_pattern'] = '-I{0}'
     conf['cc_input_pattern'] = '{0}'
     conf['cc_output_pattern'] = '-o {0}'
+    conf['cc_depfile_pattern'] = '-MMD -MF {0}'
+    conf['cc_batch_depfile_flags'] = '-MMD'
+    conf['lto_flags'] = ['-flto']
     conf['ld_input_pattern'] = '{0}'
     conf['ld_output_pattern'] = '-o {0}'
+    conf['ld_archive_pattern'] = '-Wl,--whole-archive {0} -Wl,--no-whole-archive'
     conf['user_libs'] = {}
     conf['dummy_libs'] = {}
     conf['cpu_mhz'] = 1
     conf['warmup_heat'] = 1
+    conf['result_record'] = False
     conf['timeout'] = 5
 
     return conf
@@ -264,6 +356,8 @@ def populate_user_commands(conf, args):
         conf['cc'] = args.cc
     if args.ld:
         conf['ld'] = args.ld
+    if args.ar:
+        conf['ar'] = args.ar
 
     return conf
 
@@ -294,10 +388,14 @@ def populate_user_patterns(conf, args):
         conf['cc_input_pattern'] = args.cc_input_pattern
     if args.cc_output_pattern:
         conf['cc_output_pattern'] = args.cc_output_pattern
+    if args.cc_depfile_pattern is not None:
+        conf['cc_depfile_pattern'] = args.cc_depfile_pattern
     if args.ld_input_pattern:
         conf['ld_input_pattern'] = args.ld_input_pattern
     if args.ld_output_pattern:
         conf['ld_output_pattern'] = args.ld_output_pattern
+    if args.ld_archive_pattern:
+        conf['ld_archive_pattern'] = args.ld_archive_pattern
 
     return conf
 
@@ -322,6 +420,8 @@ def populate_user_defs(conf, args):
         conf['cpu_mhz'] = args.cpu_mhz
     if args.warmup_heat:
         conf['warmup_heat'] = args.warmup_heat
+    if args.result_record:
+        conf['result_record'] = True
     if args.timeout:
         conf['timeout'] = args.timeout
 
@@ -341,37 +441,57 @@ def populate_user(args):
     return conf
 
 
-def add_internal_flags():
+def add_internal_flags(conf):
     """Add internal flag values to the command line."""
     for dirname in ['supportdir', 'boarddir', 'chipdir', 'archdir']:
-        flag = gp['cc_incdir_pattern'].format(gp[dirname]).split()
-        gp['cflags'].extend(flag)
+        flag = conf['cc_incdir_pattern'].format(conf[dirname]).split()
+        conf['cflags'].extend(flag)
 
     for dirname in ['cpu_mhz', 'warmup_heat']:
         dir_u = dirname.upper()
-        flagstr = gp['cc_define2_pattern'].format(dir_u, gp[dirname])
+        flagstr = conf['cc_define2_pattern'].format(dir_u, conf[dirname])
         flag = flagstr.split()
-        gp['cflags'].extend(flag)
+        conf['cflags'].extend(flag)
 
+    # Only when asked for, since support.h defaults it to 0
+    if conf['result_record']:
+        flagstr = conf['cc_define2_pattern'].format('RESULT_RECORD', 1)
+        conf['cflags'].extend(flagstr.split())
 
-def validate_tools():
+
+def default_archiver(cc):
+    """Return the archiver from the same toolchain as the compiler "cc",
+       e.g. "riscv32-unknown-elf-ar" for "riscv32-unknown-elf-gcc"."""
+    for suffix in ['gcc', 'clang', 'cc']:
+        if cc.endswith(suffix):
+            return cc[:-len(suffix)] + 'ar'
+
+    return 'ar'
+
+
+def validate_tools(conf):
     """Check the compiler and linker are available."""
     # Validate C compiler
-    if not shutil.which(gp['cc']):
-        log.error('ERROR: Compiler {cc} not found on path: exiting'.format(cc=gp["cc"]))
+    if not shutil.which(conf['cc']):
+        log.error('ERROR: Compiler {cc} not found on path: exiting'.format(cc=conf['cc']))
         sys.exit(1)
 
     # Validate linker
-    if not shutil.which(gp['ld']):
-        log.error('ERROR: Linker {ld} not found on path: exiting'.format(ld=gp["ld"]))
+    if not shutil.which(conf['ld']):
+        log.error('ERROR: Linker {ld} not found on path: exiting'.format(ld=conf['ld']))
+        sys.exit(1)
+
+    # Validate archiver, which is only needed for a support archive
+    if conf['support_archive'] and not shutil.which(conf['ar']):
+        log.error('ERROR: Archiver {ar} not found on path: exiting'.format(ar=conf['ar']))
         sys.exit(1)
 
 
-def set_parameters(args):
+def set_parameters(conf, args):
     """Determine all remaining parameters"""
     # Directories we need
-    gp['supportdir'] = os.path.join(gp['rootdir'], 'support')
-    gp['bd_supportdir'] = os.path.join(gp['bd'], 'support')
+    conf['supportdir'] = os.path.join(gp['rootdir'], 'support')
+    conf['bd_supportdir'] = os.path.join(conf['bd'], 'support')
 
     # Default values of parameters
     config = {}
@@ -379,13 +499,13 @@ def set_parameters(args):
 
     # Read each config file. Note that we pass in the config file itself as
     # local dictionary, since then it won't get filled with global variables.
-    for conf in ['arch', 'chip', 'board']:
-        config[conf] = {}
-        conf_file = os.path.join(gp[conf + 'dir'], conf + '.cfg')
+    for level in ['arch', 'chip', 'board']:
+        config[level] = {}
+        conf_file = os.path.join(conf[level + 'dir'], level + '.cfg')
         if os.path.isfile(conf_file):
             with open(conf_file) as fileh:
                 try:
-                    exec(fileh.read(), globals(), config[conf])
+                    exec(fileh.read(), globals(), config[level])
                 except PermissionError:
                     log.error('ERROR: Corrupt config file {conf_file}: exiting')
                     sys.exit(1)
@@ -396,111 +516,462 @@ def set_parameters(args):
     # Priority is in increasing priority: default, arch, chip, board,
     # user. Flags are different in that they are additive. All others later
     # values replace earlier ones.
-    gp['cflags'] = []
-    gp['ldflags'] = []
+    conf['cflags'] = []
+    conf['ldflags'] = []
 
-    for conf in ['default', 'arch', 'chip', 'board', 'user']:
-        for key, val in config[conf].items():
+    for level in ['default', 'arch', 'chip', 'board', 'user']:
+        for key, val in config[level].items():
             if (key == 'cflags') or (key == 'ldflags'):
-                gp[key].extend(val)
+                conf[key].extend(val)
             else:
-                gp[key] = val
+                conf[key] = val
 
     # Linker should match compiler if it hasn't been set
-    if 'ld' not in gp:
-        gp['ld'] = gp['cc']
+    if 'ld' not in conf:
+        conf['ld'] = conf['cc']
+
+    # Archiver should be from the same toolchain as the compiler if it hasn't
+    # been set
+    if 'ar' not in conf:
+        conf['ar'] = default_archiver(conf['cc'])
+    conf['support_archive'] = args.support_archive
+    conf['batch_compile'] = args.batch_compile
+
+    # Whole program optimization applies to the support code as well as the
+    # benchmark
+    conf['build_mode'] = args.build_mode
+    if conf['build_mode'] == 'lto':
+        conf['cflags'].extend(conf['lto_flags'])
+        conf['ldflags'].extend(conf['lto_flags'])
 
     # Add our own flags to the command line, then validate the tools
-    add_internal_flags()
-    validate_tools()
+    add_internal_flags(conf)
+    validate_tools(conf)
 
 
-def log_parameters():
-    """Record all the global parameters in the log"""
-    log.debug('Global parameters')
-    log.debug('=================')
+def log_parameters(conf):
+    """Record all the global parameters and those of the configuration,
+       "conf", in the log"""
+    if conf['name']:
+        title = 'Parameters for configuration {name}'.format(name=conf['name'])
+    else:
+        title = 'Global parameters'
+    log.debug(title)
+    log.debug('=' * len(title))
 
     for key, val in gp.items():
         log.debug('{key:<21}: {val}'.format(key=key, val=val))
+    for key, val in conf.items():
+        log.debug('{key:<21}: {val}'.format(key=key, val=val))
 
     log.debug('')
 
 
-def set_environ():
-    """Add additional environment variables, if any"""
+def set_environ(args):
+    """Add additional environment variables from the command line arguments,
+       "args", if any"""
+    gp['env'] = dict()
+    if args.env:
+        envlist = args.env.split(',')
+        for envarg in envlist:
+            var, val = envarg.split('=', 1)
+            gp['env'][var] = val
+
     for key in gp['env']:
         os.environ[key] = gp['env'][key]
 
 
-def compile_file(f_root, srcdir, bindir, suffix='.c'):
-    """Compile a single C or assembler file, with the given file root, "f_root",
-       suffix "suffix", from the source directory, "srcdir", in to the bin
-       directory, "bindir" using the general preprocessor and C compilation
-       flags.
+def execute(arglist, cwd, timeout):
+    """Run the command "arglist" in directory "cwd" with the build executor,
+       allowing it "timeout" seconds, and add its resource usage to the job
+       running it in the build trace.  Results are as for subprocess.run."""
+    try:
+        res = gp['executor'].run(arglist, cwd=cwd, timeout=timeout)
+    except subprocess.TimeoutExpired as error:
+        gp['trace'].account(getattr(error, 'usage', None))
+        raise
 
-       Return True if the compilation success, False if it fails. Log
-       everything in the event of failure
+    gp['trace'].account(res.usage)
+    return res
 
-    """
+
+def preprocess_file(conf, abs_src, suffix, bindir):
+    """Return the preprocessed text of the source file "abs_src", with suffix
+       "suffix", as bytes, for use in computing its object cache key.  Plain
+       assembler is not preprocessed, so its text is returned as is.
+
+       Return None if preprocessing fails."""
+    if suffix == '.s':
+        with open(abs_src, 'rb') as fileh:
+            return fileh.read()
+
+    # Preprocess with the compilation flags, less the flag to compile.
+    arglist = [conf['cc']]
+    arglist.extend(flag for flag in conf['cflags'] if flag != '-c')
+    arglist.append('-E')
+    arglist.extend(conf['cc_input_pattern'].format(abs_src).split())
+
+    try:
+        res = execute(
+            arglist,
+            cwd=bindir,
+            timeout=conf['timeout'],
+        )
+    except subprocess.TimeoutExpired:
+        return None
+
+    if res.returncode != 0:
+        return None
+
+    return res.stdout
+
+
+def object_cache_key(conf, arglist, abs_src, suffix, bindir):
+    """Return the object cache key for compiling "abs_src" with the
+       arguments "arglist" in directory "bindir", or None if no key could be
+       computed.  The key covers the preprocessed source, and so any headers
+       it includes, the complete argument list and the compiler identity."""
+    text = preprocess_file(conf, abs_src, suffix, bindir)
+    if text is None:
+        return None
+
+    return gp['cache'].key(conf['cc_identity'], '\0'.join(arglist), text)
+
+
+def compile_deps(abs_src, abs_dep, bindir):
+    """Return the list of files on which the object compiled from "abs_src"
+       depends, using the dependency file "abs_dep" written by the compiler if
+       there is one.  Relative names are relative to "bindir"."""
+    deps = [abs_src]
+    if abs_dep:
+        for dep in parse_depfile(abs_dep) or []:
+            dep = os.path.normpath(os.path.join(bindir, dep))
+            if dep not in deps:
+                deps.append(dep)
+
+    return deps
+
+
+def compile_arglist(conf, f_root, abs_src):
+    """Return the argument list to compile the source file "abs_src" to an
+       object with the file root, "f_root", for configuration "conf"."""
+    arglist = [conf['cc']]
+    arglist.extend(conf['cflags'])
+    arglist.extend(conf['cc_output_pattern'].format('{root}.o'.format(root=f_root)).split())
+
+    # Have the compiler tell us which headers were used, if it can
+    if conf['cc_depfile_pattern']:
+        arglist.extend(conf['cc_depfile_pattern'].format('{root}.d'.format(root=f_root)).split())
+
+    arglist.extend(conf['cc_input_pattern'].format(abs_src).split())
+
+    return arglist
+
+
+def object_files(conf, f_root, srcdir, bindir, suffix):
+    """Return the names of the source file, the object and the dependency
+       file, or None if there is none, for compiling the file root "f_root"
+       with suffix "suffix" from "srcdir" into "bindir"."""
     abs_src = os.path.join(srcdir, '{root}{suff}'.format(root=f_root, suff=suffix))
     abs_bin = os.path.join(bindir, '{root}.o'.format(root=f_root))
+    abs_dep = None
+    if conf['cc_depfile_pattern']:
+        abs_dep = os.path.join(bindir, '{root}.d'.format(root=f_root))
+
+    return abs_src, abs_bin, abs_dep
+
+
+def reuse_object(conf, f_root, srcdir, bindir, suffix):
+    """Try to avoid compiling the file root "f_root" with suffix "suffix"
+       from "srcdir" into "bindir".  This is possible if the build graph shows
+       the object is up to date, meaning it was built with the same arguments
+       and neither the source nor any header it includes has changed since,
+       or if the object is in the object cache.
+
+       Return a tuple of True if the object is available, and otherwise the
+       object cache key under which to store it once compiled, or None."""
+    abs_src, abs_bin, abs_dep = object_files(conf, f_root, srcdir, bindir, suffix)
+    arglist = compile_arglist(conf, f_root, abs_src)
+
+    if conf['graph'].object_up_to_date(abs_bin, arglist):
+        return True, None
+
+    cache_key = None
+    if gp['cache']:
+        cache_key = object_cache_key(conf, arglist, abs_src, suffix, bindir)
+        if cache_key and gp['cache'].fetch(cache_key, abs_bin, abs_dep):
+            conf['graph'].record_object(
+                abs_bin, arglist, compile_deps(abs_src, abs_dep, bindir)
+            )
+            return True, None
+
+    return False, cache_key
+
+
+def record_compiled(conf, f_root, srcdir, bindir, suffix, cache_key):
+    """Record the successful compilation of the file root "f_root" with
+       suffix "suffix" from "srcdir" into "bindir" in the build graph, and add
+       the object to the object cache under "cache_key", if given."""
+    abs_src, abs_bin, abs_dep = object_files(conf, f_root, srcdir, bindir, suffix)
+    arglist = compile_arglist(conf, f_root, abs_src)
+
+    conf['graph'].record_object(
+        abs_bin, arglist, compile_deps(abs_src, abs_dep, bindir)
+    )
+    if cache_key:
+        gp['cache'].store(cache_key, abs_bin, abs_dep)
+
+
+def compile_object(conf, f_root, srcdir, bindir, suffix, cache_key):
+    """Run the compiler for the file root "f_root" with suffix "suffix" from
+       "srcdir" into "bindir", then record it with record_compiled.
 
-    # Construct the argument list
-    arglist = [gp["cc"]]
-    arglist.extend(gp['cflags'])
-    arglist.extend(gp['cc_output_pattern'].format('{root}.o'.format(root=f_root)).split())
-    arglist.extend(gp['cc_input_pattern'].format(abs_src).split())
+       Return True if the compilation success, False if it fails. Log
+       everything in the event of failure"""
+    abs_src, abs_bin, _ = object_files(conf, f_root, srcdir, bindir, suffix)
+    arglist = compile_arglist(conf, f_root, abs_src)
 
-    # Run the compilation, but only if the source file is newer than the
-    # binary.
     succeeded = True
     res = None
 
-    if not os.path.isfile(abs_bin) or (
-            os.path.getmtime(abs_src) > os.path.getmtime(abs_bin)
-    ):
-        if gp['verbose']:
-            log.debug('Compiling in directory {bin}'.format(bin=bindir))
-            log.debug(arglist_to_str(arglist))
+    if gp['verbose']:
+        log.debug('Compiling in directory {bin}'.format(bin=bindir))
+        log.debug(arglist_to_str(arglist))
 
-        try:
-            res = subprocess.run(
-                arglist,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=bindir,
-                timeout=gp['timeout'],
-            )
-            if res.returncode != 0:
-                log.warning(
-                    'Warning: Compilation of {root}{suff} from source directory {src} to binary directory {bin} failed'
-                        .format(root=f_root, suff=suffix, src=srcdir, bin=bindir)
-                )
-                succeeded = False
-        except subprocess.TimeoutExpired:
+    try:
+        res = execute(
+            arglist,
+            cwd=bindir,
+            timeout=conf['timeout'],
+        )
+        if res.returncode != 0:
             log.warning(
-                'Warning: Compilation of {root}{suff} from source directory {src} to binary directory {bin} timed out'
+                'Warning: Compilation of {root}{suff} from source directory {src} to binary directory {bin} failed'
                     .format(root=f_root, suff=suffix, src=srcdir, bin=bindir)
             )
             succeeded = False
+    except subprocess.TimeoutExpired:
+        log.warning(
+            'Warning: Compilation of {root}{suff} from source directory {src} to binary directory {bin} timed out'
+                .format(root=f_root, suff=suffix, src=srcdir, bin=bindir)
+        )
+        succeeded = False
 
-        if not succeeded:
-            log.debug('Command was:')
-            log.debug(arglist_to_str(arglist))
+    if not succeeded:
+        conf['graph'].record_object(abs_bin, arglist, None)
+        log.debug('Command was:')
+        log.debug(arglist_to_str(arglist))
 
+        if res:
             log.debug(res.stdout.decode('utf-8'))
             log.debug(res.stderr.decode('utf-8'))
+    else:
+        record_compiled(conf, f_root, srcdir, bindir, suffix, cache_key)
 
     return succeeded
 
 
-def compile_benchmark(bench):
-    """Compile the benchmark, "bench".
+def compile_file(conf, f_root, srcdir, bindir, suffix='.c'):
+    """Compile a single C or assembler file, with the given file root, "f_root",
+       suffix "suffix", from the source directory, "srcdir", in to the bin
+       directory, "bindir" using the general preprocessor and C compilation
+       flags.
+
+       The file is not compiled if the build graph shows the object is up to
+       date.  Otherwise, if there is an object cache, the object is taken
+       from the cache if present there, and added to the cache if not.
+
+       Return True if the compilation success, False if it fails. Log
+       everything in the event of failure
 
-       Return True if all files compile successfully, False otherwise."""
-    abs_src_b = os.path.join(gp['benchdir'], bench)
-    abs_bd_b = os.path.join(gp['bd_benchdir'], bench)
+    """
+    available, cache_key = reuse_object(conf, f_root, srcdir, bindir, suffix)
+    if available:
+        return True
+
+    return compile_object(conf, f_root, srcdir, bindir, suffix, cache_key)
+
+
+def batch_arglist(conf, jobs):
+    """Return the argument list to compile all the files of "jobs", each a
+       tuple of arguments to compile_file, with a single invocation of the
+       compiler.  The compiler names each object, and dependency file, after
+       its source file."""
+    arglist = [conf['cc']]
+    arglist.extend(conf['cflags'])
+    if conf['cc_depfile_pattern']:
+        arglist.extend(conf['cc_batch_depfile_flags'].split())
+    for f_root, srcdir, _, suffix in jobs:
+        abs_src = os.path.join(srcdir, '{root}{suff}'.format(root=f_root, suff=suffix))
+        arglist.extend(conf['cc_input_pattern'].format(abs_src).split())
+
+    return arglist
+
+
+def compile_batch(conf, jobs):
+    """Compile all the files of "jobs", each a tuple of arguments to
+       compile_file, all with the same bin directory, with a single
+       invocation of the compiler, saving the cost of starting the compiler
+       for each one.  Files which are up to date, or in the object cache, are
+       left out as usual.
+
+       If the batch fails, each file is compiled separately, so that the
+       failure is attributed to the right file.
+
+       Return a list of whether each file compiled successfully."""
+    results = [True] * len(jobs)
+    pending = []
+    for idx, job in enumerate(jobs):
+        available, cache_key = reuse_object(conf, *job)
+        if not available:
+            pending.append((idx, job, cache_key))
+
+    # Nothing to be gained from a batch of one
+    if len(pending) < 2:
+        for idx, job, cache_key in pending:
+            results[idx] = compile_object(conf, *job, cache_key)
+        return results
+
+    bindir = jobs[0][2]
+    arglist = batch_arglist(conf, [job for _, job, _ in pending])
     succeeded = True
+    res = None
+
+    if gp['verbose']:
+        log.debug('Compiling in directory {bin}'.format(bin=bindir))
+        log.debug(arglist_to_str(arglist))
+
+    start = time.monotonic()
+    try:
+        res = execute(
+            arglist,
+            cwd=bindir,
+            timeout=conf['timeout'] * len(pending),
+        )
+        succeeded = res.returncode == 0
+    except subprocess.TimeoutExpired:
+        succeeded = False
+    elapsed = time.monotonic() - start
+    startup = compiler_startup(conf) if succeeded else 0.0
+
+    with gp['batch_lock']:
+        stats = gp['batch_stats']
+        stats['batches'] += 1
+        stats['files'] += len(pending)
+        if succeeded:
+            stats['saved'] += (len(pending) - 1) * startup
+        else:
+            stats['failed'] += 1
+            stats['saved'] -= elapsed
+
+    if succeeded:
+        for idx, job, cache_key in pending:
+            record_compiled(conf, *job, cache_key)
+        return results
+
+    log.debug(
+        'Batched compilation in directory {bin} failed: compiling each file separately'.format(bin=bindir)
+    )
+    if res:
+        log.debug(res.stderr.decode('utf-8'))
+    for idx, job, cache_key in pending:
+        results[idx] = compile_object(conf, *job, cache_key)
+
+    return results
+
+
+def compiler_startup(conf):
+    """Return the wall time in seconds taken to compile an empty file with
+       configuration "conf".  This is the cost of starting the compiler,
+       saved for each file compiled as part of a batch.  It is measured the
+       first time it is needed, so only if a batch is compiled, and then
+       kept.
+
+       The compiler is run with the build executor, where the batches are
+       compiled, in a directory of the build directory so that a remote
+       worker can see it.  Zero is returned if it can't be run.  Threads
+       which need the time before it is first kept may each measure it,
+       which does no harm."""
+    if conf['cc_startup'] is not None:
+        return conf['cc_startup']
+
+    startup = 0.0
+    try:
+        with tempfile.TemporaryDirectory(dir=gp['bd']) as tmpdir:
+            abs_src = os.path.join(tmpdir, 'empty.c')
+            with open(abs_src, 'w'):
+                pass
+            arglist = compile_arglist(conf, 'empty', abs_src)
+            start = time.monotonic()
+            gp['executor'].run(arglist, cwd=tmpdir, timeout=conf['timeout'])
+            startup = time.monotonic() - start
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+    conf['cc_startup'] = startup
+    return startup
+
+
+def benchmark_sources(bench):
+    """Return the sorted list of the roots of the C source files of the
+       benchmark, "bench"."""
+    sources = []
+    for filename in os.listdir(os.path.join(gp['benchdir'], bench)):
+        f_root, ext = os.path.splitext(filename)
+        if ext == '.c':
+            sources.append(f_root)
+
+    return sorted(sources)
+
+
+def benchmark_objects(conf, bench):
+    """Return the list of object files of the benchmark, "bench", relative to
+       its build directory."""
+    if conf['build_mode'] == 'unity':
+        return ['{bench}-unity.o'.format(bench=bench)]
+
+    return ['{root}.o'.format(root=f_root) for f_root in benchmark_sources(bench)]
+
+
+def write_unity_source(bench, abs_src_b, abs_bd_b):
+    """Write the unity translation unit for the benchmark, "bench", with
+       source directory "abs_src_b", in its build directory "abs_bd_b".  This
+       includes every C source file of the benchmark, so the compiler sees the
+       whole benchmark at once.  The file is only written if its contents
+       change, so that it is not rebuilt needlessly.
+
+       Return the root of the file name."""
+    f_root = '{bench}-unity'.format(bench=bench)
+    lines = ['/* Unity translation unit for {bench}, generated by build_all.py */\n'
+             .format(bench=bench)]
+    for src_root in benchmark_sources(bench):
+        abs_src = os.path.join(abs_src_b, '{root}.c'.format(root=src_root))
+        lines.append('#include "{src}"\n'.format(src=abs_src))
+    text = ''.join(lines)
+
+    abs_unity = os.path.join(abs_bd_b, '{root}.c'.format(root=f_root))
+    try:
+        with open(abs_unity) as fileh:
+            if fileh.read() == text:
+                return f_root
+    except OSError:
+        pass
+
+    with open(abs_unity, 'w') as fileh:
+        fileh.write(text)
+
+    return f_root
+
+
+def benchmark_compile_jobs(conf, bench):
+    """Create the build directory for the benchmark, "bench", and return the
+       list of compilation jobs needed for it.  Each job is a tuple of the
+       arguments to compile_file.  In unity build mode, the only job is to
+       compile the generated unity translation unit.
+
+       Return None if the build directory could not be created."""
+    abs_src_b = os.path.join(gp['benchdir'], bench)
+    abs_bd_b = os.path.join(conf['bd_benchdir'], bench)
 
     if not os.path.isdir(abs_bd_b):
         try:
@@ -509,48 +980,53 @@ def compile_benchmark(bench):
             log.warning(
                 'Warning: Unable to create build directory for benchmark {bench}'.format(bench=bench)
             )
-            return False
+            return None
+
+    if conf['build_mode'] == 'unity':
+        f_root = write_unity_source(bench, abs_src_b, abs_bd_b)
+        return [(f_root, abs_bd_b, abs_bd_b, '.c')]
 
     # Compile each file in the benchmark
-    for filename in os.listdir(abs_src_b):
-        f_root, ext = os.path.splitext(filename)
-        if ext == '.c':
-            succeeded &= compile_file(f_root, abs_src_b, abs_bd_b)
+    jobs = []
+    for f_root in benchmark_sources(bench):
+        jobs.append((f_root, abs_src_b, abs_bd_b, '.c'))
 
-    return succeeded
+    return jobs
 
 
-def compile_support():
-    """Compile all the support code.
+def support_compile_jobs(conf):
+    """Create the build directories for the support code and return the list
+       of compilation jobs needed for it.  Each job is a tuple of the
+       arguments to compile_file.
 
-       Return True if all files compile successfully, False otherwise."""
-    succeeded = True
+       Return None if a build directory could not be created."""
+    jobs = []
 
     # First the general support
-    if not os.path.isdir(gp['bd_supportdir']):
+    if not os.path.isdir(conf['bd_supportdir']):
         try:
-            os.makedirs(gp['bd_supportdir'])
+            os.makedirs(conf['bd_supportdir'])
         except PermissionError:
             log.warning(
-                'Warning: Unable to create support build directory {supportdir}'.format(supportdir=gp["bd_supportdir"])
+                'Warning: Unable to create support build directory {supportdir}'.format(supportdir=conf['bd_supportdir'])
             )
-            return False
+            return None
 
     # Compile each general support file in the benchmark
-    succeeded &= compile_file('beebsc', gp['supportdir'], gp['bd_supportdir'])
-    succeeded &= compile_file('main', gp['supportdir'], gp['bd_supportdir'])
+    jobs.append(('beebsc', conf['supportdir'], conf['bd_supportdir'], '.c'))
+    jobs.append(('main', conf['supportdir'], conf['bd_supportdir'], '.c'))
 
     # Compile dummy files that are needed
-    for dlib in gp['dummy_libs']:
-        succeeded &= compile_file(
-            'dummy-' + dlib, gp['supportdir'], gp['bd_supportdir']
+    for dlib in conf['dummy_libs']:
+        jobs.append(
+            ('dummy-' + dlib, conf['supportdir'], conf['bd_supportdir'], '.c')
         )
 
     # Compile architecture, chip and board specific files.  Note that we only
     # create the build directory if it is needed here.
     for dirtype in ['arch', 'chip', 'board']:
         # Support directory we are interested in
-        dirname = gp[dirtype + 'dir']
+        dirname = conf[dirtype + 'dir']
         # List of files/subdirectories in that directory
         filelist = os.listdir(dirname)
         # Compile every C or assembler source file
@@ -560,7 +1036,7 @@ def compile_support():
             if (os.path.isfile(full_fn) and
                 (ext == '.c' or ext == '.s' or ext == '.S')):
                 # Create build directory
-                builddir = gp['bd_' + dirtype + 'dir']
+                builddir = conf['bd_' + dirtype + 'dir']
                 if not os.path.isdir(builddir):
                     try:
                         os.makedirs(builddir)
@@ -568,37 +1044,23 @@ def compile_support():
                         log.warning(
                             'Warning: Unable to create build directory for {dirname}, {builddir}'.format(dirname=dirname, builddir=builddir)
                         )
-                        return False
-
-                succeeded &= compile_file(root, dirname, builddir, suffix=ext)
-
-    return succeeded
+                        return None
 
+                jobs.append((root, dirname, builddir, ext))
 
-def create_link_binlist(abs_bd):
-    """
-    Create a list of all the binaries to be linked, including those in the
-    specified absolute directory, abs_bd.  The binaries in this directory can
-    be specified as relative filenames.  All others will all be absolute
-    addresses, since ultimately we will link in the abs_bd directory.  Return
-    the result binlist, or an empty list on failure.
+    return jobs
 
-    There is a nasty gotcha here. The ordering of files matters, since that is
-    the order they will get packed into the executable, which in turn may
-    affect branch distances. We therefore explicitly order files.
-    """
-
-    # Find the object files in alphabetical order
-    binlist = []
-    for binf in sorted(os.listdir(abs_bd), key=lambda objf: objf):
-        if binf.endswith('.o'):
-            binlist.extend(gp['ld_input_pattern'].format(binf).split())
 
+def support_binaries(conf):
+    """Return a list of the absolute file names of all the support binaries
+       to be linked with every benchmark, in the order they must be linked, or
+       None on failure."""
+    binaries = []
 
     # Add arch, chip and board binaries
     for dirtype in ['arch', 'chip', 'board']:
         # Build directory
-        bindir = gp['bd_{dirtype}dir'.format(dirtype=dirtype)]
+        bindir = conf['bd_{dirtype}dir'.format(dirtype=dirtype)]
         # List of files in the build directory in alphabetical order
         filelist = sorted(os.listdir(bindir), key=lambda objf: objf)
         # Add every object file
@@ -606,48 +1068,108 @@ def create_link_binlist(abs_bd):
             root, ext = os.path.splitext(filename)
             binf = os.path.join(bindir, filename)
             if (os.path.isfile(binf) and (ext == '.o')):
-                binlist.extend(
-                    gp['ld_input_pattern'].format(binf).split()
-                )
+                binaries.append(binf)
 
     # Add generic support
     for supp in ['main.o', 'beebsc.o']:
-        binf = os.path.join(gp['bd_supportdir'], supp)
+        binf = os.path.join(conf['bd_supportdir'], supp)
         if os.path.isfile(binf):
-            binlist.extend(gp['ld_input_pattern'].format(binf).split())
+            binaries.append(binf)
         else:
             log.warning('Warning: Unable to find support library {binf}'.format(binf=binf))
-            return []
+            return None
 
     # Add dummy binaries. These must be sorted in alphabetical order
-    for dlib in sorted(gp['dummy_libs'], key=lambda lib: lib):
-        binf = os.path.join(gp['bd_supportdir'], 'dummy-{dlib}.o'.format(dlib=dlib))
+    for dlib in sorted(conf['dummy_libs'], key=lambda lib: lib):
+        binf = os.path.join(conf['bd_supportdir'], 'dummy-{dlib}.o'.format(dlib=dlib))
         if os.path.isfile(binf):
-            binlist.extend(gp['ld_input_pattern'].format(binf).split())
+            binaries.append(binf)
         else:
             log.warning('Warning: Unable to find dummy library {binf}'.format(binf=binf))
+            return None
+
+    return binaries
+
+
+def create_link_binlist(conf, abs_bd, objects):
+    """
+    Create a list of all the binaries to be linked, including those listed
+    in "objects" in the specified absolute directory, abs_bd.  The binaries
+    in this directory can be specified as relative filenames.  All others will all be absolute
+    addresses, since ultimately we will link in the abs_bd directory.  Return
+    the result binlist, or an empty list on failure.
+
+    There is a nasty gotcha here. The ordering of files matters, since that is
+    the order they will get packed into the executable, which in turn may
+    affect branch distances. We therefore explicitly order files.  The
+    support archive holds its members in the same order as the support
+    binaries would otherwise be listed.
+    """
+
+    # Take the object files in alphabetical order.  Only those of the
+    # current build mode are used, since objects from other modes may remain
+    # in the directory.
+    binlist = []
+    for binf in sorted(objects):
+        if not os.path.isfile(os.path.join(abs_bd, binf)):
+            log.warning('Warning: Unable to find object file {binf} in {abs_bd}'.format(binf=binf, abs_bd=abs_bd))
             return []
+        binlist.extend(conf['ld_input_pattern'].format(binf).split())
+
+    # Add the support binaries, preferably as an archive
+    if conf['support_archive']:
+        if os.path.isfile(conf['support_archive']):
+            binlist.extend(
+                conf['ld_archive_pattern'].format(conf['support_archive']).split()
+            )
+        else:
+            log.warning('Warning: Unable to find support archive {arch}'.format(arch=conf['support_archive']))
+            return []
+    else:
+        binaries = support_binaries(conf)
+        if binaries is None:
+            return []
+        for binf in binaries:
+            binlist.extend(conf['ld_input_pattern'].format(binf).split())
 
     return binlist
 
 
-def create_link_arglist(bench, binlist):
+def create_link_arglist(conf, bench, binlist):
     """Create the argument list for linking benchmark, "bench", from the binaries
        in "binlist"."""
-    arglist = [gp['ld']]
-    arglist.extend(gp['ldflags'])
-    arglist.extend(gp['ld_output_pattern'].format(bench).split())
+    arglist = [conf['ld']]
+    arglist.extend(conf['ldflags'])
+    arglist.extend(conf['ld_output_pattern'].format(bench).split())
     arglist.extend(binlist)
-    arglist.extend(gp['user_libs'])
+    arglist.extend(conf['user_libs'])
 
     return arglist
 
 
-def link_benchmark(bench):
-    """Link the benchmark, "bench".
+def link_inputs(arglist, abs_bd_b, exe):
+    """Return the list of files used by the link command "arglist", run in
+       directory "abs_bd_b" to create the executable "exe".  This is every
+       argument which names a file, including linker scripts given with
+       "-T"."""
+    inputs = []
+    for arg in arglist[1:]:
+        if arg.startswith('-T') and len(arg) > 2:
+            arg = arg[2:]
+        path = os.path.normpath(os.path.join(abs_bd_b, arg))
+        if path != exe and os.path.isfile(path) and path not in inputs:
+            inputs.append(path)
+
+    return inputs
+
+
+def link_benchmark(conf, bench):
+    """Link the benchmark, "bench".  The link is skipped if the build graph
+       shows the executable is up to date, meaning it was linked with the
+       same arguments and none of its inputs have changed since.
 
        Return True if link is successful, False otherwise."""
-    abs_bd_b = os.path.join(gp['bd_benchdir'], bench)
+    abs_bd_b = os.path.join(conf['bd_benchdir'], bench)
 
     if not os.path.isdir(abs_bd_b):
         log.warning(
@@ -659,10 +1181,14 @@ def link_benchmark(bench):
     succeeded = True
 
     # Create the argument list
-    binlist = create_link_binlist(abs_bd_b)
+    binlist = create_link_binlist(conf, abs_bd_b, benchmark_objects(conf, bench))
     if not binlist:
         succeeded = False
-    arglist = create_link_arglist(bench, binlist)
+    arglist = create_link_arglist(conf, bench, binlist)
+    exe = os.path.join(abs_bd_b, bench)
+
+    if succeeded and conf['graph'].link_up_to_date(bench, exe, arglist):
+        return succeeded
 
     # Run the link
     if gp['verbose']:
@@ -670,12 +1196,10 @@ def link_benchmark(bench):
         log.debug(arglist_to_str(arglist))
 
     try:
-        res = subprocess.run(
+        res = execute(
             arglist,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
             cwd=abs_bd_b,
-            timeout=gp['timeout'],
+            timeout=conf['timeout'],
         )
         if res.returncode != 0:
             log.warning('Warning: Link of benchmark "{bench}" failed'.format(bench=bench))
@@ -688,7 +1212,12 @@ def link_benchmark(bench):
         log.warning('Warning: link of benchmark "{bench}" timed out'.format(bench=bench))
         succeeded = False
 
-    if not succeeded:
+    if succeeded:
+        conf['graph'].record_link(
+            bench, exe, arglist, link_inputs(arglist, abs_bd_b, exe)
+        )
+    else:
+        conf['graph'].record_link(bench, exe, arglist, None)
         log.debug('In directory "' + abs_bd_b + '"')
         log.debug('Command was:')
         log.debug(arglist_to_str(arglist))
@@ -696,6 +1225,601 @@ def link_benchmark(bench):
     return succeeded
 
 
+def support_fingerprint(conf):
+    """Return a fingerprint of everything which determines the support
+       binaries: the tools, the compiler flags, the dummy libraries and the
+       contents of the support, architecture, chip and board directories."""
+    hasher = hashlib.sha256()
+    for tool in ['cc', 'ar']:
+        hasher.update(repr(tool_stamp(conf[tool])).encode('utf-8'))
+    for key in ['cflags', 'dummy_libs']:
+        hasher.update(repr(conf[key]).encode('utf-8'))
+
+    for dirtype in ['support', 'arch', 'chip', 'board']:
+        dirname = conf[dirtype + 'dir']
+        for filename in sorted(os.listdir(dirname)):
+            full_fn = os.path.join(dirname, filename)
+            if os.path.isfile(full_fn):
+                hasher.update('{dt}/{fn}'.format(dt=dirtype, fn=filename).encode('utf-8'))
+                with open(full_fn, 'rb') as fileh:
+                    hasher.update(fileh.read())
+
+    return hasher.hexdigest()
+
+
+def setup_support_archive(conf):
+    """If a support archive has been requested, work out its name from the
+       fingerprint of the support flags.  Archives are kept with the object
+       cache if there is one, so they are shared by all builds using that
+       cache, and otherwise in the top level build directory, so they are
+       shared by all configurations."""
+    if not conf['support_archive']:
+        return
+
+    if gp['cache']:
+        archdir = os.path.join(gp['cache'].cachedir, 'archives')
+    else:
+        archdir = os.path.join(gp['bd'], 'support-archives')
+
+    conf['support_archive'] = os.path.join(
+        archdir, support_fingerprint(conf)[:16], 'libsupport.a'
+    )
+
+
+def archive_support(conf):
+    """Create the support archive from the support binaries.
+
+       Return True if the archive is created successfully, False otherwise."""
+    archive = conf['support_archive']
+    binaries = support_binaries(conf)
+    if binaries is None:
+        return False
+
+    # Build to a temporary name, so that other builds never see a partial
+    # archive.
+    archdir = os.path.dirname(archive)
+    try:
+        os.makedirs(archdir, exist_ok=True)
+    except PermissionError:
+        log.warning(
+            'Warning: Unable to create support archive directory {archdir}'.format(archdir=archdir)
+        )
+        return False
+
+    tmpfile = '{archive}.{pid}.tmp'.format(archive=archive, pid=os.getpid())
+    arglist = [conf['ar'], 'rcs', tmpfile]
+    arglist.extend(binaries)
+
+    if gp['verbose']:
+        log.debug('Archiving in directory {archdir}'.format(archdir=archdir))
+        log.debug(arglist_to_str(arglist))
+
+    succeeded = True
+    res = None
+    try:
+        res = execute(
+            arglist,
+            cwd=archdir,
+            timeout=conf['timeout'],
+        )
+        if res.returncode != 0:
+            log.warning('Warning: Creation of support archive {archive} failed'.format(archive=archive))
+            succeeded = False
+    except subprocess.TimeoutExpired:
+        log.warning('Warning: Creation of support archive {archive} timed out'.format(archive=archive))
+        succeeded = False
+
+    if succeeded:
+        os.replace(tmpfile, archive)
+    else:
+        log.debug('Command was:')
+        log.debug(arglist_to_str(arglist))
+        if res:
+            log.debug(res.stdout.decode('utf-8'))
+            log.debug(res.stderr.decode('utf-8'))
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+
+    return succeeded
+
+
+def num_jobs(jobs):
+    """Return the number of concurrent jobs to use, given the value "jobs"
+       supplied on the command line, where 0 means one per processor."""
+    if jobs > 0:
+        return jobs
+
+    return os.cpu_count() or 1
+
+
+def traced(category, name, func, *args):
+    """Call "func" with arguments "args", recording it in the build trace as
+       the job "name" in category "category".  Return the result of the
+       call."""
+    with gp['trace'].span(category, name) as span:
+        span['result'] = func(*args)
+
+    return span['result']
+
+
+def trace_name(conf, path):
+    """The name in the build trace of a job for "path", relative to the
+       repository or build directory if within them, for configuration
+       "conf" """
+    for topdir in [gp['rootdir'], gp['bd']]:
+        if path.startswith(topdir + os.sep):
+            path = os.path.relpath(path, topdir)
+            break
+
+    return describe(conf, path)
+
+
+def describe(conf, text):
+    """Qualify "text" with the name of configuration "conf", if the build
+       has more than one configuration."""
+    if conf['name']:
+        return '{name}: {text}'.format(name=conf['name'], text=text)
+
+    return text
+
+
+def copy_object(conf, f_root, srcdir, bindir, suffix, primary, p_bindir, index=None):
+    """Provide the object for file root "f_root" with suffix "suffix" from
+       the source directory "srcdir" in the bin directory "bindir" of
+       configuration "conf", by copying it from the bin directory "p_bindir"
+       of the identical compilation job "primary" of another configuration.
+       If "primary" is a batch, "index" is the position of the file within
+       it.
+
+       Return True if the object is available, False if the compilation
+       failed."""
+    if index is None:
+        p_result = primary.result
+    else:
+        p_result = primary.result[index]
+
+    if not p_result:
+        log.warning(
+            'Warning: Compilation of {root}{suff} from source directory {src} to binary directory {bin} failed'
+                .format(root=f_root, suff=suffix, src=srcdir, bin=bindir)
+        )
+        return False
+
+    abs_src, abs_bin, abs_dep = object_files(conf, f_root, srcdir, bindir, suffix)
+    arglist = compile_arglist(conf, f_root, abs_src)
+
+    if conf['graph'].object_up_to_date(abs_bin, arglist):
+        return True
+
+    shutil.copyfile(os.path.join(p_bindir, '{root}.o'.format(root=f_root)), abs_bin)
+    if abs_dep:
+        shutil.copyfile(os.path.join(p_bindir, '{root}.d'.format(root=f_root)), abs_dep)
+    conf['graph'].record_object(
+        abs_bin, arglist, compile_deps(abs_src, abs_dep, bindir)
+    )
+
+    return True
+
+
+def job_succeeded(job):
+    """Did the compilation job "job" succeed?  A batch succeeded if every
+       file in it compiled."""
+    if isinstance(job.result, list):
+        return all(job.result)
+
+    return bool(job.result)
+
+
+def support_ready(compile_jobs):
+    """The barrier after which the support code is available.  Return True
+       if all the jobs in "compile_jobs" succeeded."""
+    return all(job_succeeded(job) for job in compile_jobs)
+
+
+def archive_compiled_support(conf, compile_jobs):
+    """Create the support archive for configuration "conf", provided all the
+       jobs in "compile_jobs", compiling the support code, succeeded."""
+    if not support_ready(compile_jobs):
+        return False
+
+    return archive_support(conf)
+
+
+def link_compiled_benchmark(conf, bench, compile_jobs):
+    """Link benchmark "bench" of configuration "conf", provided it was
+       compiled successfully by the jobs in "compile_jobs", which is None if
+       the benchmark could not be set up for compilation.
+
+       Return None if the benchmark was not compiled, otherwise the result of
+       the link."""
+    if compile_jobs is None or not support_ready(compile_jobs):
+        return None
+
+    return link_benchmark(conf, bench)
+
+
+def report_benchmark(conf, bench, link_job):
+    """Log the outcome for the benchmark, "bench", of configuration "conf",
+       whose link was attempted by "link_job".  Return True if it built
+       successfully."""
+    if link_job.result is None:
+        return False
+
+    log.debug(describe(conf, 'Compilation of benchmark "{bench}" successful'.format(bench=bench)))
+    if link_job.result:
+        log.debug(describe(conf, 'Linking of benchmark "{bench}" successful'.format(bench=bench)))
+        log.info(describe(conf, bench))
+
+    return link_job.result
+
+
+def build_all(configs, benchmarks, jobs):
+    """Compile the support code and all the benchmarks in "benchmarks" for
+       every configuration in "configs", then link each benchmark, using up to
+       "jobs" concurrent compiler and linker invocations.
+
+       All compilations are independent, so they are all queued at once.  A
+       compilation which is identical in more than one configuration is only
+       run once, with the object copied to the other configurations.  With
+       batched compilation, the files for each bin directory are compiled as
+       one job.
+
+       If a support archive is used, it is created once all the support code
+       is compiled, unless an up to date archive already exists, in which case
+       the support code is not compiled at all.  Configurations with the same
+       support archive share it.
+
+       The link of each benchmark is started as soon as both its own objects
+       and the support objects or archive are complete.  Results are reported
+       in configuration and benchmark order, so the log is the same whatever
+       the number of jobs.
+
+       Return True if everything built successfully, False otherwise."""
+    all_jobs = []
+    # The job for each distinct compilation, and its bin directory
+    compilations = {}
+    archives = {}
+    support_jobs = {}
+    link_jobs = {}
+    successful = True
+
+    def source_name(job):
+        """The source file compiled by "job", a tuple of arguments to
+           compile_file"""
+        f_root, srcdir, _, suffix = job
+        return os.path.join(srcdir, '{root}{suff}'.format(root=f_root, suff=suffix))
+
+    def compile_key(conf, job):
+        """The key identifying the compilation "job", a tuple of arguments
+           to compile_file, in any configuration"""
+        f_root, srcdir, _, suffix = job
+        abs_src = os.path.join(srcdir, '{root}{suff}'.format(root=f_root, suff=suffix))
+        return (abs_src, tuple(compile_arglist(conf, f_root, abs_src)))
+
+    def compile_jobs_for(conf, jobs_list):
+        """Create the jobs to compile "jobs_list", a list of tuples of
+           arguments to compile_file, reusing any identical compilation."""
+        new_jobs = []
+        if conf['batch_compile']:
+            batches = {}
+            for job in jobs_list:
+                batches.setdefault(job[2], []).append(job)
+            for batch in batches.values():
+                key = tuple(compile_key(conf, job) for job in batch)
+                primary, p_bindir = compilations.get(key, (None, None))
+                if primary:
+                    new_jobs.extend(
+                        Job(traced, 'copy', trace_name(conf, source_name(job)),
+                            copy_object, conf, *job, primary, p_bindir, idx,
+                            deps=[primary])
+                        for idx, job in enumerate(batch)
+                    )
+                else:
+                    primary = Job(
+                        traced, 'batch', trace_name(conf, batch[0][2]),
+                        compile_batch, conf, batch
+                    )
+                    compilations[key] = (primary, batch[0][2])
+                    new_jobs.append(primary)
+        else:
+            for job in jobs_list:
+                key = compile_key(conf, job)
+                primary, p_bindir = compilations.get(key, (None, None))
+                if primary:
+                    new_jobs.append(Job(
+                        traced, 'copy', trace_name(conf, source_name(job)),
+                        copy_object, conf, *job, primary, p_bindir,
+                        deps=[primary]
+                    ))
+                else:
+                    primary = Job(
+                        traced, 'compile', trace_name(conf, source_name(job)),
+                        compile_file, conf, *job
+                    )
+                    compilations[key] = (primary, job[2])
+                    new_jobs.append(primary)
+
+        all_jobs.extend(new_jobs)
+        return new_jobs
+
+    # Support code first, so that links are not held up waiting for it.
+    for conf in configs:
+        archive = conf['support_archive']
+        if archive and (archive in archives or os.path.isfile(archive)):
+            if archive not in archives:
+                log.debug(describe(conf, 'Using existing support archive {archive}'.format(archive=archive)))
+            deps = [archives[archive]] if archive in archives else []
+            support_jobs[conf['name']] = Job(support_ready, deps, deps=deps)
+            all_jobs.append(support_jobs[conf['name']])
+            continue
+
+        jobs_list = support_compile_jobs(conf)
+        if jobs_list is None:
+            successful = False
+            jobs_list = []
+        deps = compile_jobs_for(conf, jobs_list)
+        if archive:
+            archives[archive] = Job(
+                traced, 'archive', trace_name(conf, archive),
+                archive_compiled_support, conf, deps, deps=deps
+            )
+            all_jobs.append(archives[archive])
+            deps = [archives[archive]]
+        support_jobs[conf['name']] = Job(support_ready, deps, deps=deps)
+        all_jobs.append(support_jobs[conf['name']])
+
+    # Then the benchmarks, each linked once it and the support code are
+    # compiled.
+    for conf in configs:
+        for bench in benchmarks:
+            jobs_list = benchmark_compile_jobs(conf, bench)
+            deps = [support_jobs[conf['name']]]
+            compile_jobs = None
+            if jobs_list is not None:
+                compile_jobs = compile_jobs_for(conf, jobs_list)
+                deps.extend(compile_jobs)
+            link_job = Job(
+                traced, 'link', describe(conf, bench),
+                link_compiled_benchmark, conf, bench, compile_jobs, deps=deps
+            )
+            link_jobs[(conf['name'], bench)] = link_job
+            all_jobs.append(link_job)
+
+    # Report in order, as each benchmark and all of those before it are
+    # finished.
+    reports = []
+    for conf in configs:
+        reports.append((conf, None, support_jobs[conf['name']]))
+        for bench in benchmarks:
+            reports.append((conf, bench, link_jobs[(conf['name'], bench)]))
+
+    def report_done(job):
+        """Report everything finished at the head of the report queue"""
+        nonlocal successful
+        while reports and reports[0][2].done:
+            conf, bench, job = reports.pop(0)
+            if bench is None:
+                successful &= job.result
+                if job.result:
+                    log.debug(describe(conf, 'Compilation of support files successful'))
+            else:
+                successful &= report_benchmark(conf, bench, job)
+
+    run_jobs(all_jobs, jobs, report_done)
+
+    return successful
+
+
+def setup_executor(args, jobs):
+    """Set up the executor which runs all compiler, archiver and linker
+       commands, as specified by the arguments, "args".  A process pool has
+       one process for each of the "jobs" concurrent jobs."""
+    if args.executor == 'pool':
+        gp['executor'] = PoolExecutor(jobs)
+    elif args.executor == 'socket':
+        if not args.worker:
+            log.error('ERROR: Socket executor requires at least one --worker: exiting')
+            sys.exit(1)
+        endpoints = []
+        for worker in args.worker:
+            endpoint = parse_endpoint(worker)
+            if not endpoint:
+                log.error('ERROR: Invalid build worker "{worker}": exiting'.format(worker=worker))
+                sys.exit(1)
+            endpoints.append(endpoint)
+        gp['executor'] = SocketExecutor(endpoints, gp['env'])
+    else:
+        gp['executor'] = LocalExecutor()
+
+    log.debug('Build commands run by {desc}'.format(desc=gp['executor'].description))
+
+
+def setup_cache(args):
+    """Set up the object cache, if one has been requested."""
+    gp['cache'] = None
+    if not args.cache_dir:
+        return
+
+    if os.path.isabs(args.cache_dir):
+        cachedir = args.cache_dir
+    else:
+        cachedir = os.path.join(gp['rootdir'], args.cache_dir)
+
+    try:
+        gp['cache'] = ObjectCache(cachedir, args.cache_size * 1024 * 1024)
+    except OSError as error:
+        log.error(
+            'ERROR: Unable to use object cache {cachedir}: {err}: exiting'.format(cachedir=cachedir, err=error)
+        )
+        sys.exit(1)
+
+
+def report_cache():
+    """Trim the object cache to size and report how well it worked."""
+    cache = gp['cache']
+    if not cache:
+        return
+
+    evicted = cache.evict()
+    log.info(
+        'Object cache: {hits} hits, {misses} misses, {evicted} evicted'.format(hits=cache.hits, misses=cache.misses, evicted=evicted)
+    )
+
+
+def report_trace():
+    """Save the build trace, as a summary and in Chrome trace event format,
+       in the build directory, and log the slowest jobs."""
+    gp['trace'].save(
+        os.path.join(gp['bd'], 'build-summary.json'),
+        os.path.join(gp['bd'], 'build-trace.json'),
+    )
+
+    log.debug('Slowest jobs')
+    log.debug('============')
+    for span in gp['trace'].summary()['jobs'][:10]:
+        maxrss = '-' if span['maxrss'] is None else '{rss}'.format(rss=span['maxrss'])
+        log.debug(
+            '{wall:8.3f}s wall {user:8.3f}s user {sys:8.3f}s sys {rss:>8} KiB  {cat} {name}'
+                .format(wall=span['wall'], user=span['user'], sys=span['sys'], rss=maxrss, cat=span['category'], name=span['name'])
+        )
+    log.debug('')
+
+
+def report_batches():
+    """Report how much batched compilation saved, compared with compiling
+       each file separately.  This is an estimate, since each file in a
+       successful batch saves the cost of starting the compiler, while a
+       failed batch wastes its own time before the files are compiled
+       separately."""
+    stats = gp['batch_stats']
+    if not stats['batches']:
+        return
+
+    log.info(
+        'Batched compilation: {files} files in {batches} invocations, {failed} failed, saving an estimated {saved:.2f}s'
+            .format(files=stats['files'], batches=stats['batches'], failed=stats['failed'], saved=stats['saved'])
+    )
+
+
+def parse_configs(parser, args):
+    """Return a list of the configurations to build, each a tuple of its name
+       and its arguments.  Each "--config NAME:OPTIONS" is built with the
+       command line arguments, followed by OPTIONS, which thus take
+       precedence.  Without any "--config", there is a single unnamed
+       configuration using just the command line arguments."""
+    if not args.config:
+        return [(None, args)]
+
+    configs = []
+    for spec in args.config:
+        name, _, options = spec.partition(':')
+        if not re.match(r'^[A-Za-z0-9_+-][A-Za-z0-9_.+-]*$', name):
+            log.error('ERROR: Invalid configuration name "{name}": exiting'.format(name=name))
+            sys.exit(1)
+        if name in [cname for cname, _ in configs] or name == 'support-archives':
+            log.error('ERROR: Duplicate configuration name "{name}": exiting'.format(name=name))
+            sys.exit(1)
+        configs.append((name, parser.parse_args(sys.argv[1:] + shlex.split(options))))
+
+    return configs
+
+
+def setup_config(name, args, benchmarks):
+    """Set up and return the dictionary describing the configuration "name",
+       built using the arguments, "args".  Unnamed configurations are built
+       in the top level build directory, others in a subdirectory of that
+       name."""
+    conf = {}
+    conf['name'] = name
+    if name:
+        conf['bd'] = os.path.join(gp['bd'], name)
+    else:
+        conf['bd'] = gp['bd']
+    conf['bd_benchdir'] = os.path.join(conf['bd'], 'src')
+
+    # Check args are OK and establish the parameters
+    validate_args(conf, args)
+    set_parameters(conf, args)
+
+    for bench in benchmarks:
+        os.makedirs(os.path.join(conf['bd_benchdir'], bench), exist_ok=True)
+
+    # Build only what is out of date
+    conf['graph'] = BuildGraph(
+        os.path.join(conf['bd'], 'build-graph.json'),
+        [tool_stamp(conf['cc']), tool_stamp(conf['ld'])],
+    )
+    if gp['cache']:
+        conf['cc_identity'] = compiler_identity(conf['cc'])
+    setup_support_archive(conf)
+    conf['cc_startup'] = None
+
+    return conf
+
+
+def manifest_settings(config_args, benchmarks):
+    """Return everything affecting the build which is not in a file: the
+       arguments, "config_args" of each configuration, as returned by
+       parse_configs, the benchmarks, "benchmarks", and the search path for
+       the tools."""
+    # Arguments which cannot change what is built
+    ignored = ['logdir', 'verbose', 'clean', 'jobs', 'cache_size', 'executor',
+               'worker']
+
+    settings = {}
+    settings['rootdir'] = gp['rootdir']
+    settings['path'] = os.environ.get('PATH')
+    settings['benchmarks'] = benchmarks
+    settings['configs'] = []
+    for name, cargs in config_args:
+        cvars = {key: val for key, val in vars(cargs).items() if key not in ignored}
+        settings['configs'].append([name, cvars])
+
+    return settings
+
+
+def manifest_files(configs, benchmarks):
+    """Return all the files read or written when building the benchmarks,
+       "benchmarks", for each configuration in "configs".  This includes the
+       directories searched for source files, so that adding a file is
+       noticed, and the build scripts themselves."""
+    pylibdir = os.path.join(gp['rootdir'], 'pylib')
+    files = [os.path.abspath(__file__), pylibdir, gp['benchdir']]
+    files.extend(
+        os.path.join(pylibdir, pyfile)
+        for pyfile in os.listdir(pylibdir) if pyfile.endswith('.py')
+    )
+    files.extend(os.path.join(gp['benchdir'], bench) for bench in benchmarks)
+
+    for conf in configs:
+        files.append(conf['supportdir'])
+        for level in ['arch', 'chip', 'board']:
+            files.append(conf[level + 'dir'])
+            files.append(os.path.join(conf[level + 'dir'], level + '.cfg'))
+        tools = [conf['cc'], conf['ld']]
+        if conf['support_archive']:
+            tools.append(conf['ar'])
+            files.append(conf['support_archive'])
+        files.extend(tool_stamp(tool)[0] for tool in tools)
+        files.extend(conf['graph'].files())
+        files.extend(
+            os.path.join(conf['bd_benchdir'], bench, bench) for bench in benchmarks
+        )
+
+    return files
+
+
+def report_up_to_date(manifest, benchmarks):
+    """Report the benchmarks, "benchmarks", of the previous build recorded
+       in "manifest", all of which are up to date."""
+    log.debug('Build manifest unchanged: nothing to do')
+    for name in manifest.summary['configs']:
+        for bench in benchmarks:
+            log.info(describe({'name': name}, bench))
+
+    log.info('All benchmarks built successfully')
+
+
 def main():
     """Main program to drive building of benchmarks."""
     # Establish the root directory of the repository, since we know this file is
@@ -714,40 +1838,58 @@ def main():
     # Establish build directory
     create_builddir(args.builddir, args.clean)
 
-    # Check args are OK (have to have logging and build directory set up first)
-    validate_args(args)
-
     # Find the benchmarks
     benchmarks = find_benchmarks()
     log_benchmarks(benchmarks)
 
-    # Establish other global parameters
-    set_parameters(args)
-    log_parameters()
+    # Set up additional environment variables, which are common to all
+    # configurations.
+    set_environ(args)
+
+    # If nothing has changed since the last successful build, there is
+    # nothing to do.  Otherwise the manifest is discarded until the build
+    # succeeds again.
+    config_args = parse_configs(parser, args)
+    manifest = BuildManifest(
+        os.path.join(gp['bd'], 'build-manifest.json'),
+        manifest_settings(config_args, benchmarks),
+    )
+    if manifest.up_to_date():
+        report_up_to_date(manifest, benchmarks)
+        return
+    manifest.discard()
+
+    # Set up the executor, the object cache and batched compilation
+    # statistics, then establish the parameters of each
+    # configuration
+    setup_executor(args, num_jobs(args.jobs))
+    setup_cache(args)
+    gp['trace'] = BuildTrace()
+    gp['batch_stats'] = {'batches': 0, 'files': 0, 'failed': 0, 'saved': 0.0}
+    gp['batch_lock'] = threading.Lock()
+    configs = []
+    for name, cargs in config_args:
+        configs.append(setup_config(name, cargs, benchmarks))
+    for conf in configs:
+        log_parameters(conf)
 
     log.debug('General log')
     log.debug('===========')
 
-    # Set up additional environment variables.
-    set_environ()
-
-    # Track success
-    successful = compile_support()
-    if successful:
-        log.debug('Compilation of support files successful')
-
-    for bench in benchmarks:
-        res = compile_benchmark(bench)
-        successful &= res
-        if res:
-            log.debug('Compilation of benchmark "{bench}" successful'.format(bench=bench))
-            res = link_benchmark(bench)
-            successful &= res
-            if res:
-                log.debug('Linking of benchmark "{bench}" successful'.format(bench=bench))
-                log.info(bench)
+    # Compile and link everything
+    successful = build_all(configs, benchmarks, num_jobs(args.jobs))
+    for conf in configs:
+        conf['graph'].save()
+    gp['executor'].close()
+    report_trace()
+    report_cache()
+    report_batches()
 
     if successful:
+        manifest.save(
+            manifest_files(configs, benchmarks),
+            {'configs': [conf['name'] for conf in configs]},
+        )
         log.info('All benchmarks built successfully')
 
 
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+# Script to serve build commands for build_all.py
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Serve Embench build commands.
+
+Runs the commands sent by build_all.py with "--executor socket".  A worker on
+the local host can stand in for remote build workers when testing.
+"""
+
+
+import argparse
+import os
+import sys
+
+sys.path.append(
+    os.path.join(os.path.abspath(os.path.dirname(__file__)), 'pylib')
+)
+
+from embench_core import check_python_version
+from embench_core import gp
+from embench_core import setup_logging
+from embench_core import log_args
+from embench_executor import serve_worker
+
+
+def build_parser():
+    """Build a parser for all the arguments"""
+    parser = argparse.ArgumentParser(description='Serve build commands')
+
+    parser.add_argument(
+        '--host',
+        type=str,
+        default='127.0.0.1',
+        help='Address on which to listen. The worker runs any command it is '
+        + 'sent, so only listen on addresses reachable from trusted hosts',
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=7878,
+        help='Port on which to listen (0 for any free port)',
+    )
+    parser.add_argument(
+        '--logdir',
+        type=str,
+        default='logs',
+        help='Directory in which to store logs',
+    )
+
+    return parser
+
+
+def main():
+    """Main program to serve build commands."""
+    # Establish the root directory of the repository, since we know this file is
+    # in that directory.
+    gp['rootdir'] = os.path.abspath(os.path.dirname(__file__))
+
+    # Parse arguments using standard technology
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # Establish logging, using "worker" as the log file prefix.
+    setup_logging(args.logdir, 'worker')
+    log_args(args)
+
+    serve_worker(args.host, args.port)
+
+
+# Make sure we have new enough Python and only run if this is the main package
+
+check_python_version(3, 6)
+if __name__ == '__main__':
+    sys.exit(main())
@@ -65,6 +65,11 @@ start_trigger ()
 void __attribute__ ((noinline)) __attribute__ ((externally_visible))
 stop_trigger ()
 {
+#if RESULT_RECORD
+  /* The counter was reset by initialise_board, so started from zero.  The
+     record is read from memory by the debugger.  */
+  record_trigger_counts (0, GetCycleCounter(), "cycles");
+#endif
   ResetCycleCounter();
   DisableCycleCounter();
 }
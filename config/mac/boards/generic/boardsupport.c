@@ -46,4 +46,18 @@ stop_trigger ()
 
     // report time in ms
     printf("Real time: %.6f ms CPU time: %.6f ms \n", elapsed_r*1000.0, elapsed_c*1000.0);
+
+#if RESULT_RECORD
+    // result record in ns, with the CPU time as an extra counter
+    record_trigger_counts(0, seconds_r*1000000000LL + nanoseconds_r, "ns");
+    record_counter("cpu-time", seconds_c*1000000000LL + nanoseconds_c);
+#endif
+}
+
+#if RESULT_RECORD
+void
+output_result (const char *record)
+{
+    printf("%s\n", record);
 }
+#endif
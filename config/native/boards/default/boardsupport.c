@@ -6,8 +6,29 @@
 
    SPDX-License-Identifier: GPL-3.0-or-later */
 
+/* If the chip links the host C library, and so defines HAVE_LIBC, the
+   triggers record monotonic timestamps of the start and end of the benchmark,
+   reported in nanoseconds by stop_trigger, so that only benchmark () is
+   timed.  They are also recorded for the result record, if there is one.
+   Otherwise, as for chips built with -nostdlib, the triggers do nothing.  */
+
+#ifdef HAVE_LIBC
+#include <stdio.h>
+#include <time.h>
+#endif
 #include <support.h>
 
+#ifdef HAVE_LIBC
+static struct timespec start_time;
+static struct timespec stop_time;
+
+static long long
+timespec_ns (const struct timespec *ts)
+{
+  return (long long) ts->tv_sec * 1000000000LL + ts->tv_nsec;
+}
+#endif
+
 void
 initialise_board ()
 {
@@ -16,9 +37,29 @@ initialise_board ()
 void __attribute__ ((noinline)) __attribute__ ((externally_visible))
 start_trigger ()
 {
+#ifdef HAVE_LIBC
+  clock_gettime (CLOCK_MONOTONIC, &start_time);
+#endif
 }
 
 void __attribute__ ((noinline)) __attribute__ ((externally_visible))
 stop_trigger ()
 {
+#ifdef HAVE_LIBC
+  clock_gettime (CLOCK_MONOTONIC, &stop_time);
+  printf ("EMBENCH_START_NS=%lld\n", timespec_ns (&start_time));
+  printf ("EMBENCH_STOP_NS=%lld\n", timespec_ns (&stop_time));
+#if RESULT_RECORD
+  record_trigger_counts (timespec_ns (&start_time), timespec_ns (&stop_time),
+			 "ns");
+#endif
+#endif
+}
+
+#if defined (HAVE_LIBC) && RESULT_RECORD
+void
+output_result (const char *record)
+{
+  printf ("%s\n", record);
 }
+#endif
@@ -0,0 +1,147 @@
+/* Copyright (C) 2026 Embecosm Limited
+
+   This file is part of Embench.
+
+   SPDX-License-Identifier: GPL-3.0-or-later */
+
+/* Native board support for Linux, which counts events over the benchmark
+   using perf_event_open.  Counters which can't be opened, such as hardware
+   counters in a virtual machine, are left out, so at least the software
+   events are normally available.  User space only is counted, so this works
+   with the default perf_event_paranoid setting of 2.
+
+   stop_trigger prints the monotonic time at the start and end of the
+   benchmark, as the default native board support does, followed by a single
+   line of the counters:
+
+     EMBENCH_COUNTERS task-clock=1234 instructions=5678 ...
+
+   Counts are scaled if the kernel had to multiplex the counters.  The times
+   and counters are also recorded for the result record, if there is one.  */
+
+#define _GNU_SOURCE
+#include <linux/perf_event.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <string.h>
+#include <sys/ioctl.h>
+#include <sys/syscall.h>
+#include <time.h>
+#include <unistd.h>
+#include <support.h>
+
+struct counter
+{
+  const char *name;
+  uint32_t type;
+  uint64_t config;
+  int fd;
+};
+
+static struct counter counters[] = {
+  {"task-clock", PERF_TYPE_SOFTWARE, PERF_COUNT_SW_TASK_CLOCK, -1},
+  {"page-faults", PERF_TYPE_SOFTWARE, PERF_COUNT_SW_PAGE_FAULTS, -1},
+  {"context-switches", PERF_TYPE_SOFTWARE, PERF_COUNT_SW_CONTEXT_SWITCHES, -1},
+  {"instructions", PERF_TYPE_HARDWARE, PERF_COUNT_HW_INSTRUCTIONS, -1},
+  {"cycles", PERF_TYPE_HARDWARE, PERF_COUNT_HW_CPU_CYCLES, -1},
+  {"branch-misses", PERF_TYPE_HARDWARE, PERF_COUNT_HW_BRANCH_MISSES, -1},
+  {"cache-misses", PERF_TYPE_HARDWARE, PERF_COUNT_HW_CACHE_MISSES, -1},
+};
+
+#define NUM_COUNTERS (sizeof (counters) / sizeof (counters[0]))
+
+static struct timespec start_time;
+static struct timespec stop_time;
+
+static long long
+timespec_ns (const struct timespec *ts)
+{
+  return (long long) ts->tv_sec * 1000000000LL + ts->tv_nsec;
+}
+
+void
+initialise_board ()
+{
+  unsigned int i;
+
+  for (i = 0; i < NUM_COUNTERS; i++)
+    {
+      struct perf_event_attr attr;
+
+      memset (&attr, 0, sizeof (attr));
+      attr.size = sizeof (attr);
+      attr.type = counters[i].type;
+      attr.config = counters[i].config;
+      attr.disabled = 1;
+      attr.exclude_kernel = 1;
+      attr.exclude_hv = 1;
+      attr.read_format = (PERF_FORMAT_TOTAL_TIME_ENABLED
+			  | PERF_FORMAT_TOTAL_TIME_RUNNING);
+      counters[i].fd = syscall (SYS_perf_event_open, &attr, 0, -1, -1, 0);
+    }
+}
+
+void __attribute__ ((noinline)) __attribute__ ((externally_visible))
+start_trigger ()
+{
+  unsigned int i;
+
+  for (i = 0; i < NUM_COUNTERS; i++)
+    if (counters[i].fd >= 0)
+      {
+	ioctl (counters[i].fd, PERF_EVENT_IOC_RESET, 0);
+	ioctl (counters[i].fd, PERF_EVENT_IOC_ENABLE, 0);
+      }
+
+  clock_gettime (CLOCK_MONOTONIC, &start_time);
+}
+
+void __attribute__ ((noinline)) __attribute__ ((externally_visible))
+stop_trigger ()
+{
+  unsigned int i;
+
+  clock_gettime (CLOCK_MONOTONIC, &stop_time);
+
+  for (i = 0; i < NUM_COUNTERS; i++)
+    if (counters[i].fd >= 0)
+      ioctl (counters[i].fd, PERF_EVENT_IOC_DISABLE, 0);
+
+  printf ("EMBENCH_START_NS=%lld\n", timespec_ns (&start_time));
+  printf ("EMBENCH_STOP_NS=%lld\n", timespec_ns (&stop_time));
+#if RESULT_RECORD
+  record_trigger_counts (timespec_ns (&start_time), timespec_ns (&stop_time),
+			 "ns");
+#endif
+  printf ("EMBENCH_COUNTERS");
+  for (i = 0; i < NUM_COUNTERS; i++)
+    {
+      uint64_t values[3];	/* Count, time enabled, time running.  */
+      double count;
+
+      if (counters[i].fd < 0
+	  || read (counters[i].fd, values, sizeof (values)) != sizeof (values))
+	continue;
+
+      count = (double) values[0];
+      if (values[2] == 0)
+	continue;		/* Never scheduled, so nothing counted.  */
+      if (values[2] < values[1])
+	count = count * values[1] / values[2];
+
+      printf (" %s=%.0f", counters[i].name, count);
+#if RESULT_RECORD
+      record_counter (counters[i].name, (unsigned long long) (count + 0.5));
+#endif
+      close (counters[i].fd);
+    }
+  printf ("\n");
+}
+
+#if RESULT_RECORD
+void
+output_result (const char *record)
+{
+  printf ("%s\n", record);
+}
+#endif
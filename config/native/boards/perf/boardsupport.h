@@ -0,0 +1,7 @@
+/* Copyright (C) 2026 Embecosm Limited
+
+   This file is part of Embench.
+
+   SPDX-License-Identifier: GPL-3.0-or-later */
+
+#define CPU_MHZ 1
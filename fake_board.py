@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# Script to serve a fake board for benchmark_speed.py
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Serve a fake board.
+
+Stands in for a stm32f4-discovery board behind a GDB server when testing
+benchmark_speed.py with run_stm32f4-discovery, for example to try out a farm
+of several boards on the local host.  Nothing is executed, so the results
+are only good for testing.
+"""
+
+
+import argparse
+import os
+import sys
+
+sys.path.append(
+    os.path.join(os.path.abspath(os.path.dirname(__file__)), 'pylib')
+)
+
+from embench_core import check_python_version
+from embench_core import gp
+from embench_core import setup_logging
+from embench_core import log_args
+from embench_boards import serve_fake_board
+
+
+def build_parser():
+    """Build a parser for all the arguments"""
+    parser = argparse.ArgumentParser(description='Serve a fake board')
+
+    parser.add_argument(
+        '--host',
+        type=str,
+        default='127.0.0.1',
+        help='Address on which to listen',
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=4242,
+        help='Port on which to listen (0 for any free port)',
+    )
+    parser.add_argument(
+        '--fail-every',
+        type=int,
+        default=0,
+        help='Drop every N\'th connection at once, as a faulty probe might '
+        + '(default 0, meaning never)',
+    )
+    parser.add_argument(
+        '--logdir',
+        type=str,
+        default='logs',
+        help='Directory in which to store logs',
+    )
+
+    return parser
+
+
+def main():
+    """Main program to serve a fake board."""
+    # Establish the root directory of the repository, since we know this file is
+    # in that directory.
+    gp['rootdir'] = os.path.abspath(os.path.dirname(__file__))
+
+    # Parse arguments using standard technology
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # Establish logging, using "board" as the log file prefix.
+    setup_logging(args.logdir, 'board')
+    log_args(args)
+
+    serve_fake_board(args.host, args.port, args.fail_every)
+
+
+# Make sure we have new enough Python and only run if this is the main package
+
+check_python_version(3, 6)
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+# Farms of boards on which to run Embench benchmarks.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench board farms.
+
+A target with several boards, each reached through its own GDB server or
+debug probe, shares the benchmarks between them with a BoardPool.  Each board
+runs one benchmark at a time, and each run takes whichever board is free.  A
+run which fails because the board could not be reached is retried on another
+board, and a board which keeps failing is taken out of the pool.
+
+A fake board, served with serve_fake_board, can stand in for a real board
+when testing.  It speaks just enough of the GDB remote serial protocol for
+GDB to connect, load a program, set breakpoints on start_trigger,
+stop_trigger and _exit, continue to each in turn and read the cycle counter
+of a Cortex-M, DWT_CYCCNT at 0xe0001004.  Nothing is executed: the cycle
+count of the benchmark is proportional to the size of the program loaded,
+so it is the same for every run of a program.
+"""
+
+__all__ = [
+    'BoardPool',
+    'serve_fake_board',
+]
+
+import itertools
+import socketserver
+import threading
+
+from embench_core import log
+
+
+class BoardPool:
+    """A pool of the boards at "endpoints", a list of (host, port) tuples,
+       each of which runs one benchmark at a time.  A board which fails
+       "max_failures" times in a row is taken out of the pool.  All methods
+       are thread-safe."""
+
+    def __init__(self, endpoints, max_failures):
+        self._cond = threading.Condition()
+        self._free = list(endpoints)
+        self._live = set(endpoints)
+        self._max_failures = max_failures
+        self._failures = {endpoint: 0 for endpoint in endpoints}
+        self.stats = {endpoint: {'runs': 0, 'failures': 0} for endpoint in endpoints}
+
+    def acquire(self, avoid=()):
+        """Wait for a free board and take it, preferring one not in "avoid",
+           as long as such a board is still in the pool.  Return the board,
+           or None if every board has been taken out of the pool."""
+        with self._cond:
+            while True:
+                if not self._live:
+                    return None
+                preferred = [board for board in self._free if board not in avoid]
+                if not preferred and self._live <= set(avoid):
+                    preferred = self._free
+                if preferred:
+                    board = preferred[0]
+                    self._free.remove(board)
+                    return board
+                self._cond.wait()
+
+    def release(self, board, board_ok):
+        """Return "board" to the pool after a run, where "board_ok" is False
+           if the board could not be reached"""
+        with self._cond:
+            self.stats[board]['runs'] += 1
+            if board_ok:
+                self._failures[board] = 0
+            else:
+                self.stats[board]['failures'] += 1
+                self._failures[board] += 1
+
+            if self._failures[board] >= self._max_failures:
+                self._live.discard(board)
+                log.warning(
+                    f'Warning: Board {board[0]}:{board[1]} failed '
+                    + f'{self._failures[board]} times in a row: no longer used'
+                )
+            else:
+                self._free.append(board)
+            self._cond.notify_all()
+
+    def log_stats(self):
+        """Log how many runs each board made, and how many failed"""
+        with self._cond:
+            for board, stats in self.stats.items():
+                state = '' if board in self._live else ' (removed)'
+                log.debug(
+                    f'Board {board[0]}:{board[1]}: {stats["runs"]} runs, '
+                    + f'{stats["failures"]} failed{state}'
+                )
+
+
+# Address of the Cortex-M cycle counter, DWT_CYCCNT
+CYCLE_COUNTER = 0xe0001004
+
+# Symbols at which the fake board stops, in order
+STOP_SYMBOLS = ['start_trigger', 'stop_trigger', '_exit']
+
+# Cycle count at start_trigger
+START_CYCLES = 1000
+
+
+def checksum(payload):
+    """Return the checksum of a remote serial protocol packet"""
+    return sum(payload.encode('latin-1')) % 256
+
+
+class FakeBoardHandler(socketserver.StreamRequestHandler):
+    """Play the part of a board for one GDB connection"""
+
+    def setup(self):
+        super().setup()
+        self.symbols = {}
+        self.wanted = list(STOP_SYMBOLS)
+        self.loaded = 0
+        self.breakpoints = set()
+        self.stops = 0
+        self.pc = 0
+
+    def read_packet(self):
+        """Return the payload of the next packet, acknowledging it, or None
+           if the connection is closed"""
+        while True:
+            char = self.rfile.read(1)
+            if not char:
+                return None
+            if char == b'$':
+                break
+
+        payload = bytearray()
+        while True:
+            char = self.rfile.read(1)
+            if not char:
+                return None
+            if char == b'#':
+                break
+            payload += char
+        self.rfile.read(2)
+        self.wfile.write(b'+')
+        return payload.decode('latin-1')
+
+    def send_packet(self, payload):
+        """Send a packet with "payload" """
+        packet = f'${payload}#{checksum(payload):02x}'
+        self.wfile.write(packet.encode('latin-1'))
+        self.wfile.flush()
+
+    def next_symbol(self):
+        """Ask GDB for the next symbol needed, or say all are known"""
+        if self.wanted:
+            return 'qSymbol:' + self.wanted[0].encode('latin-1').hex()
+
+        return 'OK'
+
+    def stop_reply(self):
+        """Run on to the next stop symbol with a breakpoint, and report the
+           stop, or the exit of the program if there is none"""
+        while self.stops < len(STOP_SYMBOLS):
+            address = self.symbols.get(STOP_SYMBOLS[self.stops])
+            self.stops += 1
+            if address is not None and address in self.breakpoints:
+                self.pc = address
+                return f'T050f:{self.pc.to_bytes(4, "little").hex()};'
+
+        return 'W00'
+
+    def cycles(self):
+        """The cycle count at the latest stop"""
+        if self.stops < 1:
+            return 0
+        if self.stops < 2:
+            return START_CYCLES
+
+        return START_CYCLES + 10 * self.loaded
+
+    def read_register(self, regno):
+        """Return the hex value of register "regno": the program counter,
+           zeroes for the FPA registers and zero for the rest"""
+        if regno == 15:
+            return self.pc.to_bytes(4, 'little').hex()
+        if 16 <= regno < 24:
+            return '00' * 12
+
+        return '00' * 4
+
+    def read_memory(self, address, length):
+        """Return the hex contents of memory: the cycle counter, or zeroes"""
+        if address == CYCLE_COUNTER and length == 4:
+            return self.cycles().to_bytes(4, 'little').hex()
+
+        return '00' * length
+
+    def reply(self, packet):
+        """Return the reply to "packet", or None to close the connection"""
+        if not packet:
+            return ''
+        if packet.startswith('qSupported'):
+            return 'PacketSize=4000'
+        if packet == 'qSymbol::':
+            return self.next_symbol()
+        if packet.startswith('qSymbol:'):
+            value, _, name = packet[len('qSymbol:'):].partition(':')
+            name = bytes.fromhex(name).decode('latin-1')
+            if name in self.wanted:
+                self.wanted.remove(name)
+            if value:
+                self.symbols[name] = int(value, 16)
+            return self.next_symbol()
+        if packet == 'qAttached':
+            return '1'
+        if packet == '?':
+            return 'S05'
+        if packet in ['!', 'D'] or packet[0] in 'HPGT':
+            return 'OK'
+        if packet.startswith('vKill'):
+            return 'OK'
+        if packet == 'k':
+            return None
+        if packet == 'g':
+            return ''.join(self.read_register(regno) for regno in range(26))
+        if packet[0] == 'p':
+            return self.read_register(int(packet[1:], 16))
+        if packet[0] == 'm':
+            address, length = packet[1:].split(',')
+            return self.read_memory(int(address, 16), int(length, 16))
+        if packet[0] == 'M':
+            header, _, data = packet[1:].partition(':')
+            self.loaded += len(data) // 2
+            return 'OK'
+        if packet[:2] in ['Z0', 'Z1']:
+            self.breakpoints.add(int(packet.split(',')[1], 16))
+            return 'OK'
+        if packet[:2] in ['z0', 'z1']:
+            self.breakpoints.discard(int(packet.split(',')[1], 16))
+            return 'OK'
+        if packet[0] in 'cs':
+            return self.stop_reply()
+
+        # Anything else, such as binary loads with "X", is not supported
+        return ''
+
+    def handle(self):
+        if self.server.fail_now():
+            log.debug('Fake board dropped connection')
+            return
+
+        while True:
+            packet = self.read_packet()
+            if packet is None:
+                break
+            answer = self.reply(packet)
+            if answer is None:
+                break
+            self.send_packet(answer)
+            if packet == 'D':
+                break
+
+
+class FakeBoardServer(socketserver.TCPServer):
+    """A fake board, with one connection at a time, as with a real probe.
+       If "fail_every" is not zero, every "fail_every"th connection is
+       dropped at once, as a faulty probe might."""
+    allow_reuse_address = True
+
+    def __init__(self, address, fail_every):
+        super().__init__(address, FakeBoardHandler)
+        self._connections = itertools.count(1)
+        self._fail_every = fail_every
+
+    def fail_now(self):
+        """Return True if this connection should fail"""
+        count = next(self._connections)
+        return self._fail_every > 0 and count % self._fail_every == 0
+
+
+def serve_fake_board(host, port, fail_every=0):
+    """Serve a fake board at "host" and "port" until interrupted, dropping
+       every "fail_every"th connection if that is not zero"""
+    with FakeBoardServer((host, port), fail_every) as server:
+        host, port = server.server_address[:2]
+        log.info(f'Fake board listening on {host}:{port}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+# Persistent object file and result caches for Embench.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench object file and result caches.
+
+Object files are stored under a hash of everything which can affect the
+result of a compilation: the preprocessed source, the full compiler argument
+list and the identity of the compiler.  Since the key does not depend on the
+build directory, the cache can be shared between build directories and
+configurations.  The cache is bounded in size, with the least recently used
+objects evicted first.
+
+Benchmark results are stored in the same way, under a hash of the executable
+and of how it was run, so a benchmark whose executable has not changed need
+not be run again.
+"""
+
+__all__ = [
+    'ObjectCache',
+    'ResultCache',
+    'compiler_identity',
+    'file_hash',
+]
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from embench_core import log
+
+
+def compiler_identity(cc):
+    """Return a string identifying the compiler "cc", which changes whenever
+       the compiler is changed.  This is the resolved path of the executable,
+       its size and modification time, and its version string."""
+    path = shutil.which(cc)
+    if not path:
+        return cc
+
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    ident = '{path}:{size}:{mtime}'.format(
+        path=path, size=stat.st_size, mtime=stat.st_mtime_ns
+    )
+
+    try:
+        res = subprocess.run(
+            [cc, '--version'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=10,
+        )
+        ident += ':' + res.stdout.decode('utf-8', 'replace')
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+    return ident
+
+
+class ObjectCache:
+    """A directory of object files, named by the hash of their inputs.
+
+       All methods are thread-safe, and the cache may be shared by several
+       concurrent builds, since entries are only ever created by atomic
+       rename."""
+
+    def __init__(self, cachedir, max_size):
+        """Use the directory "cachedir" to hold at most "max_size" bytes of
+           objects."""
+        self.cachedir = cachedir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cachedir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """Compute a cache key from "parts", each of which may be a string or
+           bytes."""
+        hasher = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            # Length prefix, so that adjacent parts cannot run together
+            hasher.update(len(part).to_bytes(8, 'little'))
+            hasher.update(part)
+
+        return hasher.hexdigest()
+
+    def _path(self, key, suffix='.o'):
+        """Where the file with key "key" and suffix "suffix" is held"""
+        return os.path.join(self.cachedir, key[:2], key[2:] + suffix)
+
+    def fetch(self, key, dest, depfile=None):
+        """Copy the object for "key" to "dest", marking it as recently used.
+           If "depfile" is given, the dependency file stored with the object
+           is also copied there.  Return True on a hit, False on a miss."""
+        path = self._path(key)
+        try:
+            copy_atomic(path, dest)
+            if depfile:
+                copy_atomic(self._path(key, '.d'), depfile)
+            # Both files of the entry, so they are evicted together
+            os.utime(path)
+            if os.path.exists(self._path(key, '.d')):
+                os.utime(self._path(key, '.d'))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, src, depfile=None):
+        """Add the object file "src" to the cache under "key", along with the
+           dependency file "depfile" if given.  The object is added last, so
+           it is never found without its dependency file."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if depfile:
+                copy_atomic(depfile, self._path(key, '.d'))
+            copy_atomic(src, path)
+        except OSError as error:
+            log.debug('Unable to add {src} to object cache: {err}'.format(
+                src=src, err=error))
+
+    def evict(self):
+        """Delete least recently used objects, each with its dependency file,
+           until the cache is within its size limit.  Only the object
+           directories, named by the first two characters of the keys, are
+           considered, so anything else kept in the cache directory, such as
+           the shared support archives, is never deleted.  Return the number
+           of objects deleted."""
+        entries = {}
+        total = 0
+        for subdir in os.listdir(self.cachedir):
+            dirpath = os.path.join(self.cachedir, subdir)
+            if len(subdir) != 2 or not os.path.isdir(dirpath):
+                continue
+            for filename in os.listdir(dirpath):
+                stem, suffix = os.path.splitext(filename)
+                if suffix not in ['.o', '.d']:
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, filename))
+                except FileNotFoundError:
+                    continue
+                mtime, size = entries.get((dirpath, stem), (0, 0))
+                entries[(dirpath, stem)] = (
+                    max(mtime, stat.st_mtime), size + stat.st_size
+                )
+                total += stat.st_size
+
+        deleted = 0
+        for (dirpath, stem), (_, size) in sorted(
+            entries.items(), key=lambda entry: entry[1][0]
+        ):
+            if total <= self.max_size:
+                break
+            # The object first, so it is never found without its
+            # dependency file
+            for suffix in ['.o', '.d']:
+                try:
+                    os.remove(os.path.join(dirpath, stem + suffix))
+                except FileNotFoundError:
+                    pass
+            deleted += 1
+            total -= size
+
+        return deleted
+
+
+class ResultCache:
+    """A directory of benchmark results, each a JSON object, named by the
+       hash of everything which can affect the result.
+
+       All methods are thread-safe, and the cache may be shared by several
+       concurrent runs, since entries are only ever created by atomic
+       rename."""
+
+    key = staticmethod(ObjectCache.key)
+
+    def __init__(self, cachedir):
+        """Use the directory "cachedir" to hold the results"""
+        self.cachedir = cachedir
+        os.makedirs(self.cachedir, exist_ok=True)
+
+    def _path(self, key):
+        """Where the result with key "key" is held"""
+        return os.path.join(self.cachedir, key[:2], key[2:] + '.json')
+
+    def fetch(self, key):
+        """Return the result for "key", or None if there is none"""
+        try:
+            with open(self._path(key)) as fileh:
+                return json.load(fileh)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, result):
+        """Add the result "result" to the cache under "key" """
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as fileh:
+                json.dump(result, fileh)
+            os.replace(tmp, path)
+        except OSError as error:
+            log.debug('Unable to add result to result cache: {err}'.format(err=error))
+
+
+def file_hash(filename):
+    """Return the SHA-256 hash of the contents of "filename" """
+    hasher = hashlib.sha256()
+    with open(filename, 'rb') as fileh:
+        for block in iter(lambda: fileh.read(1 << 16), b''):
+            hasher.update(block)
+
+    return hasher.hexdigest()
+
+
+def copy_atomic(src, dest):
+    """Copy "src" to "dest" so that "dest" is never seen partially written"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest) or '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
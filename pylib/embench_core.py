@@ -38,6 +38,7 @@ __all__ = [
     'log_args',
     'log_benchmarks',
     'embench_stats',
+    'embench_delta',
     'arglist_to_str',
 ]
 
@@ -272,12 +273,77 @@ def output_stats(geomean, geosd, georange, count, bm_type, opt_comma):
 
 
 def embench_stats(benchmarks, raw_data, rel_data, bm_type, opt_comma):
-    """Output statistics summary for Embench."""
+    """Output statistics summary for Embench.  Return the statistics as a
+       dictionary."""
     geomean, count = compute_geomean(benchmarks, raw_data, rel_data)
     geosd = compute_geosd(benchmarks, raw_data, rel_data, geomean, count)
     georange = compute_georange(geomean, geosd, count)
     output_stats(geomean, geosd, georange, count, bm_type, opt_comma)
 
+    return {
+        'count': int(count),
+        'geometric_mean': geomean if count > 0 else None,
+        'geometric_sd': geosd if count > 0 else None,
+        'geometric_range': georange if count > 0 else None,
+    }
+
+
+def embench_delta(benchmarks, raw_data, cmp_data, bm_type):
+    """Output the change in the raw result of each benchmark, "raw_data",
+       from that of the same benchmark in a comparison build, "cmp_data", as a
+       percentage, followed by the geometric mean of the change.  Benchmarks
+       missing from either build are shown without a value.  Return the
+       change of each benchmark as a dictionary, and the geometric mean of
+       the change, or None if no benchmark could be compared.
+
+       Note that we manually generate the JSON output, rather than using the
+       dumps method, because the result will be manually edited, and we want
+       to guarantee the layout."""
+    delta = {}
+    geomean = 1.0
+    count = 0
+
+    for bench in benchmarks:
+        if raw_data.get(bench, 0) > 0 and cmp_data.get(bench, 0) > 0:
+            ratio = raw_data[bench] / cmp_data[bench]
+            delta[bench] = (ratio - 1.0) * 100.0
+            geomean *= ratio
+            count += 1
+
+    if count > 0:
+        geomean = (pow(geomean, 1.0 / count) - 1.0) * 100.0
+
+    if gp['output_format'] == output_format.JSON:
+        log.info('    "{bm} delta" :'.format(bm=bm_type))
+        first = True
+        for bench in benchmarks:
+            if bench in delta:
+                prefix = '    { ' if first else '      '
+                log.info('{pre}"{bench}" : {dl:.2f},'.format(pre=prefix, bench=bench, dl=delta[bench]))
+                first = False
+        if first:
+            log.info('    {')
+        if count > 0:
+            log.info('      "geometric mean" : {gm:.2f}'.format(gm=geomean))
+        else:
+            log.info('      "geometric mean" : null')
+        log.info('    },')
+    elif gp['output_format'] == output_format.TEXT:
+        log.info('Benchmark           {bm} delta'.format(bm=bm_type))
+        log.info('---------           -----------')
+        for bench in benchmarks:
+            output = ''
+            if bench in delta:
+                output = '{dl:+7.2f}%'.format(dl=delta[bench])
+            log.info('{bench:15}  {out:8}'.format(bench=bench, out=output))
+        log.info('---------           -----------')
+        if count > 0:
+            log.info('Geometric mean   {gm:+7.2f}%'.format(gm=geomean))
+        else:
+            log.info('Geometric mean    -')
+
+    return delta, geomean if count > 0 else None
+
 
 def arglist_to_str(arglist):
     """Make arglist into a string"""
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+
+# Build executors for Embench builds.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench build executors.
+
+Every compiler, archiver and linker command of a build is run by an executor.
+All executors behave like subprocess.run with stdout and stderr captured:
+they return a subprocess.CompletedProcess, and raise subprocess.TimeoutExpired
+if the command does not complete in time.  In either case the "usage"
+attribute holds the resources used by the command, as returned by
+run_measured, or None if they are not known.  The executors are:
+
+- LocalExecutor, which runs each command directly, as a child of the build;
+- PoolExecutor, which runs each command from a pool of local worker
+  processes; and
+- SocketExecutor, which sends each command to one of a set of build workers
+  over TCP.
+
+A build worker is started with serve_worker.  Workers run commands in the
+directory named by the build, so they must see the source and build
+directories, and the tools, at the same paths as the build, for example on a
+shared file system.  Workers run any command they are sent, so must only be
+reachable from trusted hosts.
+
+The protocol is a single line of JSON from the build, giving the command, its
+working directory, its timeout and any additional environment variables,
+answered by a single line of JSON from the worker, giving the exit code,
+whether the command timed out, the resources it used, and its stdout and
+stderr in base64.
+"""
+
+__all__ = [
+    'LocalExecutor',
+    'PoolExecutor',
+    'SocketExecutor',
+    'parse_endpoint',
+    'run_command',
+    'run_measured',
+    'serve_worker',
+]
+
+import base64
+import concurrent.futures
+import itertools
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+
+from embench_core import log
+
+
+# Bump this whenever the protocol between builds and workers changes
+PROTOCOL_VERSION = 1
+
+# Extra time allowed for a worker to report a timed out command
+WORKER_GRACE = 10
+
+
+def exit_code(status):
+    """Return the exit code for the wait status "status", negative for a
+       signal, as subprocess reports it"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+
+    return os.WEXITSTATUS(status)
+
+
+def exited(pid):
+    """Return True if the child process "pid" has exited, without reaping it"""
+    return os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+
+
+def run_measured(arglist, cwd, timeout, env=None):
+    """Run the command "arglist" as subprocess.run would, with stdout and
+       stderr captured, in directory "cwd" and with environment "env",
+       allowing it "timeout" seconds.  The result, or the TimeoutExpired
+       exception, has the additional attribute "usage", a dictionary of the
+       user and system CPU time in seconds, and the peak resident set size
+       in KiB, of the command.  Where this can't be measured, "usage" is
+       None."""
+    if not hasattr(os, 'wait4') or not hasattr(os, 'waitid'):
+        res = subprocess.run(
+            arglist,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            timeout=timeout,
+            env=env,
+        )
+        res.usage = None
+        return res
+
+    proc = subprocess.Popen(
+        arglist, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, env=env
+    )
+
+    # Read the output while waiting, so the command can't block on a full
+    # pipe, and kill the command if it takes too long.
+    output = {}
+
+    def read(name, fileh):
+        output[name] = fileh.read()
+        fileh.close()
+
+    readers = [
+        threading.Thread(target=read, args=('stdout', proc.stdout)),
+        threading.Thread(target=read, args=('stderr', proc.stderr)),
+    ]
+    for reader in readers:
+        reader.start()
+
+    # The command is only killed while it is still running, and so can't
+    # have been reaped, since its pid could then have been reused.  Reaping
+    # and killing are serialized by "lock".
+    timed_out = threading.Event()
+    lock = threading.Lock()
+    reaped = threading.Event()
+
+    def kill():
+        with lock:
+            if reaped.is_set() or exited(proc.pid):
+                return
+            timed_out.set()
+            proc.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+
+    # Reap the command ourselves, since that is the only way to get its
+    # resource usage.  Wait for it to exit first without reaping it, so that
+    # it is not reaped while a kill is in progress.
+    os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+    with lock:
+        _, status, rusage = os.wait4(proc.pid, 0)
+        reaped.set()
+    timer.cancel()
+    proc.returncode = exit_code(status)
+    for reader in readers:
+        reader.join()
+
+    # Peak RSS is in bytes on macOS and KiB elsewhere
+    maxrss = rusage.ru_maxrss
+    if sys.platform == 'darwin':
+        maxrss //= 1024
+    usage = {'user': rusage.ru_utime, 'sys': rusage.ru_stime, 'maxrss': maxrss}
+
+    if timed_out.is_set():
+        error = subprocess.TimeoutExpired(
+            arglist, timeout, output=output['stdout'], stderr=output['stderr']
+        )
+        error.usage = usage
+        raise error
+
+    res = subprocess.CompletedProcess(
+        arglist, proc.returncode, output['stdout'], output['stderr']
+    )
+    res.usage = usage
+    return res
+
+
+def run_command(arglist, cwd, timeout, env=None):
+    """Run the command "arglist" in directory "cwd", with "env" a dictionary
+       of additional environment variables, allowing it "timeout" seconds.
+       Return a dictionary of the exit code, stdout and stderr, the resource
+       usage, and whether it timed out.  This is picklable, so can be returned from another
+       process."""
+    run_env = None
+    if env:
+        run_env = dict(os.environ)
+        run_env.update(env)
+
+    try:
+        res = run_measured(arglist, cwd, timeout, run_env)
+    except subprocess.TimeoutExpired as error:
+        return {
+            'returncode': None,
+            'timed_out': True,
+            'stdout': error.stdout or b'',
+            'stderr': error.stderr or b'',
+            'usage': error.usage,
+        }
+    except OSError as error:
+        # As the shell would report a missing command
+        return {
+            'returncode': 127,
+            'timed_out': False,
+            'stdout': b'',
+            'stderr': str(error).encode('utf-8'),
+            'usage': None,
+        }
+
+    return {
+        'returncode': res.returncode,
+        'timed_out': False,
+        'stdout': res.stdout,
+        'stderr': res.stderr,
+        'usage': res.usage,
+    }
+
+
+def completed(arglist, timeout, result):
+    """Convert the dictionary "result" from run_command, for the command
+       "arglist" with timeout "timeout", to the result subprocess.run would
+       have given."""
+    if result['timed_out']:
+        error = subprocess.TimeoutExpired(
+            arglist, timeout, output=result['stdout'], stderr=result['stderr']
+        )
+        error.usage = result['usage']
+        raise error
+
+    res = subprocess.CompletedProcess(
+        arglist, result['returncode'], result['stdout'], result['stderr']
+    )
+    res.usage = result['usage']
+    return res
+
+
+class LocalExecutor:
+    """Run each command as a child process of the build"""
+
+    description = 'local'
+
+    def run(self, arglist, cwd, timeout):
+        """Run "arglist" in directory "cwd", allowing it "timeout" seconds"""
+        return run_measured(arglist, cwd, timeout)
+
+    def close(self):
+        """Nothing to release"""
+
+
+class PoolExecutor:
+    """Run each command from a pool of "workers" local processes"""
+
+    def __init__(self, workers):
+        self.description = 'pool of {num} processes'.format(num=workers)
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+    def run(self, arglist, cwd, timeout):
+        """Run "arglist" in directory "cwd", allowing it "timeout" seconds"""
+        future = self._pool.submit(run_command, arglist, cwd, timeout)
+        return completed(arglist, timeout, future.result())
+
+    def close(self):
+        """Shut down the pool"""
+        self._pool.shutdown()
+
+
+def parse_endpoint(endpoint):
+    """Return the host and port of "endpoint", given as "HOST:PORT", or None
+       if it is not of that form."""
+    host, sep, port = endpoint.rpartition(':')
+    if not sep or not host or not port.isdigit():
+        return None
+
+    return host, int(port)
+
+
+class SocketExecutor:
+    """Send each command to one of the build workers at "endpoints", a list
+       of (host, port) tuples, in turn.  "env" is a dictionary of additional
+       environment variables for every command.
+
+       If a worker can't be reached, the next one is tried.  If none can be
+       reached, the command fails with exit code 255, as ssh would report.
+       Once a command has been sent to a worker, it may have run, so it is
+       never sent to another: if the reply is lost or late, the command
+       fails, or times out."""
+
+    def __init__(self, endpoints, env=None):
+        self.description = 'workers at {eps}'.format(
+            eps=', '.join('{0}:{1}'.format(*ep) for ep in endpoints)
+        )
+        self._endpoints = list(endpoints)
+        self._env = dict(env or {})
+        self._next = itertools.cycle(range(len(self._endpoints)))
+        self._lock = threading.Lock()
+
+    def _request(self, sock, request):
+        """Send "request" to the worker connected to "sock" and return its
+           decoded reply"""
+        with sock:
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as fileh:
+                reply = json.loads(fileh.readline().decode('utf-8'))
+
+        if reply.get('protocol') != PROTOCOL_VERSION:
+            raise ValueError('unsupported protocol version')
+        return {
+            'returncode': reply['returncode'],
+            'timed_out': reply['timed_out'],
+            'stdout': base64.b64decode(reply['stdout']),
+            'stderr': base64.b64decode(reply['stderr']),
+            'usage': reply.get('usage'),
+        }
+
+    def run(self, arglist, cwd, timeout):
+        """Run "arglist" in directory "cwd", allowing it "timeout" seconds"""
+        request = {
+            'protocol': PROTOCOL_VERSION,
+            'args': arglist,
+            'cwd': cwd,
+            'timeout': timeout,
+            'env': self._env,
+        }
+        with self._lock:
+            first = next(self._next)
+
+        errors = []
+        for idx in range(len(self._endpoints)):
+            endpoint = self._endpoints[(first + idx) % len(self._endpoints)]
+            try:
+                sock = socket.create_connection(
+                    endpoint, timeout=timeout + WORKER_GRACE
+                )
+            except OSError as error:
+                log.debug('Build worker {host}:{port} failed: {err}'.format(
+                    host=endpoint[0], port=endpoint[1], err=error))
+                errors.append(str(error))
+                continue
+
+            try:
+                result = self._request(sock, request)
+            except (OSError, ValueError, KeyError) as error:
+                stderr = 'Build worker {host}:{port} lost command: {err}'.format(
+                    host=endpoint[0], port=endpoint[1], err=error)
+                log.debug(stderr)
+                result = {
+                    'returncode': 255,
+                    'timed_out': isinstance(error, socket.timeout),
+                    'stdout': b'',
+                    'stderr': stderr.encode('utf-8'),
+                    'usage': None,
+                }
+            return completed(arglist, timeout, result)
+
+        stderr = 'No build worker available: {errs}'.format(errs='; '.join(errors))
+        res = subprocess.CompletedProcess(arglist, 255, b'', stderr.encode('utf-8'))
+        res.usage = None
+        return res
+
+    def close(self):
+        """Nothing to release, since each command has its own connection"""
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    """Run one command for a build"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            if request.get('protocol') != PROTOCOL_VERSION:
+                raise ValueError('unsupported protocol version')
+            result = run_command(
+                request['args'], request['cwd'], request['timeout'], request.get('env')
+            )
+        except (ValueError, KeyError, TypeError) as error:
+            log.warning('Warning: Bad request from {client}: {err}'.format(
+                client=self.client_address[0], err=error))
+            return
+
+        log.debug('{client}: {cmd}: {res}'.format(
+            client=self.client_address[0],
+            cmd=' '.join(request['args']),
+            res='timed out' if result['timed_out'] else result['returncode']))
+        reply = {
+            'protocol': PROTOCOL_VERSION,
+            'returncode': result['returncode'],
+            'timed_out': result['timed_out'],
+            'stdout': base64.b64encode(result['stdout']).decode('ascii'),
+            'stderr': base64.b64encode(result['stderr']).decode('ascii'),
+            'usage': result['usage'],
+        }
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    """A build worker, running each command in its own thread"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve_worker(host, port):
+    """Serve build requests on "host" and "port" until interrupted.  A port
+       of 0 picks any free port.  The address actually used is logged."""
+    with WorkerServer((host, port), WorkerHandler) as server:
+        log.info('Build worker listening on {0}:{1}'.format(*server.server_address))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+# A GDB/MI client for running Embench benchmarks.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench GDB/MI client.
+
+Drives a single long running GDB through its machine interface, so that a
+target module can run many benchmarks through one GDB, and one GDB server,
+rather than starting both for each benchmark.  Results are read from the MI
+result records, rather than from GDB's human readable output.
+"""
+
+__all__ = [
+    'GdbMi',
+    'GdbMiError',
+    'mi_quote',
+    'parse_mi_record',
+]
+
+import queue
+import subprocess
+import threading
+import time
+
+from embench_core import log
+
+
+class GdbMiError(Exception):
+    """A GDB/MI command failed, GDB did not respond in time, or GDB exited"""
+
+
+def mi_quote(text):
+    """Return "text" as an MI C string"""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\'}
+
+
+def parse_mi_string(line, pos):
+    """Parse the C string starting at the quote at "pos" in "line".  Return
+       its value and the position after the closing quote."""
+    chars = []
+    pos += 1
+    while pos < len(line) and line[pos] != '"':
+        if line[pos] == '\\' and pos + 1 < len(line):
+            pos += 1
+            chars.append(ESCAPES.get(line[pos], line[pos]))
+        else:
+            chars.append(line[pos])
+        pos += 1
+
+    return ''.join(chars), pos + 1
+
+
+def parse_mi_value(line, pos):
+    """Parse the MI value, a C string, tuple or list, at "pos" in "line".
+       Return its value, as a string, dictionary or list, and the position
+       after it."""
+    if line[pos] == '"':
+        return parse_mi_string(line, pos)
+
+    if line[pos] == '{':
+        return parse_mi_results(line, pos + 1, '}')
+
+    # A list of values or of results
+    items = []
+    pos += 1
+    while pos < len(line) and line[pos] != ']':
+        if line[pos] in '"{[':
+            value, pos = parse_mi_value(line, pos)
+        else:
+            name_end = line.index('=', pos)
+            value, pos = parse_mi_value(line, name_end + 1)
+        items.append(value)
+        if pos < len(line) and line[pos] == ',':
+            pos += 1
+
+    return items, pos + 1
+
+
+def parse_mi_results(line, pos, end=None):
+    """Parse the comma separated results "name=value" from "pos" in "line",
+       up to the character "end" or the end of the line.  Return them as a
+       dictionary and the position after the end."""
+    results = {}
+    while pos < len(line) and line[pos] != end:
+        name_end = line.index('=', pos)
+        results[line[pos:name_end]], pos = parse_mi_value(line, name_end + 1)
+        if pos < len(line) and line[pos] == ',':
+            pos += 1
+
+    return results, pos + 1
+
+
+def parse_mi_record(line):
+    """Parse one line of MI output.  Return the token, as an integer or None,
+       the record type, one of "^*+=~@&" or "(" for the prompt, the class,
+       such as "done" or "stopped", and the results as a dictionary.  For
+       stream records the class is None and the results are the text.  Return
+       None for lines that are not MI records."""
+    line = line.rstrip('\r\n')
+    if line.startswith('(gdb)'):
+        return None, '(', None, {}
+
+    pos = 0
+    while pos < len(line) and line[pos].isdigit():
+        pos += 1
+    token = int(line[:pos]) if pos else None
+    if pos >= len(line) or line[pos] not in '^*+=~@&':
+        return None
+
+    kind = line[pos]
+    if kind in '~@&':
+        text, _ = parse_mi_string(line, pos + 1)
+        return token, kind, None, text
+
+    cls_end = line.find(',', pos)
+    if cls_end < 0:
+        return token, kind, line[pos + 1:], {}
+
+    try:
+        results, _ = parse_mi_results(line, cls_end + 1)
+    except (ValueError, IndexError):
+        results = {}
+    return token, kind, line[pos + 1:cls_end], results
+
+
+class GdbMi:
+    """A GDB, started with the command "arglist", driven through GDB/MI.
+       Anything written to stderr by GDB, or by a GDB server it starts, is
+       kept separately, and can be read with stderr_line."""
+
+    def __init__(self, arglist):
+        try:
+            self._proc = subprocess.Popen(
+                arglist + ['--interpreter=mi2', '--quiet', '--nx'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as error:
+            raise GdbMiError(f'Unable to start GDB: {error}')
+        self._token = 0
+        self._stdout = queue.Queue()
+        self._stderr = queue.Queue()
+        self._stopped = []
+        for fileh, lines in [(self._proc.stdout, self._stdout),
+                             (self._proc.stderr, self._stderr)]:
+            threading.Thread(
+                target=self._read, args=(fileh, lines), daemon=True
+            ).start()
+
+    @staticmethod
+    def _read(fileh, lines):
+        """Copy each line of "fileh" to the queue "lines", followed by None
+           at the end of the file"""
+        for line in iter(fileh.readline, b''):
+            lines.put(line.decode('utf-8', errors='replace'))
+        lines.put(None)
+
+    def _record(self, deadline):
+        """Return the next MI record, waiting until "deadline" at most"""
+        while True:
+            try:
+                line = self._stdout.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                raise GdbMiError('GDB timed out')
+            if line is None:
+                # Leave the end of file for any later reads
+                self._stdout.put(None)
+                raise GdbMiError('GDB exited')
+            record = parse_mi_record(line)
+            if record:
+                return record
+
+    def command(self, cmd, timeout):
+        """Send the MI command "cmd", allowing "timeout" seconds for its
+           result.  Return the class and results of its result record, and
+           the text of any console or target output it produced.  Raise
+           GdbMiError if the command fails."""
+        self._token += 1
+        token = self._token
+        try:
+            self._proc.stdin.write(f'{token}{cmd}\n'.encode('utf-8'))
+            self._proc.stdin.flush()
+        except OSError as error:
+            raise GdbMiError(f'GDB exited: {error}')
+
+        deadline = time.monotonic() + timeout
+        text = []
+        while True:
+            rec_token, kind, cls, results = self._record(deadline)
+            if kind in '~@':
+                text.append(results)
+            elif kind == '*' and cls == 'stopped':
+                self._stopped.append(results)
+            elif kind == '^' and rec_token == token:
+                if cls == 'error':
+                    raise GdbMiError(f'{cmd}: {results.get("msg", "failed")}')
+                return cls, results, ''.join(text)
+
+    def wait_stopped(self, timeout):
+        """Return the results of the next stop of the target, allowing
+           "timeout" seconds for it"""
+        deadline = time.monotonic() + timeout
+        while not self._stopped:
+            _, kind, cls, results = self._record(deadline)
+            if kind == '*' and cls == 'stopped':
+                return results
+
+        return self._stopped.pop(0)
+
+    def drain_stderr(self):
+        """Discard anything written to stderr so far"""
+        while True:
+            try:
+                self._stderr.get_nowait()
+            except queue.Empty:
+                return
+
+    def stderr_line(self, timeout):
+        """Return the next line written to stderr, or None if there is none
+           within "timeout" seconds"""
+        try:
+            return self._stderr.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Ask GDB to exit, killing it if it does not"""
+        if self._proc.poll() is None:
+            try:
+                self._proc.stdin.write(b'-gdb-exit\n')
+                self._proc.stdin.flush()
+                self._proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                log.debug('GDB did not exit: killing it')
+                self._proc.kill()
+                self._proc.wait()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+# Persistent incremental build graph for Embench builds.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench incremental build graph.
+
+For every object file the graph records the command which built it and the
+modification time of every file it depended on, as reported by the
+compiler's dependency file.  For every executable it records the link command
+and the modification times of all its inputs.  An output is up to date only
+if its command is unchanged and none of its inputs have changed, so editing a
+header rebuilds exactly the objects including it, and relinks exactly the
+benchmarks using those objects.
+"""
+
+__all__ = [
+    'BuildGraph',
+    'file_stamp',
+    'parse_depfile',
+    'tool_stamp',
+]
+
+import json
+import os
+import shutil
+import threading
+
+from embench_core import log
+
+
+# Bump this whenever the layout of the graph file changes
+GRAPH_VERSION = 1
+
+
+def parse_depfile(depfile):
+    """Parse the make format dependency file "depfile", as written by the
+       compiler, and return the list of prerequisite file names.  Return None
+       if the file can't be read."""
+    try:
+        with open(depfile) as fileh:
+            text = fileh.read()
+    except OSError:
+        return None
+
+    # Join continuation lines, then split off the targets.  Only the first
+    # rule is needed, since later ones are the phony header rules.
+    text = text.replace('\\\n', ' ')
+    rule = text.split('\n', 1)[0]
+    if ':' not in rule:
+        return None
+    _, prereqs = rule.split(': ', 1) if ': ' in rule else rule.split(':', 1)
+
+    # Spaces in file names are escaped with a backslash
+    deps = []
+    name = ''
+    pos = 0
+    while pos < len(prereqs):
+        char = prereqs[pos]
+        if char == '\\' and pos + 1 < len(prereqs) and prereqs[pos + 1] == ' ':
+            name += ' '
+            pos += 1
+        elif char.isspace():
+            if name:
+                deps.append(name)
+            name = ''
+        else:
+            name += char
+        pos += 1
+    if name:
+        deps.append(name)
+
+    return deps
+
+
+def file_stamp(path):
+    """Return a stamp for the file "path" which changes whenever the file is
+       modified, or None if the file does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def tool_stamp(tool):
+    """Return a stamp for the tool "tool", found on the path, which changes
+       when the tool is replaced."""
+    path = shutil.which(tool)
+    if not path:
+        return [tool, None]
+
+    path = os.path.realpath(path)
+    return [path, file_stamp(path)]
+
+
+class BuildGraph:
+    """The graph of objects and executables in a build directory, and what
+       each was built from.
+
+       Updates are thread-safe. Nothing is written until save() is called, so
+       an interrupted build just leaves the graph from the previous build, and
+       anything built since then is rebuilt next time."""
+
+    def __init__(self, graphfile, tools):
+        """Load the graph from "graphfile".  "tools" is a stamp of the tools
+           used. If it differs from that when the graph was saved, the graph is
+           discarded and everything rebuilt."""
+        self.graphfile = graphfile
+        self.tools = tools
+        self.objects = {}
+        self.links = {}
+        self._lock = threading.Lock()
+
+        try:
+            with open(graphfile) as fileh:
+                data = json.load(fileh)
+        except (OSError, ValueError):
+            return
+
+        if (data.get('version') == GRAPH_VERSION and
+                data.get('tools') == tools):
+            self.objects = data.get('objects', {})
+            self.links = data.get('links', {})
+        else:
+            log.debug('Build graph {graph} is stale: rebuilding everything'
+                      .format(graph=graphfile))
+
+    @staticmethod
+    def _up_to_date(entry, arglist, output):
+        """Is "output", built with "arglist", up to date according to its
+           graph entry "entry"?"""
+        if not entry or entry['args'] != arglist:
+            return False
+        if file_stamp(output) != entry['output']:
+            return False
+
+        for path, stamp in entry['inputs'].items():
+            if file_stamp(path) != stamp:
+                return False
+
+        return True
+
+    def _record(self, table, name, arglist, output, inputs):
+        """Record in "table" that "output" was built by "arglist" from the
+           files in "inputs"."""
+        entry = {
+            'args': arglist,
+            'output': file_stamp(output),
+            'inputs': {path: file_stamp(path) for path in inputs},
+        }
+        with self._lock:
+            table[name] = entry
+
+    def _forget(self, table, name):
+        """Remove any entry for "name" from "table"."""
+        with self._lock:
+            table.pop(name, None)
+
+    def object_up_to_date(self, abs_bin, arglist):
+        """Is the object "abs_bin", which would be compiled with "arglist", up
+           to date?"""
+        return self._up_to_date(self.objects.get(abs_bin), arglist, abs_bin)
+
+    def record_object(self, abs_bin, arglist, deps):
+        """Record that object "abs_bin" was compiled by "arglist" from the
+           files "deps", or forget it if "deps" is None."""
+        if deps is None:
+            self._forget(self.objects, abs_bin)
+        else:
+            self._record(self.objects, abs_bin, arglist, abs_bin, deps)
+
+    def link_up_to_date(self, bench, exe, arglist):
+        """Is the executable "exe" for benchmark "bench", which would be
+           linked with "arglist", up to date?"""
+        return self._up_to_date(self.links.get(bench), arglist, exe)
+
+    def record_link(self, bench, exe, arglist, inputs):
+        """Record that the executable "exe" for benchmark "bench" was linked by
+           "arglist" from the files "inputs", or forget it if "inputs" is
+           None."""
+        if inputs is None:
+            self._forget(self.links, bench)
+        else:
+            self._record(self.links, bench, arglist, exe, inputs)
+
+    def files(self):
+        """Return the list of every object in the graph, and every file from
+           which the objects and executables were built"""
+        with self._lock:
+            files = list(self.objects)
+            for entry in list(self.objects.values()) + list(self.links.values()):
+                files.extend(entry['inputs'])
+
+        return files
+
+    def save(self):
+        """Write the graph back to its file"""
+        data = {
+            'version': GRAPH_VERSION,
+            'tools': self.tools,
+            'objects': self.objects,
+            'links': self.links,
+        }
+        tmpfile = self.graphfile + '.tmp'
+        try:
+            with open(tmpfile, 'w') as fileh:
+                json.dump(data, fileh, indent=1, sort_keys=True)
+            os.replace(tmpfile, self.graphfile)
+        except OSError as error:
+            log.warning('Warning: Unable to save build graph {graph}: {err}'
+                        .format(graph=self.graphfile, err=error))
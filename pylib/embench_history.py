@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# History of Embench benchmark run times.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench run time history.
+
+The wall clock time of each successful benchmark run is recorded for each
+target, so that later runs on that target can be given a timeout suited to
+each benchmark, rather than one timeout for all.  A target is identified by
+its target module and target arguments, other than the clock rate.
+
+The run time of a benchmark which has been run on the target before is
+predicted to be that of its slowest recent run.  For a benchmark not yet run
+on the target, it is its baseline time, scaled by how much slower the target
+has been than the baseline for the benchmarks which have been run.
+
+The number of iterations of each benchmark is proportional to the clock rate
+for which it was built.  On a simulator its run time grows with the clock
+rate, while on hardware running at that rate it stays much the same.  So
+times recorded at a lower clock rate are scaled up, but those recorded at a
+higher clock rate are not scaled down.
+"""
+
+__all__ = [
+    'RunHistory',
+]
+
+import json
+import os
+
+from embench_core import log
+from embench_repeat import median
+
+
+# Bump this whenever the layout of the history file changes
+HISTORY_VERSION = 1
+
+# How many of the most recent runs of each benchmark to remember
+KEEP_RUNS = 5
+
+
+class RunHistory:
+    """The run times recorded in "historyfile" for the target module
+       "module" with the target arguments "target_args", a dictionary"""
+
+    def __init__(self, historyfile, module, target_args):
+        self.historyfile = historyfile
+        self._history = {'version': HISTORY_VERSION, 'targets': {}}
+        if os.path.isfile(historyfile):
+            try:
+                with open(historyfile) as fileh:
+                    history = json.load(fileh)
+                if history.get('version') == HISTORY_VERSION:
+                    self._history = history
+            except (OSError, ValueError) as error:
+                log.warning(f'Warning: Unable to read run time history {historyfile}: {error}')
+
+        args = {key: val for key, val in target_args.items() if key != 'cpu_mhz'}
+        target = json.dumps([module, args], sort_keys=True, default=str)
+        self._runs = self._history['targets'].setdefault(target, {})
+
+    def predict(self, bench, baseline, cpu_mhz):
+        """Return the predicted wall clock time in seconds of "bench", built
+           for a clock rate of "cpu_mhz", or None if there is no basis for a
+           prediction.  "baseline" is the dictionary of baseline times of
+           each benchmark."""
+        def slowest(runs):
+            return max(runs['wall']) * max(1.0, cpu_mhz / runs['cpu_mhz'])
+
+        if bench in self._runs:
+            return slowest(self._runs[bench])
+
+        # Seconds on this target per millisecond of baseline time
+        ratios = [
+            slowest(runs) / baseline[other]
+            for other, runs in self._runs.items()
+            if baseline.get(other)
+        ]
+        if ratios and baseline.get(bench):
+            return median(ratios) * baseline[bench]
+
+        return None
+
+    def record(self, bench, wall, cpu_mhz):
+        """Record a successful run of "bench", built for a clock rate of
+           "cpu_mhz", which took "wall" seconds"""
+        runs = self._runs.get(bench)
+        if not runs or runs['cpu_mhz'] != cpu_mhz:
+            runs = {'cpu_mhz': cpu_mhz, 'wall': []}
+            self._runs[bench] = runs
+        runs['wall'] = (runs['wall'] + [wall])[-KEEP_RUNS:]
+
+    def save(self):
+        """Write the history back to its file"""
+        tmpfile = self.historyfile + '.tmp'
+        try:
+            with open(tmpfile, 'w') as fileh:
+                json.dump(self._history, fileh, indent=1)
+            os.replace(tmpfile, self.historyfile)
+        except OSError as error:
+            log.warning(f'Warning: Unable to save run time history {self.historyfile}: {error}')
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Dependency graph job runner for Embench builds.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench job graph runner.
+
+A build is a graph of jobs, each of which may depend on others.  Jobs are run
+on a pool of threads as soon as everything they depend on has completed, so
+independent work proceeds concurrently.  The jobs themselves spend their time
+waiting for compiler and linker subprocesses, so threads are sufficient.
+"""
+
+__all__ = [
+    'Job',
+    'run_jobs',
+]
+
+import concurrent.futures
+
+
+class Job:
+    """A call of "func" with arguments "args", which can only be run once
+       all the jobs in "deps" have completed.  Once run, "result" holds the
+       value returned by the function."""
+
+    def __init__(self, func, *args, deps=None):
+        self.func = func
+        self.args = args
+        self.deps = list(deps or [])
+        self.result = None
+        self.done = False
+
+    def run(self):
+        """Call the function of the job"""
+        return self.func(*self.args)
+
+
+def run_jobs(jobs, max_workers, on_done=None):
+    """Run all the jobs in "jobs", with at most "max_workers" running at
+       once.  Every dependency of a job must itself be in "jobs".  Jobs which
+       are ready at the same time are started in the order they appear in
+       "jobs".
+
+       If given, "on_done" is called with each job as it completes.  It is
+       always called from the calling thread, so need not be thread-safe."""
+    waiting = {}
+    dependents = {job: [] for job in jobs}
+    ready = []
+
+    for job in jobs:
+        waiting[job] = len(job.deps)
+        for dep in job.deps:
+            dependents[dep].append(job)
+        if not job.deps:
+            ready.append(job)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        for job in ready:
+            running[pool.submit(job.run)] = job
+
+        while running:
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for fut in done:
+                job = running.pop(fut)
+                job.result = fut.result()
+                job.done = True
+
+                for dependent in dependents[job]:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        running[pool.submit(dependent.run)] = dependent
+
+                if on_done:
+                    on_done(job)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+# Build manifest for fast no-op Embench builds.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench build manifest.
+
+After a successful build, the manifest records a fingerprint of the command
+line, and a stamp of every file the build read or wrote: the tools, the
+configuration files, the build scripts, every source file and header, every
+directory searched for source files, and every object and executable.  If a
+later build has the same fingerprint and none of those files has changed,
+there is nothing to do, and the build can finish without reading the
+configuration files, checking the tools or running any job.
+"""
+
+__all__ = [
+    'BuildManifest',
+]
+
+import hashlib
+import json
+import os
+
+from embench_core import log
+from embench_graph import file_stamp
+
+
+# Bump this whenever the layout of the manifest file changes
+MANIFEST_VERSION = 1
+
+
+class BuildManifest:
+    """The manifest of a complete, successful build in a build directory"""
+
+    def __init__(self, manifestfile, settings):
+        """Load the manifest from "manifestfile".  "settings" is a JSON
+           serializable description of everything on the command line, and in
+           the environment, which affects the build."""
+        self.manifestfile = manifestfile
+        self.fingerprint = hashlib.sha256(
+            json.dumps(settings, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        self.data = None
+
+        try:
+            with open(manifestfile) as fileh:
+                data = json.load(fileh)
+        except (OSError, ValueError):
+            return
+
+        if (data.get('version') == MANIFEST_VERSION and
+                data.get('fingerprint') == self.fingerprint):
+            self.data = data
+
+    def up_to_date(self):
+        """Is the build directory as the last successful build with the same
+           settings left it?  Only file stamps are checked, so this is fast
+           even for large builds."""
+        if not self.data:
+            return False
+
+        for path, stamp in self.data['files'].items():
+            if file_stamp(path) != stamp:
+                log.debug('Build manifest: {path} has changed'.format(path=path))
+                return False
+
+        return True
+
+    @property
+    def summary(self):
+        """The summary recorded with the manifest, for reporting the build
+           without repeating it."""
+        return self.data['summary']
+
+    def save(self, files, summary):
+        """Write the manifest of a successful build, which read or wrote all
+           the files in "files", with the JSON serializable "summary" of what
+           was built."""
+        data = {
+            'version': MANIFEST_VERSION,
+            'fingerprint': self.fingerprint,
+            'summary': summary,
+            'files': {path: file_stamp(path) for path in sorted(set(files))},
+        }
+        tmpfile = self.manifestfile + '.tmp'
+        try:
+            with open(tmpfile, 'w') as fileh:
+                json.dump(data, fileh, indent=1, sort_keys=True)
+            os.replace(tmpfile, self.manifestfile)
+        except OSError as error:
+            log.warning('Warning: Unable to save build manifest {manifest}: {err}'
+                        .format(manifest=self.manifestfile, err=error))
+
+    def discard(self):
+        """Remove the manifest, since the build directory no longer matches
+           it."""
+        try:
+            os.remove(self.manifestfile)
+        except FileNotFoundError:
+            pass
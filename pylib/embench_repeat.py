@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# Repeated measurement of Embench benchmarks.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench repetition engine.
+
+A measurement is repeated until the 95% confidence interval of its median is
+narrow enough, relative to the median, or until a maximum number of runs or a
+time budget is reached.  The confidence interval is computed from the order
+statistics of the runs, so it makes no assumption about the distribution of
+the measurements, which on a noisy host is usually skewed.
+"""
+
+__all__ = [
+    'median',
+    'median_ci',
+    'repetitions',
+]
+
+import math
+
+
+# Confidence level of the interval around the median
+CONFIDENCE = 0.95
+
+
+def median(samples):
+    """Return the median of the non-empty list "samples"."""
+    ordered = sorted(samples)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def median_ci(samples, confidence=CONFIDENCE):
+    """Return the lower and upper bounds of the "confidence" level,
+       distribution free, confidence interval of the median of "samples".
+       Return None if there are too few samples for an interval at that
+       level, which needs at least six samples for 95%."""
+    num = len(samples)
+    ordered = sorted(samples)
+    alpha = (1.0 - confidence) / 2
+
+    # The interval is from the k'th smallest to the k'th largest sample,
+    # with k the largest value such that the chance of fewer than k samples
+    # being below the median is at most alpha.
+    cumulative = 0.0
+    k = 0
+    for i in range(num + 1):
+        ways = math.factorial(num) // (math.factorial(i) * math.factorial(num - i))
+        cumulative += ways / 2 ** num
+        if cumulative > alpha:
+            break
+        k = i + 1
+
+    if k == 0:
+        return None
+
+    return ordered[k - 1], ordered[num - k]
+
+
+def repetitions(samples, elapsed, min_runs, max_runs, threshold, budget):
+    """Decide whether a measurement, which has given the positive values
+       "samples" in "elapsed" seconds so far, has been repeated enough.  It
+       has if there are at least "min_runs" samples, and the confidence
+       interval of the median is within "threshold" of the median, relative
+       to the median, or there are "max_runs" samples, or, if "budget" is not
+       None, "budget" seconds have been spent.
+
+       Return None if another run is needed.  Otherwise return a dictionary
+       of the "samples", their "median" and "min", the bounds of the
+       confidence interval, "ci_low" and "ci_high", which are None if there
+       are too few samples, and why the runs "stopped": "converged", "max
+       runs" or "budget"."""
+    if len(samples) < min_runs:
+        return None
+
+    interval = median_ci(samples)
+    centre = median(samples)
+    if interval and (interval[1] - interval[0]) / 2 <= threshold * centre:
+        stopped = 'converged'
+    elif len(samples) >= max_runs:
+        stopped = 'max runs'
+    elif budget is not None and elapsed >= budget:
+        stopped = 'budget'
+    else:
+        return None
+
+    return {
+        'samples': samples,
+        'median': centre,
+        'min': min(samples),
+        'ci_low': interval[0] if interval else None,
+        'ci_high': interval[1] if interval else None,
+        'stopped': stopped,
+    }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# Decoding of Embench result records.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench result records.
+
+Benchmarks built with the result_record configuration parameter, or the
+--result-record argument of build_all.py, write a single line record of the
+result when they exit, described in support/support.h:
+
+  EMBENCH_RESULT v=1 rc=0 unit=ns start=1200 stop=5600 instructions=9000
+
+Target modules decode it with decode_result_record, falling back to their own
+format for benchmarks built without it.  The version, "v", is only changed
+if a record could not be decoded as before, so a new field does not need a
+new version.
+"""
+
+__all__ = [
+    'RESULT_VERSION',
+    'decode_result_record',
+    'parse_result_record',
+]
+
+import re
+
+from embench_core import log
+
+# The version of the result record which is understood
+RESULT_VERSION = 1
+
+# Milliseconds per unit of time of the trigger counts.  Cycles are converted
+# with the clock rate.
+UNIT_MS = {
+    'ns': 1e-6,
+    'us': 1e-3,
+    'ms': 1.0,
+}
+
+
+def parse_result_record(text):
+    """Return the last result record in "text" as a dictionary, with the
+       version, return code, unit, start and stop counts and a dictionary of
+       any extra counters, or None if there is no record, or it can't be
+       decoded.  The unit and counts are None if the board did not record
+       them."""
+    lines = re.findall(r'^EMBENCH_RESULT( .*)$', text, re.M)
+    if not lines:
+        return None
+
+    fields = {}
+    for field in lines[-1].split():
+        name, sep, value = field.partition('=')
+        if not sep:
+            log.debug(f'Warning: Malformed result record field {field}')
+            return None
+        fields[name] = value
+
+    try:
+        version = int(fields.pop('v'))
+        if version != RESULT_VERSION:
+            log.debug(f'Warning: Unknown result record version {version}')
+            return None
+
+        record = {
+            'version': version,
+            'rc': int(fields.pop('rc')),
+            'unit': fields.pop('unit', None),
+            'start': None,
+            'stop': None,
+        }
+        if 'start' in fields and 'stop' in fields:
+            record['start'] = int(fields.pop('start'))
+            record['stop'] = int(fields.pop('stop'))
+        record['counters'] = {
+            name: float(value) for name, value in fields.items()
+        }
+    except (KeyError, ValueError):
+        log.debug(f'Warning: Malformed result record{lines[-1]}')
+        return None
+
+    return record
+
+
+def decode_result_record(text, metric='time', cpu_mhz=1):
+    """Decode the result record in "text".  Return the result for "metric",
+       either "time", the time of the benchmark in milliseconds, using
+       "cpu_mhz" for a count of cycles, or the name of an extra counter, or
+       zero if the benchmark failed or the result is not in the record.
+       Return None if there is no record, so the caller can fall back to
+       another way of decoding the results."""
+    record = parse_result_record(text)
+    if record is None:
+        return None
+
+    log.debug(f'Result record: {record}')
+    if record['rc'] != 0:
+        log.debug(f'Warning: Benchmark failed with return code {record["rc"]}')
+        return 0.0
+
+    if metric != 'time':
+        if metric not in record['counters']:
+            log.debug(f'Warning: Failed to find counter {metric}')
+            return 0.0
+        # Return value cannot be zero (will be interpreted as error)
+        return max(record['counters'][metric], 1e-6)
+
+    if record['start'] is None:
+        log.debug('Warning: Failed to find timing')
+        return 0.0
+
+    count = record['stop'] - record['start']
+    if record['unit'] == 'cycles':
+        ms_elapsed = count / cpu_mhz / 1000.0
+    elif record['unit'] in UNIT_MS:
+        ms_elapsed = count * UNIT_MS[record['unit']]
+    else:
+        log.debug(f'Warning: Unknown result record unit {record["unit"]}')
+        return 0.0
+
+    # Return value cannot be zero (will be interpreted as error)
+    return max(ms_elapsed, 1e-6)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Streaming output of Embench results.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench result stream.
+
+The size and speed scripts can write each result as a line of JSON the
+moment it is known, rather than only reporting once every benchmark is done.
+A dashboard can follow the file while the benchmarks run, and if a run is
+lost, the results so far are kept.  Each line is a JSON object, whose
+"record" field is one of:
+
+- "start", with the "version" of the layout and the "metric", "size" or
+  "speed", being measured;
+- "result", for each benchmark of each "build", "main" or "compare";
+- "delta", with the change of each benchmark from the build compared
+  against, if any; and
+- "summary", once all the benchmarks are done, with the geometric
+  statistics.
+
+Every record also has the "metric" and the "elapsed" time in seconds since
+the start.
+"""
+
+__all__ = [
+    'ResultStream',
+]
+
+import json
+import threading
+import time
+
+
+# Bump this whenever the layout of the records changes
+STREAM_VERSION = 1
+
+
+class ResultStream:
+    """A stream of the results of "metric", written to "filename".  Raises
+       OSError if the file can't be created.  All methods are thread-safe."""
+
+    def __init__(self, filename, metric):
+        self._fileh = open(filename, 'w')
+        self._metric = metric
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.write('start', version=STREAM_VERSION, time=time.time())
+
+    def write(self, record, **fields):
+        """Write a record of type "record" with the fields "fields", and
+           flush it, so it can be seen at once"""
+        line = {
+            'record': record,
+            'metric': self._metric,
+            'elapsed': round(time.monotonic() - self._start, 3),
+        }
+        line.update(fields)
+        with self._lock:
+            self._fileh.write(json.dumps(line) + '\n')
+            self._fileh.flush()
+
+    def close(self):
+        """Close the stream"""
+        with self._lock:
+            self._fileh.close()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+# Targets on which Embench benchmarks are run.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench targets.
+
+A target runs benchmark programs for benchmark_speed.py and decodes their
+results.  It is an instance of a subclass of Target, which a target module
+names as its "target_class".  The target parses the arguments left over on
+the command line itself, and is told about each run of a benchmark with a
+RunContext, so it need keep nothing about a run between calls.  This matters
+with --sim-parallel, when one target runs several benchmarks at once, each
+from the thread of its own job.
+
+There are three ways for a target to run benchmarks, tried in turn:
+
+- run_many, which runs a batch of benchmarks, for example all of them in one
+  session with a simulator or board;
+- run, which runs one benchmark; and
+- command, which gives a command to run one benchmark, whose output is
+  decoded by decode.
+
+Every target defines command and decode, which are abstract, but need only
+define run_many and run if it supports them: by default they return None,
+meaning the next way is tried.
+
+Older target modules define the functions get_target_args,
+build_benchmark_cmd and decode_results, and optionally run_benchmark and
+close_target, rather than a target class.  They are used through
+ModuleTarget.
+"""
+
+__all__ = [
+    'RunContext',
+    'Target',
+    'ModuleTarget',
+    'target_factory',
+]
+
+import abc
+import argparse
+import functools
+
+
+class RunContext:
+    """The context of a run of the benchmark "bench", whose directory is
+       "appdir" and executable "appexe", with the namespace of target
+       arguments "args".  The run is confined to the list of cores "cores",
+       or None if it may use any core, is allowed "timeout" seconds, and is
+       made by the job numbered "job"."""
+
+    def __init__(self, bench, appdir, appexe, args, cores, timeout, job):
+        self.bench = bench
+        self.appdir = appdir
+        self.appexe = appexe
+        self.args = args
+        self.cores = cores
+        self.timeout = timeout
+        self.job = job
+
+
+class Target(abc.ABC):
+    """Abstract base class of all targets.  "remnant" is the list of arguments left
+       over on the command line, parsed by get_args into "args"."""
+
+    def __init__(self, remnant):
+        self.args = self.get_args(remnant)
+
+    def get_args(self, remnant):
+        """Parse the target specific arguments in "remnant" and return them
+           as a namespace.  By default there are none."""
+        parser = argparse.ArgumentParser(description='Get target specific args')
+
+        return parser.parse_args(remnant)
+
+    def run_many(self, runs):
+        """Run the benchmarks of the list of RunContexts "runs", all for the
+           same job, in the thread of that job.  Return a list of the result
+           of each run, as from run, or None if batches can't be run."""
+        return None
+
+    def run(self, run):
+        """Run the benchmark of the RunContext "run" in the thread of its
+           job.  Return the result in milliseconds, or zero if the run
+           failed, or None if the benchmark is run with command instead."""
+        return None
+
+    @abc.abstractmethod
+    def command(self, run):
+        """Return the command to run the benchmark of the RunContext "run",
+           in its directory"""
+
+    @abc.abstractmethod
+    def decode(self, run, stdout_str, stderr_str):
+        """Extract the result of the RunContext "run" from the output of its
+           command.  Return the result in milliseconds, or zero if the run
+           failed."""
+
+    def close(self):
+        """Release anything held open for running benchmarks"""
+        pass
+
+
+class ModuleTarget(Target):
+    """The target defined by the functions of the older target module
+       "module", with the arguments left over on the command line
+       "remnant"."""
+
+    def __init__(self, module, remnant):
+        self.module = module
+        super().__init__(remnant)
+
+    def get_args(self, remnant):
+        return self.module.get_target_args(remnant)
+
+    def run(self, run):
+        if not hasattr(self.module, 'run_benchmark'):
+            return None
+
+        return self.module.run_benchmark(run.bench, run.appexe, run.args, run.timeout)
+
+    def command(self, run):
+        return self.module.build_benchmark_cmd(run.bench, run.args)
+
+    def decode(self, run, stdout_str, stderr_str):
+        return self.module.decode_results(stdout_str, stderr_str)
+
+    def close(self):
+        if hasattr(self.module, 'close_target'):
+            self.module.close_target()
+
+
+def target_factory(module):
+    """Return a function to create the target of the target module
+       "module" from the arguments left over on the command line"""
+    if hasattr(module, 'target_class'):
+        return module.target_class
+
+    return functools.partial(ModuleTarget, module)
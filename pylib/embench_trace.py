@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# Per-job instrumentation of Embench builds.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Embench build trace.
+
+Each job of a build, such as compiling a file or linking a benchmark, is
+recorded as a span, giving its wall time, and the user and system CPU time
+and peak resident set size of the commands it ran.  The spans are written as
+a JSON summary, listing the jobs slowest first, and as a trace in the Chrome
+trace event format, which can be loaded into chrome://tracing or Perfetto to
+see how the jobs were scheduled.
+"""
+
+__all__ = [
+    'BuildTrace',
+]
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+from embench_core import log
+
+
+# Bump this whenever the layout of the summary changes
+SUMMARY_VERSION = 1
+
+
+class BuildTrace:
+    """The spans of all the jobs of a build.  All methods are thread-safe."""
+
+    def __init__(self):
+        self.spans = []
+        self._start = time.monotonic()
+        self._lanes = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, category, name):
+        """Record the job "name" in category "category" while the context is
+           active.  The context value is the span, a dictionary to which the
+           job may add its "result"."""
+        span = {
+            'category': category,
+            'name': name,
+            'result': None,
+            'commands': 0,
+            'user': 0.0,
+            'sys': 0.0,
+            'maxrss': None,
+        }
+        self._local.span = span
+        start = time.monotonic()
+        try:
+            yield span
+        finally:
+            span['start'] = start - self._start
+            span['wall'] = time.monotonic() - start
+            self._local.span = None
+            with self._lock:
+                span['lane'] = self._lanes.setdefault(
+                    threading.get_ident(), len(self._lanes)
+                )
+                self.spans.append(span)
+
+    def account(self, usage):
+        """Add the resource usage, "usage", of a command, as given by the
+           build executor, to the span of the job running it in this thread,
+           if any.  "usage" is None if it is not known."""
+        span = getattr(self._local, 'span', None)
+        if span is None:
+            return
+
+        span['commands'] += 1
+        if usage:
+            span['user'] += usage['user']
+            span['sys'] += usage['sys']
+            span['maxrss'] = max(span['maxrss'] or 0, usage['maxrss'])
+
+    def summary(self):
+        """Return the summary of the build: the total for each category of
+           job, and every job, slowest first"""
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(
+                span['category'],
+                {'jobs': 0, 'commands': 0, 'wall': 0.0, 'user': 0.0, 'sys': 0.0, 'maxrss': None},
+            )
+            total['jobs'] += 1
+            total['commands'] += span['commands']
+            for key in ['wall', 'user', 'sys']:
+                total[key] += span[key]
+            if span['maxrss'] is not None:
+                total['maxrss'] = max(total['maxrss'] or 0, span['maxrss'])
+
+        return {
+            'version': SUMMARY_VERSION,
+            'elapsed': time.monotonic() - self._start,
+            'totals': totals,
+            'jobs': sorted(self.spans, key=lambda span: -span['wall']),
+        }
+
+    def chrome_trace(self):
+        """Return the spans in the Chrome trace event format, with one thread
+           for each lane of concurrent jobs"""
+        events = []
+        for lane in sorted(set(self._lanes.values())):
+            events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': lane,
+                'args': {'name': 'job lane {lane}'.format(lane=lane)},
+            })
+        for span in self.spans:
+            events.append({
+                'name': span['name'],
+                'cat': span['category'],
+                'ph': 'X',
+                'pid': 1,
+                'tid': span['lane'],
+                'ts': round(span['start'] * 1e6),
+                'dur': round(span['wall'] * 1e6),
+                'args': {
+                    key: span[key]
+                    for key in ['result', 'commands', 'user', 'sys', 'maxrss']
+                },
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, summaryfile, tracefile):
+        """Write the summary to "summaryfile" and the Chrome trace to
+           "tracefile" """
+        for filename, data in [(summaryfile, self.summary()),
+                               (tracefile, self.chrome_trace())]:
+            tmpfile = filename + '.tmp'
+            try:
+                with open(tmpfile, 'w') as fileh:
+                    json.dump(data, fileh, indent=1)
+                os.replace(tmpfile, filename)
+            except OSError as error:
+                log.warning('Warning: Unable to save build trace {trace}: {err}'
+                            .format(trace=filename, err=error))
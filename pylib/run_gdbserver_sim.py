@@ -17,95 +17,223 @@ This version is suitable for a gdbserver with simulator.
 """
 
 __all__ = [
-    'get_target_args',
-    'build_benchmark_cmd',
-    'decode_results',
+    'GdbserverSimTarget',
+    'target_class',
 ]
 
 import argparse
 import re
+import threading
 
 from embench_core import log
-
-
-def get_target_args(remnant):
-    """Parse left over arguments"""
-    parser = argparse.ArgumentParser(description='Get target specific args')
-
-    parser.add_argument(
-        '--gdb-command',
-        type=str,
-        default='gdb',
-        help='Command to invoke GDB',
-    )
-    parser.add_argument(
-        '--gdbserver-command',
-        type=str,
-        default='gdbserver',
-        help='Command to invoke the GDB server',
+from embench_gdbmi import GdbMi
+from embench_gdbmi import GdbMiError
+from embench_gdbmi import mi_quote
+from embench_target import Target
+
+
+def start_session(args, appexe, timeout):
+    """Start a GDB/MI session connected to the gdbserver, with "appexe"
+       as its first program"""
+    session = GdbMi([args.gdb_command])
+    try:
+        session.command('-gdb-set confirm off', timeout)
+        session.command(f'-file-exec-and-symbols {mi_quote(appexe)}', timeout)
+        target = (f'target remote | {args.gdbserver_command} '
+                  + f'-c {args.gdbserver_target} --stdin')
+        session.command(f'-interpreter-exec console {mi_quote(target)}', timeout)
+        for _ in range(2):
+            session.command('-exec-step-instruction', timeout)
+            session.wait_stopped(timeout)
+    except GdbMiError:
+        session.close()
+        raise
+
+    return session
+
+
+def cycle_count(session, timeout):
+    """Return the cycle count of the simulator.  The gdbserver may send it
+       as target output or write it to its standard error."""
+    session.drain_stderr()
+    _, _, text = session.command(
+        f'-interpreter-exec console {mi_quote("monitor cyclecount")}', timeout
     )
-    parser.add_argument(
-        '--gdbserver-target',
-        type=str,
-        default='ri5cy',
-        help='target argument to gdbserver',
-    )
-
-    return parser.parse_args(remnant)
-
-
-def build_benchmark_cmd(bench, args):
-    """Construct the command to run the benchmark.  "args" is a
-       namespace with target specific arguments"""
-
-    cmd = [f'{args.gdb_command}']
-    gdb_comms = [
-        'set confirm off',
-        'set style enabled off',
-        'set height 0',
-        'file {0}',
-        f'target remote | {args.gdbserver_command} '
-        + f'-c {args.gdbserver_target} --stdin',
-        'stepi',
-        'stepi',
-        'load',
-        'break start_trigger',
-        'break stop_trigger',
-        'break _exit',
-        'jump *_start',
-        'monitor cyclecount',
-        'continue',
-        'monitor cyclecount',
-        'continue',
-        'print $a0',
-        'detach',
-        'quit',
-    ]
-
-    for arg in gdb_comms:
-        cmd.extend(['-ex', arg.format(bench)])
-
-    return cmd
-
-
-def decode_results(stdout_str, stderr_str):
-    """Extract the results from the output string of the run. Return the
-       elapsed time in milliseconds or zero if the run failed."""
-    # Return code is in standard output. We look for the string that means we
-    # hit a breakpoint on _exit, then for the string returning the value.
-    rcstr = re.search(
-        'Breakpoint 3,.*\$1 = (\d+)', stdout_str, re.S
-    )
-    if not rcstr:
-        log.debug('Warning: Failed to find return code')
+    count = re.search(r'(\d+)', text)
+    if not count:
+        line = session.stderr_line(timeout)
+        count = re.search(r'(\d+)', line or '')
+    if not count:
+        raise GdbMiError('no cycle count')
+
+    return int(count.group(1))
+
+
+def run_to(session, breakpoint, timeout):
+    """Wait for the target to stop at breakpoint number "breakpoint" """
+    stopped = session.wait_stopped(timeout)
+    if stopped.get('bkptno') != breakpoint:
+        raise GdbMiError(f'stopped unexpectedly: {stopped.get("reason")}')
+
+
+class GdbserverSimTarget(Target):
+    """Programs run on a gdbserver with simulator, through GDB"""
+
+    def __init__(self, remnant):
+        super().__init__(remnant)
+        # With --persistent, the GDB/MI session of each job
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def get_args(self, remnant):
+        """Parse left over arguments"""
+        parser = argparse.ArgumentParser(description='Get target specific args')
+
+        parser.add_argument(
+            '--gdb-command',
+            type=str,
+            default='gdb',
+            help='Command to invoke GDB',
+        )
+        parser.add_argument(
+            '--gdbserver-command',
+            type=str,
+            default='gdbserver',
+            help='Command to invoke the GDB server',
+        )
+        parser.add_argument(
+            '--gdbserver-target',
+            type=str,
+            default='ri5cy',
+            help='target argument to gdbserver',
+        )
+        parser.add_argument(
+            '--persistent',
+            action='store_true',
+            help='Run all the benchmarks through one GDB and gdbserver, driven '
+            + 'through GDB/MI, rather than starting both for each benchmark',
+        )
+
+        return parser.parse_args(remnant)
+
+    def run_many(self, runs):
+        """Run the batch of benchmarks one after another in the GDB/MI
+           session of their job.  Without --persistent, return None, so each
+           benchmark is run with its own command as usual."""
+        if not self.args.persistent:
+            return None
+
+        return [self.run_in_session(run) for run in runs]
+
+    def run_in_session(self, run):
+        """Run the benchmark in the GDB/MI session of its job, starting the
+           session if needed, and allowing the timeout of the run for each
+           step.  Return the elapsed time in milliseconds or zero if the run
+           failed."""
+        timeout = run.timeout
+        session = self._sessions.get(run.job)
+        try:
+            if session is None:
+                session = start_session(run.args, run.appexe, timeout)
+                with self._sessions_lock:
+                    self._sessions[run.job] = session
+            else:
+                session.command(f'-file-exec-and-symbols {mi_quote(run.appexe)}', timeout)
+
+            session.command('-target-download', timeout)
+            session.command('-break-delete', timeout)
+            bkpts = []
+            for location in ['start_trigger', 'stop_trigger', '_exit']:
+                _, results, _ = session.command(f'-break-insert {location}', timeout)
+                bkpts.append(results['bkpt']['number'])
+
+            session.command('-exec-jump *_start', timeout)
+            run_to(session, bkpts[0], timeout)
+            start = cycle_count(session, timeout)
+            session.command('-exec-continue', timeout)
+            run_to(session, bkpts[1], timeout)
+            end = cycle_count(session, timeout)
+            session.command('-exec-continue', timeout)
+            run_to(session, bkpts[2], timeout)
+            _, results, _ = session.command('-data-evaluate-expression $a0', timeout)
+            rc = int(results['value'], 0)
+        except (GdbMiError, KeyError, ValueError) as error:
+            # Start afresh for the next benchmark
+            log.debug(f'Warning: GDB/MI run of {run.bench} failed: {error}')
+            if session:
+                session.close()
+            with self._sessions_lock:
+                self._sessions.pop(run.job, None)
+            return 0.0
+
+        # A benchmark which fails verification exits with a non-zero code
+        if rc != 0:
+            log.debug(f'Warning: {run.bench} failed with return code {rc}')
+            return 0.0
+
+        return float(end - start) / 1000.0
+
+    def command(self, run):
+        """Construct the command to run the benchmark"""
+        args = run.args
+        cmd = [f'{args.gdb_command}']
+        gdb_comms = [
+            'set confirm off',
+            'set style enabled off',
+            'set height 0',
+            'file {0}',
+            f'target remote | {args.gdbserver_command} '
+            + f'-c {args.gdbserver_target} --stdin',
+            'stepi',
+            'stepi',
+            'load',
+            'break start_trigger',
+            'break stop_trigger',
+            'break _exit',
+            'jump *_start',
+            'monitor cyclecount',
+            'continue',
+            'monitor cyclecount',
+            'continue',
+            'print $a0',
+            'detach',
+            'quit',
+        ]
+
+        for arg in gdb_comms:
+            cmd.extend(['-ex', arg.format(run.bench)])
+
+        return cmd
+
+    def decode(self, run, stdout_str, stderr_str):
+        """Extract the results from the output string of the run. Return the
+           elapsed time in milliseconds or zero if the run failed."""
+        # Return code is in standard output. We look for the string that means
+        # we hit a breakpoint on _exit, then for the string returning the
+        # value.
+        rcstr = re.search(
+            r'Breakpoint 3,.*\$1 = (\d+)', stdout_str, re.S
+        )
+        if not rcstr:
+            log.debug('Warning: Failed to find return code')
+            return 0.0
+
+        # The start and end cycle counts are in the stderr string
+        times = re.search(r'(\d+)\D+(\d+)', stderr_str, re.S)
+        if times:
+            ms_elapsed = float(int(times.group(2)) - int(times.group(1))) / 1000.0
+            return ms_elapsed
+
+        # We must have failed to find a time
+        log.debug('Warning: Failed to find timing')
         return 0.0
 
-    # The start and end cycle counts are in the stderr string
-    times = re.search('(\d+)\D+(\d+)', stderr_str, re.S)
-    if times:
-        ms_elapsed = float(int(times.group(2)) - int(times.group(1))) / 1000.0
-        return ms_elapsed
+    def close(self):
+        """Close all the GDB/MI sessions"""
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
 
-    # We must have failed to find a time
-    log.debug('Warning: Failed to find timing')
-    return 0.0
+target_class = GdbserverSimTarget
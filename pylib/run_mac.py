@@ -26,6 +26,7 @@ import argparse
 import re
 
 from embench_core import log
+from embench_result import decode_result_record
 
 
 def get_target_args(remnant):
@@ -49,18 +50,23 @@ def build_benchmark_cmd(bench, args):
 def decode_results(stdout_str, stderr_str):
     """Extract the results from the output string of the run. Return the
        elapsed time in milliseconds or zero if the run failed."""
+    # Use the result record, if the benchmark was built with one
+    result = decode_result_record(stdout_str)
+    if result is not None:
+        return result
+
     # See above in build_benchmark_cmd how we record the return value and
     # execution time. Return code is in standard output. Execution time is in
     # standard error.
 
     # Match "RET=rc"
-    rcstr = re.search('^RET=(\d+)', stdout_str, re.M)
+    rcstr = re.search(r'^RET=(\d+)', stdout_str, re.M)
     if not rcstr:
         log.debug('Warning: Failed to find return code')
         return 0.0
 
     # Match "Real time: dd.ddd"
-    time = re.search('^Real time: (\d+)[.](\d+)', stdout_str, re.S)
+    time = re.search(r'^Real time: (\d+)[.](\d+)', stdout_str, re.S)
     if time:
         ms_elapsed = float(time.group(1) + '.' + time.group(2))
         # Return value cannot be zero (will be interpreted as error)
@@ -17,56 +17,94 @@ This version is suitable for running programs natively.
 """
 
 __all__ = [
-    'get_target_args',
-    'build_benchmark_cmd',
-    'decode_results',
+    'NativeTarget',
+    'target_class',
 ]
 
 import argparse
 import re
 
 from embench_core import log
-
-
-def get_target_args(remnant):
-    """Parse left over arguments"""
-    parser = argparse.ArgumentParser(description='Get target specific args')
-
-    # No target arguments
-    return parser.parse_args(remnant)
-
-
-def build_benchmark_cmd(bench, args):
-    """Construct the command to run the benchmark.  "args" is a
-       namespace with target specific arguments"""
-
-    # Due to way the target interface currently works we need to construct
-    # a command that records both the return value and execution time to
-    # stdin/stdout. Obviously using time will not be very precise.
-    return ['sh', '-c', 'time -p ./' + bench + '; echo RET=$?']
-
-
-def decode_results(stdout_str, stderr_str):
-    """Extract the results from the output string of the run. Return the
-       elapsed time in milliseconds or zero if the run failed."""
-    # See above in build_benchmark_cmd how we record the return value and
-    # execution time. Return code is in standard output. Execution time is in
-    # standard error.
-
-    # Match "RET=rc"
-    rcstr = re.search('^RET=(\d+)', stdout_str, re.S | re.M)
-    if not rcstr:
-        log.debug('Warning: Failed to find return code')
+from embench_result import decode_result_record
+from embench_target import Target
+
+
+class NativeTarget(Target):
+    """Programs run natively, timed by the board support"""
+
+    def get_args(self, remnant):
+        """Parse left over arguments"""
+        parser = argparse.ArgumentParser(description='Get target specific args')
+
+        parser.add_argument(
+            '--metric',
+            type=str,
+            default='time',
+            help='Result to report: "time", the time of the benchmark in '
+            + 'milliseconds, or the name of a performance counter, such as '
+            + '"instructions", for benchmarks built for the "perf" board',
+        )
+
+        return parser.parse_args(remnant)
+
+    def command(self, run):
+        """Construct the command to run the benchmark"""
+        # Due to way the target interface currently works we need to construct
+        # a command that records the return value to stdout.  The execution
+        # time is recorded by the board support, which prints the monotonic
+        # time in nanoseconds at the start and end of the benchmark.
+        return ['sh', '-c', './' + run.bench + '; echo RET=$?']
+
+    def decode(self, run, stdout_str, stderr_str):
+        """Extract the results from the output string of the run. Return the
+           elapsed time in milliseconds, or the count of the counter chosen
+           as the metric, or zero if the run failed."""
+        # Use the result record, if the benchmark was built with one
+        result = decode_result_record(stdout_str, run.args.metric)
+        if result is not None:
+            return result
+
+        # See above in command how we record the return value and execution
+        # time. Both are in standard output.
+
+        # Match "RET=rc"
+        rcstr = re.search(r'^RET=(\d+)', stdout_str, re.S | re.M)
+        if not rcstr:
+            log.debug('Warning: Failed to find return code')
+            return 0.0
+
+        # Match "EMBENCH_COUNTERS name=count ..." from the "perf" board support
+        counters = {}
+        counterstr = re.search(r'^EMBENCH_COUNTERS(.*)$', stdout_str, re.M)
+        if counterstr:
+            for field in counterstr.group(1).split():
+                name, _, count = field.partition('=')
+                counters[name] = float(count)
+            log.debug(f'Counters: {counters}')
+
+        metric = run.args.metric
+        if metric != 'time':
+            if metric not in counters:
+                log.debug(f'Warning: Failed to find counter {metric}')
+                return 0.0
+            # Return value cannot be zero (will be interpreted as error)
+            return max(counters[metric], 1e-6)
+
+        # Match "EMBENCH_START_NS=ns" and "EMBENCH_STOP_NS=ns"
+        start = re.search(r'^EMBENCH_START_NS=(\d+)', stdout_str, re.M)
+        stop = re.search(r'^EMBENCH_STOP_NS=(\d+)', stdout_str, re.M)
+        if start and stop:
+            ns_elapsed = int(stop.group(1)) - int(start.group(1))
+            # Return value cannot be zero (will be interpreted as error)
+            return max(ns_elapsed / 1e6, 1e-6)
+
+        # The board support only records the time if it is built with the
+        # host C library, so this is a configuration error, not a failed run.
+        log.error(
+            'ERROR: Failed to find timing: the native board support must be '
+            + 'built with HAVE_LIBC defined to time the benchmark'
+        )
         return 0.0
 
-    # Match "real s.mm?m?"
-    time = re.search('^real (\d+)[.](\d+)', stderr_str, re.S)
-    if time:
-        ms_elapsed = int(time.group(1)) * 1000 + \
-                     int(time.group(2).ljust(3,'0')) # 0-pad
-        # Return value cannot be zero (will be interpreted as error)
-        return max(float(ms_elapsed), 0.001)
-
-    # We must have failed to find a time
-    log.debug('Warning: Failed to find timing')
-    return 0.0
+
+target_class = NativeTarget
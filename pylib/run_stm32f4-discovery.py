@@ -13,98 +13,226 @@
 """
 Embench module to run benchmark programs.
 
-This version is suitable for a gdbserver with simulator.
+This version is suitable for one or more stm32f4-discovery boards, each
+reached through GDB and its own GDB server.  With several boards, each
+benchmark is run on whichever board is free, and a run on a board which
+can't be reached is retried on another board.
 """
 
 __all__ = [
-    'get_target_args',
-    'build_benchmark_cmd',
-    'decode_results',
+    'Stm32f4DiscoveryTarget',
+    'target_class',
 ]
 
 import argparse
+import os
 import re
+import signal
+import subprocess
 
+from embench_boards import BoardPool
 from embench_core import log
+from embench_executor import parse_endpoint
+from embench_result import decode_result_record
+from embench_target import Target
+
+# The GDB server of the board, if none is given
+DEFAULT_BOARD = ('localhost', 4242)
+
+
+def board_endpoint(board):
+    """Check the board "board" is given as "HOST:PORT" for argparse, and
+       return it as a (host, port) tuple"""
+    endpoint = parse_endpoint(board)
+    if not endpoint:
+        raise argparse.ArgumentTypeError(f'Board {board} is not HOST:PORT')
+
+    return endpoint
+
+
+class Stm32f4DiscoveryTarget(Target):
+    """Programs run on a farm of stm32f4-discovery boards through GDB"""
+
+    def __init__(self, remnant):
+        super().__init__(remnant)
+        self.pool = BoardPool(
+            self.args.board or [DEFAULT_BOARD], self.args.max_board_failures
+        )
+
+    def get_args(self, remnant):
+        """Parse left over arguments"""
+        parser = argparse.ArgumentParser(description='Get target specific args')
+
+        parser.add_argument(
+            '--gdb-command',
+            type=str,
+            default='gdb',
+            help='Command to invoke GDB',
+        )
+        parser.add_argument(
+            '--gdbserver-command',
+            type=str,
+            default='gdbserver',
+            help='Command to invoke the GDB server',
+        )
+        parser.add_argument(
+            '--cpu-mhz',
+            type=int,
+            default=1,
+            help='Processor clock speed in MHz'
+        )
+        parser.add_argument(
+            '--board',
+            type=board_endpoint,
+            action='append',
+            help='GDB server of a board, as HOST:PORT.  May be repeated for a '
+            + 'farm of boards (default localhost:4242)',
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=2,
+            help='Number of times to retry a run, on another board if there '
+            + 'is one, if the board can\'t be reached (default 2)',
+        )
+        parser.add_argument(
+            '--max-board-failures',
+            type=int,
+            default=3,
+            help='Number of runs in a row which may fail on a board before it '
+            + 'is no longer used (default 3)',
+        )
+        parser.add_argument(
+            '--result-record',
+            action='store_true',
+            help='Print the result record of benchmarks built with '
+            + '--result-record from GDB, and decode it',
+        )
+
+        return parser.parse_args(remnant)
+
+    def run(self, run):
+        """Run the benchmark on whichever board is free, retrying if the
+           board can't be reached.  Return the elapsed time in milliseconds
+           or zero if the run failed."""
+        tried = []
+        for _ in range(run.args.retries + 1):
+            board = self.pool.acquire(tried)
+            if board is None:
+                log.warning(f'Warning: No boards left to run {run.bench}')
+                return 0.0
+
+            exec_time, board_ok = self.run_on_board(run, board)
+            self.pool.release(board, board_ok)
+            if board_ok:
+                log.debug(f'{run.bench} ran on board {board[0]}:{board[1]}')
+                return exec_time
+
+            log.debug(
+                f'Warning: Board {board[0]}:{board[1]} failed to run {run.bench}'
+            )
+            tried.append(board)
 
-cpu_mhz = 1
-
-def get_target_args(remnant):
-    """Parse left over arguments"""
-    parser = argparse.ArgumentParser(description='Get target specific args')
-
-    parser.add_argument(
-        '--gdb-command',
-        type=str,
-        default='gdb',
-        help='Command to invoke GDB',
-    )
-    parser.add_argument(
-        '--gdbserver-command',
-        type=str,
-        default='gdbserver',
-        help='Command to invoke the GDB server',
-    )
-    parser.add_argument(
-        '--cpu-mhz',
-        type=int,
-        default=1,
-        help='Processor clock speed in MHz'
-    )
-
-    return parser.parse_args(remnant)
-
-
-def build_benchmark_cmd(bench, args):
-    """Construct the command to run the benchmark.  "args" is a
-       namespace with target specific arguments"""
-    global cpu_mhz
-    cpu_mhz = args.cpu_mhz
-
-    cmd = [f'{args.gdb_command}']
-    gdb_comms = [
-        'set confirm off',
-        'file {0}',
-        'target extended-remote :4242',
-        'load',
-        'delete breakpoints',
-        'break start_trigger',
-        'break stop_trigger',
-        'break _exit',
-        'continue',
-        'print /u *0xe0001004',
-        'continue',
-        'print /u *0xe0001004',
-        'continue',
-        'print /x $a0',
-        'quit',
-    ]
-
-    for arg in gdb_comms:
-        cmd.extend(['-ex', arg.format(bench)])
-
-    return cmd
-
-
-def decode_results(stdout_str, stderr_str):
-    """Extract the results from the output string of the run. Return the
-       elapsed time in milliseconds or zero if the run failed."""
-    # Return code is in standard output. We look for the string that means we
-    # hit a breakpoint on _exit, then for the string returning the value.
-    rcstr = re.search(
-        'Breakpoint 3 at.*exit\.c.*\$1 = (\d+)', stdout_str, re.S
-    )
-    if not rcstr:
-        log.debug('Warning: Failed to find return code')
         return 0.0
 
-    # The start and end cycle counts are in the stderr string
-    starttime = re.search('\$1 = (\d+)', stdout_str, re.S)
-    endtime = re.search('\$2 = (\d+)', stdout_str, re.S)
-    if not starttime or not endtime:
-        log.debug('Warning: Failed to find timing')
-        return 0.0
-
-    # Time from cycles to milliseconds
-    global cpu_mhz
-    return (int(endtime.group(1)) - int(starttime.group(1))) / cpu_mhz / 1000.0
+    def run_on_board(self, run, board):
+        """Run the benchmark on "board" with GDB.  Return the elapsed time in
+           milliseconds, or zero if the run failed, and whether the board
+           could be reached, which it was if the benchmark got as far as
+           start_trigger."""
+        arglist = self.command(run, board)
+        try:
+            proc = subprocess.Popen(
+                arglist,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=run.appdir,
+                start_new_session=True,
+            )
+        except OSError as error:
+            log.warning(f'Warning: Unable to run {arglist[0]}: {error}')
+            return 0.0, True
+
+        try:
+            stdout, stderr = proc.communicate(timeout=run.timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            stdout, stderr = proc.communicate()
+            log.debug(f'Warning: Run of {run.bench} timed out')
+
+        stdout_str = stdout.decode('utf-8')
+        if proc.returncode != 0:
+            log.debug(stdout_str)
+            log.debug(stderr.decode('utf-8'))
+        board_ok = re.search('Breakpoint 1,', stdout_str) is not None
+        return self.decode(run, stdout_str, stderr.decode('utf-8')), board_ok
+
+    def command(self, run, board=None):
+        """Construct the command to run the benchmark on "board", by default
+           the first board"""
+        if board is None:
+            board = (self.args.board or [DEFAULT_BOARD])[0]
+        cmd = [f'{run.args.gdb_command}']
+        gdb_comms = [
+            'set confirm off',
+            'file {0}',
+            f'target extended-remote {board[0]}:{board[1]}',
+            'load',
+            'delete breakpoints',
+            'break start_trigger',
+            'break stop_trigger',
+            'break _exit',
+            'continue',
+            'print /u *0xe0001004',
+            'continue',
+            'print /u *0xe0001004',
+            'continue',
+            'print /x $a0',
+        ]
+        # Only benchmarks built with the result record have embench_result
+        if run.args.result_record:
+            gdb_comms.append('printf "%s\\n", embench_result')
+        gdb_comms.append('quit')
+
+        for arg in gdb_comms:
+            cmd.extend(['-ex', arg.format(run.bench)])
+
+        return cmd
+
+    def decode(self, run, stdout_str, stderr_str):
+        """Extract the results from the output string of the run. Return the
+           elapsed time in milliseconds or zero if the run failed."""
+        # Use the result record, printed by GDB, if the benchmark was built
+        # with one
+        if run.args.result_record:
+            result = decode_result_record(stdout_str, cpu_mhz=run.args.cpu_mhz)
+            if result is not None:
+                return result
+
+        # Return code is in standard output. We look for the string that means
+        # we hit a breakpoint on _exit, then for the string returning the
+        # value.
+        rcstr = re.search(
+            r'Breakpoint 3 at.*exit\.c.*\$1 = (\d+)', stdout_str, re.S
+        )
+        if not rcstr:
+            log.debug('Warning: Failed to find return code')
+            return 0.0
+
+        # The start and end cycle counts are in the stderr string
+        starttime = re.search(r'\$1 = (\d+)', stdout_str, re.S)
+        endtime = re.search(r'\$2 = (\d+)', stdout_str, re.S)
+        if not starttime or not endtime:
+            log.debug('Warning: Failed to find timing')
+            return 0.0
+
+        # Time from cycles to milliseconds
+        cycles = int(endtime.group(1)) - int(starttime.group(1))
+        return cycles / run.args.cpu_mhz / 1000.0
+
+    def close(self):
+        """Log how the runs were shared between the boards"""
+        self.pool.log_stats()
+
+
+target_class = Stm32f4DiscoveryTarget
@@ -12,75 +12,170 @@
 """
 Embench module to run benchmark programs.
 
-This version is suitable for running programs on wally.
+This version is suitable for running programs on wally.  The board support
+writes the cycle and instruction counts at the start and end of the
+benchmark, and whether it passed, to the signature, which the simulation
+writes to a file in the benchmark directory, one hexadecimal word per line:
+
+- the cycle count at start_trigger;
+- the cycle count at stop_trigger;
+- the instruction count at start_trigger;
+- the instruction count at stop_trigger; and
+- 1 if the benchmark passed, or 3 if it failed.
+
+The simulation may be run beforehand, or by this module for each benchmark
+with --sim-command.
 """
 
 __all__ = [
-    'get_target_args',
-    'build_benchmark_cmd',
-    'decode_results',
+    'WallyTarget',
+    'target_class',
+    'read_signature',
+    'signature_metrics',
 ]
 
 import argparse
-import configparser
-import re
+import glob
+import os
+import shlex
 
 from embench_core import log
-
-cpu_mhz = 1
-
-def get_target_args(remnant):
-    """Parse left over arguments"""
-    parser = argparse.ArgumentParser(description='Get target specific args')
-
-    # No target arguments
-    parser.add_argument(
-        '--cpu-mhz',
-        type=int,
-        default=1,
-        help='Processor clock speed in MHz'
-    )
-
-    return parser.parse_args(remnant)
-
-
-def build_benchmark_cmd(bench, args):
-    """Construct the command to run the benchmark.  "args" is a
-       namespace with target specific arguments"""
-    global cpu_mhz
-    cpu_mhz = args.cpu_mhz
-    # to run wally, we use the modelsim that inputs the compiled C code and outputs a .outputfile
-    # that contains the content of begin_signature, which writes the instret & cycles of begin & end triggers
-    # along with the return code, which tells us if the test passed
-    log.debug("\"" + bench + "\" : cycles, insret, CPI, Elapsed Time, ClkFreq")
-    return ['sh', '-c', ('cat *.output')]
-
-def decode_results(stdout_str, stderr_str):
-    """Extract the results from the output string of the run. Return the
-       elapsed time in milliseconds or zero if the run failed."""
-    # this reads in the output of the buildbench_cmd command, in this case we have 5 lines written to stdout_str
-    # that contains the content of begin_signature, which writes the instret & cycles of begin & end triggers
-    # along with the return code, which tells us if the test passed
-    output_signature = stdout_str.split('\n')[0:6]
-    if (len(output_signature)):
-        pc_trigger = list(map(lambda s: int(s,16), output_signature[0:5]))
-    else:
-        log.debug('Warning: Output file empty')
-        result = 0.0
-    
-    # get the cpu_mhz from input variable of benchmark_speed.py
-    global cpu_mhz
-    # check if either pc value is the default (i.e. never got written to)
-    if (pc_trigger[4]!=1):
-        log.debug('Warning: Simulation returned failure in signature')
-    if ((pc_trigger[1]==0)|(pc_trigger[0]==0)):
+from embench_target import Target
+
+
+# Words of the signature, and the code for a benchmark which passed
+SIGNATURE_WORDS = 5
+PASS_CODE = 1
+
+
+def read_signature(appdir, pattern):
+    """Read the signature from the newest file matching the glob "pattern"
+       in the benchmark directory "appdir".  Return the list of its words,
+       or None if there is no valid signature."""
+    files = glob.glob(os.path.join(appdir, pattern))
+    if not files:
+        log.debug(f'Warning: No signature file matching {pattern} in {appdir}')
+        return None
+
+    sigfile = max(files, key=os.path.getmtime)
+    try:
+        with open(sigfile) as fileh:
+            lines = [line.strip() for line in fileh if line.strip()]
+        words = [int(line, 16) for line in lines[:SIGNATURE_WORDS]]
+    except (OSError, ValueError) as error:
+        log.debug(f'Warning: Unable to read signature {sigfile}: {error}')
+        return None
+
+    if len(words) < SIGNATURE_WORDS:
+        log.debug(f'Warning: Signature {sigfile} has only {len(words)} words')
+        return None
+
+    return words
+
+
+def signature_metrics(words):
+    """Return a dictionary of the "cycles" and instructions retired,
+       "instret", of the benchmark, its "cpi" and the pass or fail "code"
+       from the words of its signature, or None if they are not valid"""
+    start_cycle, stop_cycle, start_inst, stop_inst, code = words[:SIGNATURE_WORDS]
+    if code != PASS_CODE:
+        log.debug(f'Warning: Simulation returned failure code {code} in signature')
+        return None
+    if start_cycle == 0 or stop_cycle <= start_cycle or stop_inst <= start_inst:
         log.debug('Warning: Failed to find timing')
-        result = 0.0
-    else:
-        result = ((pc_trigger)[1]-(pc_trigger)[0]) / cpu_mhz / 1000.0
-
-    # log.debug('Simulation returned %d. 1 is Success, 3 is Failure', pc_trigger[4])
-    # cycles, #insret, #CPI, Elapsed Time, ClkFreq
-    log.debug( "[" + str((pc_trigger)[1]-(pc_trigger)[0]) + "," +  str(pc_trigger[3]-pc_trigger[2]) + "," + str((pc_trigger[1]-pc_trigger[0]) / (pc_trigger[3]-pc_trigger[2])) + "," + str(result) + "," + str(cpu_mhz) + "],") 
-
-    return (result)
\ No newline at end of file
+        return None
+
+    cycles = stop_cycle - start_cycle
+    instret = stop_inst - start_inst
+    return {
+        'cycles': cycles,
+        'instret': instret,
+        'cpi': cycles / instret,
+        'code': code,
+    }
+
+
+class WallyTarget(Target):
+    """Programs run on the Wally simulation"""
+
+    def get_args(self, remnant):
+        """Parse left over arguments"""
+        parser = argparse.ArgumentParser(description='Get target specific args')
+
+        parser.add_argument(
+            '--cpu-mhz',
+            type=int,
+            default=1,
+            help='Processor clock speed in MHz'
+        )
+        parser.add_argument(
+            '--metric',
+            choices=['time', 'cycles', 'instret', 'cpi'],
+            default='time',
+            help='Result to report: the time of the benchmark in milliseconds '
+            + '(the default), its cycles, its instructions retired or its '
+            + 'cycles per instruction',
+        )
+        parser.add_argument(
+            '--signature',
+            type=str,
+            default='*.output',
+            help='Glob pattern of the signature file in each benchmark '
+            + 'directory (default *.output)',
+        )
+        parser.add_argument(
+            '--sim-command',
+            type=str,
+            help='Command to simulate each benchmark, writing its signature, '
+            + 'run in the benchmark directory.  {bench}, {appexe} and {appdir} '
+            + 'are replaced by the benchmark, its executable and its '
+            + 'directory.  By default the signatures are read as they are',
+        )
+
+        return parser.parse_args(remnant)
+
+    def run(self, run):
+        """Without --sim-command, decode the signature the simulation has
+           already written.  Otherwise return None, so the simulation is run
+           with command."""
+        if run.args.sim_command:
+            return None
+
+        return self.result(run)
+
+    def command(self, run):
+        """Construct the command to simulate the benchmark.  Any old
+           signature is removed first, so a failed simulation can't report
+           it."""
+        for sigfile in glob.glob(os.path.join(run.appdir, run.args.signature)):
+            os.remove(sigfile)
+
+        cmd = run.args.sim_command.format(
+            bench=run.bench, appexe=run.appexe, appdir=run.appdir
+        )
+        return shlex.split(cmd)
+
+    def decode(self, run, stdout_str, stderr_str):
+        """Decode the signature written by the simulation"""
+        return self.result(run)
+
+    def result(self, run):
+        """Return the result chosen as the metric from the signature of the
+           benchmark, or zero if it is missing or not valid"""
+        words = read_signature(run.appdir, run.args.signature)
+        metrics = signature_metrics(words) if words else None
+        if not metrics:
+            return 0.0
+
+        time_ms = metrics['cycles'] / run.args.cpu_mhz / 1000.0
+        log.debug(
+            f'{run.bench}: cycles {metrics["cycles"]}, instret {metrics["instret"]}, '
+            + f'CPI {metrics["cpi"]:.3f}, time {time_ms} ms at {run.args.cpu_mhz} MHz'
+        )
+        if run.args.metric == 'time':
+            return time_ms
+
+        return float(metrics[run.args.metric])
+
+
+target_class = WallyTarget
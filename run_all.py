@@ -17,6 +17,8 @@ Run sets of Embench benchmarks
 
 
 import argparse
+import hashlib
+import json
 import os
 import shutil
 import subprocess
@@ -1132,6 +1134,12 @@ def build_parser():
         default='results',
         help='Directory in which to place results files',
     )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Skip the runs already completed by an earlier invocation, as '
+        + 'recorded in the journal in the results directory',
+    )
     parser.add_argument(
         '--fosdem-rv32-gcc-opt',
         action='store_true',
@@ -1301,6 +1309,83 @@ def benchmark(arglist, timeout, desc, resfile, append):
                     fileh.writelines(line)
             fileh.close()
 
+    return succeeded
+
+
+def load_journal(journalfile, resume):
+    """Return the journal of completed phases from "journalfile" if
+       resuming, or an empty journal otherwise."""
+    fresh = {'version': 1, 'completed': {}}
+    if not resume or not os.path.isfile(journalfile):
+        return fresh
+
+    try:
+        with open(journalfile) as fileh:
+            journal = json.load(fileh)
+    except (OSError, ValueError) as error:
+        print(f'Warning: Unable to read journal {journalfile}: {error}: '
+              + 'starting afresh')
+        return fresh
+
+    if (
+        not isinstance(journal, dict)
+        or journal.get('version') != fresh['version']
+        or not isinstance(journal.get('completed'), dict)
+    ):
+        print(f'Warning: Journal {journalfile} is not a version '
+              + f'{fresh["version"]} journal: starting afresh')
+        return fresh
+
+    return journal
+
+
+def save_journal(journalfile, journal):
+    """Write the journal to "journalfile", so it is never seen partially
+       written"""
+    tmpfile = journalfile + '.tmp'
+    with open(tmpfile, 'w') as fileh:
+        json.dump(journal, fileh, indent=1)
+    os.replace(tmpfile, journalfile)
+
+
+def phase_key(rs, r, phase):
+    """Return the journal key of the "phase" ("size" or "speed") of run
+       "r" of runset "rs", and a digest of everything defining it, so that a
+       phase is redone if its definition changes."""
+    key = f'{rs["name"]}/{r["name"]}/{phase}'
+    definition = json.dumps([r, rs[phase + ' benchmark']], sort_keys=True)
+    return key, hashlib.sha256(definition.encode('utf-8')).hexdigest()
+
+
+def phase_done(journal, key, digest, resfile):
+    """Return True if the phase "key", defined by "digest", has completed
+       and its results are still in "resfile"."""
+    entry = journal['completed'].get(key)
+    return bool(
+        entry and entry['digest'] == digest and entry['resfile'] == resfile
+        and os.path.isfile(resfile) and os.path.getsize(resfile) >= entry['bytes']
+    )
+
+
+def record_phase(journalfile, journal, key, digest, resfile):
+    """Record in the journal that phase "key", defined by "digest", has
+       completed, with "resfile" holding its results."""
+    journal['completed'][key] = {
+        'digest': digest,
+        'resfile': resfile,
+        'bytes': os.path.getsize(resfile),
+    }
+    save_journal(journalfile, journal)
+
+
+def restore_results(journal, key, resfile):
+    """Discard anything written to "resfile" after the phase "key"
+       completed, such as the partial results of an interrupted phase"""
+    entry = journal['completed'].get(key)
+    if entry and os.path.isfile(resfile):
+        with open(resfile, 'r+') as fileh:
+            fileh.truncate(entry['bytes'])
+
 
 def main():
     """Main program to drive building of benchmarks."""
@@ -1338,6 +1423,13 @@ def main():
         print("ERROR: No run sets specified")
         sys.exit(1)
 
+    # The journal of completed phases, which is kept across invocations so
+    # that an interrupted set of runs can be resumed.
+    os.makedirs(args.resdir, exist_ok=True)
+    journalfile = os.path.join(args.resdir, 'run-journal.json')
+    journal = load_journal(journalfile, args.resume)
+    save_journal(journalfile, journal)
+
     # Take each runset in turn
     for rs in runsets:
         print(rs['name'])
@@ -1360,10 +1452,18 @@ def main():
                 env = None
 
             print(f'  {name}')
-            resfile = os.path.join('results', name + '.json')
+            resfile = os.path.join(args.resdir, name + '.json')
+            size_key, size_digest = None, None
 
             # Size benchmark
             if 'size benchmark' in rs:
+                size_key, size_digest = phase_key(rs, r, 'size')
+
+            if size_key and phase_done(journal, size_key, size_digest, resfile):
+                print('    size already done')
+            elif size_key:
+                # The speed results follow the size results, so must be redone
+                journal['completed'].pop(phase_key(rs, r, 'speed')[0], None)
                 build_benchmarks(
                     arch=r['arch'],
                     chip=r['chip'],
@@ -1375,16 +1475,28 @@ def main():
                     path=path,
                     env=env,
                 )
-                benchmark(
+                if benchmark(
                     arglist=rs['size benchmark']['arglist'],
                     timeout=rs['size benchmark']['timeout'],
                     desc=rs['size benchmark']['desc'],
                     resfile=resfile,
                     append=False
-                )
+                ):
+                    record_phase(journalfile, journal, size_key, size_digest, resfile)
+                else:
+                    # The speed results need the size results before them
+                    size_key = None
 
             # Speed benchmark
-            if 'speed benchmark' in rs:
+            if 'speed benchmark' not in rs:
+                continue
+
+            speed_key, speed_digest = phase_key(rs, r, 'speed')
+            if phase_done(journal, speed_key, speed_digest, resfile):
+                print('    speed already done')
+            else:
+                if size_key:
+                    restore_results(journal, size_key, resfile)
                 build_benchmarks(
                     arch=r['arch'],
                     chip=r['chip'],
@@ -1396,13 +1508,14 @@ def main():
                     path=path,
                     env=env,
                 )
-                benchmark(
+                if benchmark(
                     arglist=rs['speed benchmark']['arglist'],
                     timeout=rs['speed benchmark']['timeout'],
                     desc=rs['speed benchmark']['desc'],
                     resfile=resfile,
                     append=True
-                )
+                ):
+                    record_phase(journalfile, journal, speed_key, speed_digest, resfile)
 
 
 # Make sure we have new enough Python and only run if this is the main package
@@ -13,6 +13,129 @@
 
 #include "support.h"
 
+#if RESULT_RECORD
+
+/* The result record, see support.h.  Counters beyond MAX_COUNTERS are left
+   out.  */
+
+#define RECORD_SIZE 512
+#define MAX_COUNTERS 16
+
+char __attribute__ ((used)) embench_result[RECORD_SIZE];
+
+static int have_trigger_counts;
+static unsigned long long start_count;
+static unsigned long long stop_count;
+static const char *count_unit;
+
+static int num_counters;
+static const char *counter_names[MAX_COUNTERS];
+static unsigned long long counter_values[MAX_COUNTERS];
+
+static unsigned int record_len;
+
+void
+record_trigger_counts (unsigned long long start, unsigned long long stop,
+		       const char *unit)
+{
+  have_trigger_counts = 1;
+  start_count = start;
+  stop_count = stop;
+  count_unit = unit;
+}
+
+void
+record_counter (const char *name, unsigned long long value)
+{
+  if (num_counters < MAX_COUNTERS)
+    {
+      counter_names[num_counters] = name;
+      counter_values[num_counters] = value;
+      num_counters++;
+    }
+}
+
+void __attribute__ ((weak))
+output_result (const char *record __attribute__ ((unused)))
+{
+}
+
+/* Append a field to the record, without using the C library, which may not
+   be available.  A field which would not fit is left out.  */
+
+static unsigned int
+str_len (const char *str)
+{
+  unsigned int len = 0;
+
+  while (str[len] != '\0')
+    len++;
+
+  return len;
+}
+
+static void
+append_str (const char *str)
+{
+  while (*str != '\0')
+    embench_result[record_len++] = *str++;
+
+  embench_result[record_len] = '\0';
+}
+
+static void
+append_field (const char *name, const char *value)
+{
+  if (record_len + str_len (name) + str_len (value) + 2 >= RECORD_SIZE)
+    return;
+
+  append_str (" ");
+  append_str (name);
+  append_str ("=");
+  append_str (value);
+}
+
+static void
+append_num (const char *name, unsigned long long num)
+{
+  char digits[24];
+  int i = sizeof (digits) - 1;
+
+  digits[i] = '\0';
+  do
+    {
+      digits[--i] = '0' + num % 10;
+      num /= 10;
+    }
+  while (num != 0);
+
+  append_field (name, &digits[i]);
+}
+
+static void
+report_result (int rc)
+{
+  int i;
+
+  record_len = 0;
+  append_str ("EMBENCH_RESULT");
+  append_num ("v", RESULT_RECORD_VERSION);
+  append_num ("rc", rc);
+  if (have_trigger_counts)
+    {
+      append_field ("unit", count_unit);
+      append_num ("start", start_count);
+      append_num ("stop", stop_count);
+    }
+
+  for (i = 0; i < num_counters; i++)
+    append_num (counter_names[i], counter_values[i]);
+
+  output_result (embench_result);
+}
+
+#endif /* RESULT_RECORD */
+
 
 int __attribute__ ((used))
 main (int argc __attribute__ ((unused)),
@@ -34,6 +157,10 @@ main (int argc __attribute__ ((unused)),
 
   correct = verify_benchmark (result);
 
+#if RESULT_RECORD
+  report_result (!correct);
+#endif
+
   return (!correct);
 
 }				/* main () */
@@ -36,6 +36,32 @@ void initialise_board (void);
 void start_trigger (void);
 void stop_trigger (void);
 
+/* Structured result record.  If the build sets RESULT_RECORD to 1, main ()
+   writes a single line record of the result when the benchmark has been
+   verified, such as
+
+     EMBENCH_RESULT v=1 rc=0 unit=ns start=1200 stop=5600 instructions=9000
+
+   where "v" is the version of the record format, "rc" the return code of
+   the benchmark, and "start" and "stop" the counter values, in "unit", at
+   start_trigger and stop_trigger.  Any other fields are extra counters, in
+   the order they were recorded.  The board triggers record the counter
+   values with record_trigger_counts and the extra counters with
+   record_counter.  The record is kept in embench_result, where a debugger
+   can read it, and passed to output_result, which by default does nothing,
+   but which a board able to print may define.  */
+
+#ifndef RESULT_RECORD
+#define RESULT_RECORD 0
+#endif
+
+#define RESULT_RECORD_VERSION 1
+
+void record_trigger_counts (unsigned long long start, unsigned long long stop,
+			    const char *unit);
+void record_counter (const char *name, unsigned long long value);
+void output_result (const char *record);
+
 /* Every benchmark implements this for one-off data initialization.  This is
    only used for initialization that is independent of how often benchmark ()
    is called. */
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# A stand-in for GDB, for testing targets which run benchmarks on boards.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+A stand-in for GDB.
+
+Takes the "-ex" commands run_stm32f4-discovery gives GDB, and carries out
+just enough of them over the GDB remote serial protocol to run a program on
+a fake board, printing what GDB would.  The symbols of the program are at
+made up addresses, and only the start of it is loaded.  Exits with 1 if the
+board can't be reached or stops answering.
+"""
+
+
+import socket
+import sys
+
+# Made up addresses of the symbols at which the program stops
+SYMBOLS = {'start_trigger': 0x100, 'stop_trigger': 0x200, '_exit': 0x300}
+
+# Address of the Cortex-M cycle counter, DWT_CYCCNT
+CYCLE_COUNTER = 0xe0001004
+
+
+class Remote:
+    """A connection to the GDB server at "endpoint", as HOST:PORT"""
+
+    def __init__(self, endpoint):
+        host, _, port = endpoint.rpartition(':')
+        self.sock = socket.create_connection((host, int(port)), timeout=10)
+        self.fileh = self.sock.makefile('rwb')
+
+    def read(self, count=1):
+        """Read "count" bytes, failing if the connection is closed"""
+        data = self.fileh.read(count)
+        if len(data) < count:
+            raise EOFError('Remote connection closed')
+
+        return data
+
+    def packet(self, payload):
+        """Send a packet with "payload" and return the payload of the reply"""
+        check = sum(payload.encode('latin-1')) % 256
+        self.fileh.write(f'${payload}#{check:02x}'.encode('latin-1'))
+        self.fileh.flush()
+        if self.read() != b'+':
+            raise EOFError('Packet not acknowledged')
+
+        while self.read() != b'$':
+            pass
+        reply = bytearray()
+        while True:
+            char = self.read()
+            if char == b'#':
+                break
+            reply += char
+        self.read(2)
+        self.fileh.write(b'+')
+        self.fileh.flush()
+        return reply.decode('latin-1')
+
+    def close(self):
+        """Kill the program and close the connection"""
+        self.fileh.write(b'$k#6b')
+        self.fileh.flush()
+        self.sock.close()
+
+
+def run(commands):
+    """Carry out the GDB "commands" on the board they name"""
+    prog = next(c for c in commands if c.startswith('file ')).split()[1]
+    endpoint = next(
+        c for c in commands if c.startswith('target extended-remote ')
+    ).split()[2]
+
+    remote = Remote(endpoint)
+    remote.packet('qSupported:multiprocess+')
+    reply = remote.packet('qSymbol::')
+    while reply.startswith('qSymbol:'):
+        name = bytes.fromhex(reply[len('qSymbol:'):]).decode('latin-1')
+        reply = remote.packet(
+            f'qSymbol:{SYMBOLS[name]:x}:{name.encode("latin-1").hex()}'
+        )
+
+    with open(prog, 'rb') as fileh:
+        data = fileh.read(4000)
+    remote.packet(f'M0,{len(data):x}:{data.hex()}')
+
+    for address in SYMBOLS.values():
+        remote.packet(f'Z0,{address:x},2')
+    print(f'Breakpoint 1 at {SYMBOLS["start_trigger"]:#x}')
+    print(f'Breakpoint 2 at {SYMBOLS["stop_trigger"]:#x}')
+    print(f'Breakpoint 3 at {SYMBOLS["_exit"]:#x}: file exit.c, line 1.')
+
+    for num, name in enumerate(['start_trigger', 'stop_trigger'], 1):
+        if not remote.packet('c').startswith('T05'):
+            raise EOFError(f'Program did not stop at {name}')
+        print(f'Breakpoint {num}, {name} ()')
+        cycles = remote.packet(f'm{CYCLE_COUNTER:x},4')
+        print(f'${num} = {int.from_bytes(bytes.fromhex(cycles), "little")}')
+
+    remote.packet('c')
+    print('Breakpoint 3, _exit ()')
+    print('$3 = 0x0')
+    remote.close()
+
+
+def main():
+    """Main program to stand in for GDB"""
+    args = sys.argv[1:]
+    commands = [args[i + 1] for i, arg in enumerate(args) if arg == '-ex']
+    try:
+        run(commands)
+    except (OSError, EOFError) as error:
+        print(f'Remote communication error: {error}', file=sys.stderr)
+        sys.exit(1)
+
+
+# Only run if this is the main package
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+# Tests of running benchmarks on a farm of boards.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Tests of BoardPool and the board farm of run_stm32f4-discovery.
+
+Fake boards are served on the local host, and benchmarks are run on them by
+the stm32f4-discovery target, with fake_gdb.py standing in for GDB.  Run
+from the top level directory with
+
+  python3 -m unittest discover test
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+testdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(testdir), 'pylib'))
+
+from embench_boards import FakeBoardServer
+from embench_core import log
+from embench_target import RunContext
+
+stm32 = importlib.import_module('run_stm32f4-discovery')
+
+# Size of the fake program, which sets its cycle count on a fake board
+PROG_SIZE = 400
+
+
+class TestBoardFarm(unittest.TestCase):
+    """Benchmarks run on fake boards"""
+
+    def setUp(self):
+        self.appdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.appdir.cleanup)
+        with open(os.path.join(self.appdir.name, 'bench'), 'wb') as fileh:
+            fileh.write(bytes(PROG_SIZE))
+
+    def board(self, fail_every=0):
+        """Serve a fake board for the test, dropping every "fail_every"th
+           connection if that is not zero, and return it as HOST:PORT"""
+        server = FakeBoardServer(('127.0.0.1', 0), fail_every)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+        return f'{host}:{port}'
+
+    def target(self, boards, *args):
+        """Create a target for "boards", with more arguments "args" """
+        remnant = ['--gdb-command', os.path.join(testdir, 'fake_gdb.py')]
+        for board in boards:
+            remnant += ['--board', board]
+        return stm32.target_class(remnant + list(args))
+
+    def run_bench(self, target):
+        """Run the benchmark once on "target" and return the result"""
+        run = RunContext(
+            'bench', self.appdir.name, 'bench', target.args, None, 10, 0
+        )
+        return target.run(run)
+
+    def stats(self, target, board):
+        """The runs and failures of "board" on "target" """
+        host, _, port = board.rpartition(':')
+        stats = target.pool.stats[(host, int(port))]
+        return stats['runs'], stats['failures']
+
+    def test_farm(self):
+        """Runs are shared between the boards, with the same result on
+           each"""
+        boards = [self.board(), self.board()]
+        target = self.target(boards)
+        results = [self.run_bench(target) for _ in range(4)]
+
+        # Cycles from start_trigger to stop_trigger, at 1 MHz
+        self.assertEqual(results, [10 * PROG_SIZE / 1000.0] * 4)
+        self.assertEqual(self.stats(target, boards[0]), (2, 0))
+        self.assertEqual(self.stats(target, boards[1]), (2, 0))
+
+    def test_retry(self):
+        """A run on a board which can't be reached is retried on another
+           board"""
+        boards = [self.board(fail_every=1), self.board()]
+        target = self.target(boards)
+
+        self.assertGreater(self.run_bench(target), 0.0)
+        self.assertEqual(self.stats(target, boards[0]), (1, 1))
+        self.assertEqual(self.stats(target, boards[1]), (1, 0))
+
+    def test_retry_same_board(self):
+        """With one board, a run is retried on the same board"""
+        boards = [self.board(fail_every=2)]
+        target = self.target(boards)
+
+        self.assertGreater(self.run_bench(target), 0.0)
+        self.assertGreater(self.run_bench(target), 0.0)
+        self.assertEqual(self.stats(target, boards[0]), (3, 1))
+
+    def test_quarantine(self):
+        """A board which fails too many times in a row is no longer used"""
+        boards = [self.board(fail_every=1), self.board()]
+        target = self.target(boards, '--max-board-failures', '2')
+
+        with self.assertLogs(log, 'WARNING') as logs:
+            for _ in range(4):
+                self.assertGreater(self.run_bench(target), 0.0)
+
+        self.assertEqual(self.stats(target, boards[0]), (2, 2))
+        self.assertEqual(self.stats(target, boards[1]), (4, 0))
+        self.assertIn('no longer used', logs.output[0])
+
+    def test_no_boards_left(self):
+        """Once every board has been taken out of the pool, runs fail"""
+        boards = [self.board(fail_every=1)]
+        target = self.target(boards, '--max-board-failures', '1')
+
+        with self.assertLogs(log, 'WARNING') as logs:
+            self.assertEqual(self.run_bench(target), 0.0)
+            self.assertEqual(self.run_bench(target), 0.0)
+
+        self.assertEqual(self.stats(target, boards[0]), (1, 1))
+        self.assertIn('No boards left', logs.output[-1])
+
+    def test_retries_exhausted(self):
+        """A run fails once it has been retried "--retries" times"""
+        boards = [self.board(fail_every=1)]
+        target = self.target(boards, '--retries', '1')
+
+        self.assertEqual(self.run_bench(target), 0.0)
+        self.assertEqual(self.stats(target, boards[0]), (2, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+# Tests of the build worker protocol.
+
+# Copyright (C) 2026 Embecosm Limited
+#
+# This file is part of Embench.
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Tests of build_worker.py and the socket executor of build_all.py.
+
+A build worker is started on the local host, and commands are sent to it
+through SocketExecutor, as "build_all.py --executor socket" does.  Run from
+the top level directory with
+
+  python3 -m unittest discover test
+"""
+
+import os
+import re
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+rootdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(rootdir, 'pylib'))
+
+import embench_executor
+from embench_executor import SocketExecutor
+
+
+def unused_endpoint():
+    """Return a local endpoint on which nothing is listening"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()
+
+
+class SilentHandler(socketserver.StreamRequestHandler):
+    """Read a request and then drop the connection without replying, as a
+       worker which dies while running the command would"""
+
+    def handle(self):
+        self.rfile.readline()
+        self.server.requests += 1
+
+
+class TestSocketExecutor(unittest.TestCase):
+    """Commands sent to a build worker"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.logdir = tempfile.TemporaryDirectory()
+        cls.worker = subprocess.Popen(
+            [sys.executable, os.path.join(rootdir, 'build_worker.py'),
+             '--port', '0', '--logdir', cls.logdir.name],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        line = cls.worker.stdout.readline().decode('utf-8')
+        found = re.search(r'listening on (\S+):(\d+)', line)
+        if not found:
+            cls.worker.kill()
+            raise RuntimeError(f'Build worker did not start: {line}')
+        cls.endpoint = (found.group(1), int(found.group(2)))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.worker.terminate()
+        cls.worker.wait()
+        cls.worker.stdout.close()
+        cls.logdir.cleanup()
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workdir.cleanup)
+
+    def count_command(self):
+        """A command which records each time it is run in the work
+           directory, and prints "ran" """
+        return [
+            sys.executable, '-c',
+            'open("runs", "a").write("x"); print("ran")',
+        ]
+
+    def runs(self):
+        """The number of times count_command has run"""
+        try:
+            with open(os.path.join(self.workdir.name, 'runs')) as fileh:
+                return len(fileh.read())
+        except FileNotFoundError:
+            return 0
+
+    def test_round_trip(self):
+        """A command run by the worker gives the result subprocess.run
+           would, with its resource usage"""
+        executor = SocketExecutor([self.endpoint], {'EMBENCH_TEST': 'yes'})
+        res = executor.run(
+            [sys.executable, '-c',
+             'import os, sys; print(os.environ["EMBENCH_TEST"]); sys.exit(3)'],
+            self.workdir.name,
+            10,
+        )
+        self.assertEqual(res.returncode, 3)
+        self.assertEqual(res.stdout, b'yes\n')
+        self.assertIsNotNone(res.usage)
+
+    def test_timeout(self):
+        """A command which takes too long is killed by the worker"""
+        executor = SocketExecutor([self.endpoint])
+        with self.assertRaises(subprocess.TimeoutExpired):
+            executor.run(
+                [sys.executable, '-c', 'import time; time.sleep(10)'],
+                self.workdir.name,
+                0.5,
+            )
+
+    def test_failover(self):
+        """A worker which can't be reached is skipped"""
+        executor = SocketExecutor([unused_endpoint(), self.endpoint])
+        res = executor.run(self.count_command(), self.workdir.name, 10)
+        self.assertEqual(res.returncode, 0)
+        self.assertEqual(res.stdout, b'ran\n')
+        self.assertEqual(self.runs(), 1)
+
+    def test_no_worker(self):
+        """With no worker reachable, the command fails as ssh would"""
+        executor = SocketExecutor([unused_endpoint(), unused_endpoint()])
+        res = executor.run(self.count_command(), self.workdir.name, 10)
+        self.assertEqual(res.returncode, 255)
+        self.assertEqual(self.runs(), 0)
+
+    def test_no_resend(self):
+        """A command whose reply is lost is not sent to another worker,
+           since it may already have run"""
+        with socketserver.TCPServer(('127.0.0.1', 0), SilentHandler) as server:
+            server.requests = 0
+            thread = threading.Thread(target=server.handle_request)
+            thread.start()
+            executor = SocketExecutor([server.server_address, self.endpoint])
+            res = executor.run(self.count_command(), self.workdir.name, 10)
+            thread.join()
+
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(res.returncode, 255)
+        self.assertEqual(self.runs(), 0)
+
+    def test_late_reply(self):
+        """A command whose reply doesn't come in time times out, and is not
+           sent to another worker"""
+        grace = embench_executor.WORKER_GRACE
+        embench_executor.WORKER_GRACE = 0
+        self.addCleanup(setattr, embench_executor, 'WORKER_GRACE', grace)
+
+        with socket.socket() as listener:
+            # Accepted by the kernel, but never answered
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(1)
+            executor = SocketExecutor([listener.getsockname(), self.endpoint])
+            with self.assertRaises(subprocess.TimeoutExpired):
+                executor.run(self.count_command(), self.workdir.name, 0.5)
+
+        self.assertEqual(self.runs(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()